@@ -106,4 +106,4 @@ class ActionManager:
         
         # 特殊处理
         if action == Action.RAISE:
-            game_state.to_call = amount
\ No newline at end of file
+            game_state.update(to_call=amount)
\ No newline at end of file
@@ -90,6 +90,30 @@ class Card:
 
         return cls(rank, suit)
 
+    def to_int(self) -> int:
+        """
+        转换为0-51的整数编码，供快速评估器和数组化计算使用
+        编码方式: 点数索引(2->0, A->12) * 4 + 花色索引
+        """
+        return RANK_INDEX[self.rank] * 4 + SUIT_INDEX[self.suit]
+
+    @classmethod
+    def from_int(cls, value: int) -> 'Card':
+        """
+        从0-51的整数编码创建Card对象
+        :param value: to_int()返回的整数编码
+        :return: Card对象
+        """
+        if not 0 <= value < 52:
+            raise ValueError(f"Invalid card index: {value}")
+        return cls(RANKS[value >> 2], SUITS[value & 3])
+
+# 整数编码用的点数/花色顺序
+RANKS: List[Rank] = list(Rank)
+SUITS: List[Suit] = list(Suit)
+RANK_INDEX = {rank: i for i, rank in enumerate(RANKS)}
+SUIT_INDEX = {suit: i for i, suit in enumerate(SUITS)}
+
 @dataclass
 class Hand:
     """
@@ -3,8 +3,9 @@ Game state management classes
 管理游戏状态的相关类
 """
 
+from contextlib import contextmanager
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Tuple
 from ..utils.constants import Position, Stage, Action
 from .card import Card, Hand
 
@@ -21,6 +22,15 @@ class StreetState:
     community_cards: List[Card] = field(default_factory=list)  # 公共牌
     pot_size: int = 0                                         # 底池大小
     actions: List[ActionRecord] = field(default_factory=list)  # 动作记录
+    start_pot: Optional[int] = None                           # 本街开始时的底池（进入本街或本街第一个动作时记下）
+
+# 枚举在状态键中用下标表示（枚举本身的哈希依赖字符串哈希，跨进程不稳定）
+POSITION_INDEX = {pos: i for i, pos in enumerate(Position)}
+STAGE_INDEX = {stage: i for i, stage in enumerate(Stage)}
+ACTION_INDEX = {action: i for i, action in enumerate(Action)}
+
+# 可以通过update()修改并撤销的标量字段
+UNDOABLE_FIELDS = ('to_call', 'current_pot', 'my_stack')
     
 @dataclass
 class GameState:
@@ -47,6 +57,15 @@ class GameState:
     # 位置到筹码的映射
     stacks: Dict[Position, int] = field(default_factory=dict)
     
+    # 每个位置本手牌累计投入的筹码和已弃牌的位置（用于构建边池）
+    contributions: Dict[Position, int] = field(default_factory=dict)
+    folded_positions: List[Position] = field(default_factory=list)
+    
+    # 撤销日志：每次修改追加一条记录，undo时按相反顺序恢复，每条O(1)
+    _undo_log: list = field(default_factory=list, init=False, repr=False, compare=False)
+    # 动作历史的增量哈希，随record_action更新
+    _history_hash: int = field(default=0, init=False, repr=False, compare=False)
+    
     def __post_init__(self):
         """初始化后的处理"""
         # 确保stacks包含所有位置
@@ -76,23 +95,46 @@ class GameState:
         record = ActionRecord(position, action, amount)
         street_state.actions.append(record)
         
+        entry = ['action', street_state, self.current_pot, street_state.pot_size,
+                 position, self.contributions.get(position), False, False, self._history_hash, amount,
+                 street_state.start_pot]
+        if street_state.start_pot is None:
+            street_state.start_pot = self.current_pot
+        
+        if action == Action.FOLD and position not in self.folded_positions:
+            self.folded_positions.append(position)
+            entry[7] = True
+        
         # 更新底池大小
         if action in [Action.CALL, Action.RAISE, Action.ALL_IN]:
             street_state.pot_size += amount
-            self.current_pot = street_state.pot_size
+            self.current_pot += amount
+            self.contributions[position] = self.contributions.get(position, 0) + amount
             
             # 更新玩家筹码
             if position in self.stacks:
                 self.stacks[position] -= amount
+                entry[6] = True
+        
+        self._history_hash = hash((
+            self._history_hash, STAGE_INDEX[self.current_stage],
+            POSITION_INDEX[position], ACTION_INDEX[action], amount
+        ))
+        self._undo_log.append(entry)
     
     def advance_stage(self):
-        """推进到下一个阶段"""
+        """推进到下一个阶段，并记下新一街开始时的底池"""
+        previous_stage = self.current_stage
         if self.current_stage == Stage.PREFLOP:
             self.current_stage = Stage.FLOP
         elif self.current_stage == Stage.FLOP:
             self.current_stage = Stage.TURN
         elif self.current_stage == Stage.TURN:
             self.current_stage = Stage.RIVER
+        street_state = self.get_current_street_state()
+        self._undo_log.append(('stage', previous_stage, street_state, street_state.start_pot))
+        if self.current_stage != previous_stage:
+            street_state.start_pot = self.current_pot
             
     def add_community_cards(self, cards: List[Card]):
         """
@@ -100,4 +142,122 @@ class GameState:
         :param cards: 要添加的公共牌列表
         """
         street_state = self.get_current_street_state()
-        street_state.community_cards.extend(cards)
\ No newline at end of file
+        street_state.community_cards.extend(cards)
+        self._undo_log.append(('cards', street_state, len(cards)))
+    
+    def update(self, **values):
+        """
+        修改标量字段（to_call/current_pot/my_stack）并记录旧值，以便撤销
+        直接赋值也可以，但不会进入撤销日志
+        """
+        previous = {}
+        for name, value in values.items():
+            if name not in UNDOABLE_FIELDS:
+                raise AttributeError(f"Field cannot be updated: {name}")
+            previous[name] = getattr(self, name)
+            setattr(self, name, value)
+        self._undo_log.append(('set', previous))
+    
+    def checkpoint(self) -> int:
+        """
+        返回当前撤销日志的位置，之后可以用undo_to()回到这里
+        用于搜索/模拟中试探一条线路后恢复，代替deepcopy
+        """
+        return len(self._undo_log)
+    
+    def undo(self) -> bool:
+        """
+        撤销最近一次修改
+        :return: 日志为空时返回False
+        """
+        if not self._undo_log:
+            return False
+        entry = self._undo_log.pop()
+        kind = entry[0]
+        if kind == 'action':
+            (_, street_state, current_pot, pot_size, position, contribution,
+             stack_changed, folded_added, history_hash, amount, start_pot) = entry
+            street_state.actions.pop()
+            street_state.pot_size = pot_size
+            street_state.start_pot = start_pot
+            self.current_pot = current_pot
+            if contribution is None:
+                self.contributions.pop(position, None)
+            else:
+                self.contributions[position] = contribution
+            if stack_changed:
+                self.stacks[position] += amount
+            if folded_added:
+                self.folded_positions.pop()
+            self._history_hash = history_hash
+        elif kind == 'stage':
+            self.current_stage = entry[1]
+            entry[2].start_pot = entry[3]
+        elif kind == 'cards':
+            street_state, count = entry[1], entry[2]
+            if count:
+                del street_state.community_cards[-count:]
+        else:  # set
+            for name, value in entry[1].items():
+                setattr(self, name, value)
+        return True
+    
+    def undo_to(self, mark: int) -> None:
+        """撤销到checkpoint()返回的位置"""
+        while len(self._undo_log) > mark:
+            self.undo()
+    
+    @contextmanager
+    def branch(self) -> Iterator['GameState']:
+        """
+        试探分支：with块内的所有修改在退出时撤销
+        with game_state.branch():
+            game_state.record_action(...)
+            ...
+        """
+        mark = self.checkpoint()
+        try:
+            yield self
+        finally:
+            self.undo_to(mark)
+    
+    def clear_undo_log(self) -> None:
+        """确认当前状态，丢弃撤销日志（长时间运行时避免日志增长）"""
+        self._undo_log.clear()
+    
+    def street_start_pot(self) -> int:
+        """
+        本街开始时的底池（本街的投入之前）
+        没有经过advance_stage、本街也还没有记录动作时就是当前底池
+        """
+        start_pot = self.get_current_street_state().start_pot
+        return self.current_pot if start_pot is None else start_pot
+    
+    def board(self) -> List[Card]:
+        """
+        当前所有公共牌
+        各街可以只记录新发的牌，也可以像交互流程那样记录截至该街的全部公共牌，重复的牌只算一次
+        """
+        cards: List[Card] = []
+        for street_state in (self.preflop_state, self.flop_state, self.turn_state, self.river_state):
+            for card in street_state.community_cards:
+                if card not in cards:
+                    cards.append(card)
+        return cards
+    
+    def state_key(self) -> Tuple:
+        """
+        紧凑、可哈希的状态键，可用作置换表/缓存的键
+        动作历史以增量哈希表示，相同的手牌、公共牌、筹码和动作序列得到相同的键
+        """
+        return (
+            tuple(card.to_int() for card in self.my_hand.cards),
+            POSITION_INDEX[self.my_position],
+            STAGE_INDEX[self.current_stage],
+            self.to_call,
+            self.current_pot,
+            self.my_stack,
+            tuple(card.to_int() for card in self.board()),
+            tuple(self.stacks.get(pos, 0) for pos in Position),
+            self._history_hash,
+        )
@@ -3,12 +3,23 @@ Poker strategy advisor
 策略建议系统
 """
 
-from typing import Dict, List, Tuple, Optional
+from dataclasses import fields
+from typing import TYPE_CHECKING, Dict, List, Tuple, Optional
 from ..core.game_state import GameState
 from ..core.action import Action, ActionManager
 from ..utils.constants import Stage, Position, STANDARD_PREFLOP_RAISES, STANDARD_POSTFLOP_BETS
 from .evaluator import HandEvaluator, EquityCalculator, PotOddsCalculator, PositionEvaluator
 
+# 求解器、数据库和分桶表只在对应功能第一次使用时导入，保持启动速度
+if TYPE_CHECKING:
+    from .cfr import SubgameSolution, SolverConfig
+    from .ranges import HandRange
+    from .flop_db import FlopDatabase
+    from .buckets import BucketTable
+    from .inference import RangeTracker
+    from .decision_cache import DecisionCache
+    from .mcts import MCTSConfig
+
 class Decision:
     """
     决策结果类
@@ -30,11 +41,26 @@ class PokerAdvisor:
     扑克策略顾问
     """
     
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
+        """
+        :param seed: 模拟用的根种子，相同种子给出完全相同的建议
+        """
         self.hand_evaluator = HandEvaluator()
-        self.equity_calculator = EquityCalculator()
+        self.equity_calculator = EquityCalculator(seed)
         self.pot_odds_calculator = PotOddsCalculator()
         self.position_evaluator = PositionEvaluator()
+        self.solver_solution: Optional['SubgameSolution'] = None
+        # 各阶段的预计算分桶表（可选），提供比单一胜率更细的牌力信息
+        self.bucket_tables: Dict[Stage, 'BucketTable'] = {}
+        # 对手范围跟踪器（可选），设置后翻牌后胜率按推断出的范围计算
+        self.range_tracker: Optional['RangeTracker'] = None
+        # 决策缓存（可选），相同规范状态直接返回缓存的决策
+        self.decision_cache: Optional['DecisionCache'] = None
+        # 树搜索配置（可选），设置后翻牌后建议改用蒙特卡洛树搜索前瞻
+        self.mcts_config: Optional['MCTSConfig'] = None
+        # 翻牌后胜率的估计方法（可选），如'combined'：同样精度所需的模拟次数更少
+        self.equity_method: Optional[str] = None
+        self.equity_simulations = 1000
     
     def get_preflop_advice(self, game_state: GameState) -> Decision:
         """
@@ -98,11 +124,32 @@ class PokerAdvisor:
         """
         获取翻牌后建议
         """
-        # 计算当前胜率
-        equity = self.equity_calculator.calculate_equity(
-            game_state.my_hand,
-            game_state.get_current_street_state().community_cards
-        )
+        # 计算当前胜率（有范围跟踪时对推断出的对手范围计算）
+        board = game_state.get_current_street_state().community_cards
+        opponent_ranges = []
+        if self.range_tracker is not None:
+            self.range_tracker.sync(game_state)
+            opponent_ranges = self.range_tracker.opponent_ranges()
+        if opponent_ranges:
+            equity = self.equity_calculator.calculate_range_equity(
+                game_state.my_hand,
+                board,
+                opponent_ranges
+            )
+        elif self.equity_method is not None:
+            estimate = self.equity_calculator.estimate_equity(
+                game_state.my_hand,
+                board,
+                num_simulations=self.equity_simulations,
+                method=self.equity_method
+            )
+            equity = estimate.equity
+        else:
+            equity = self.equity_calculator.calculate_equity(
+                game_state.my_hand,
+                board,
+                num_simulations=self.equity_simulations
+            )
         
         # 计算底池赔率
         pot_odds = self.pot_odds_calculator.calculate_pot_odds(
@@ -115,6 +162,20 @@ class PokerAdvisor:
             f"底池赔率: {pot_odds:.2f}"
         ]
         
+        bucket_table = self.bucket_tables.get(game_state.current_stage)
+        if bucket_table:
+            bucket = bucket_table.bucket(
+                game_state.my_hand,
+                game_state.get_current_street_state().community_cards
+            )
+            reasoning.append(f"手牌分桶: {bucket + 1}/{bucket_table.num_buckets}")
+        if opponent_ranges:
+            reasoning.append(f"按推断范围计算胜率（{len(opponent_ranges)}名对手）")
+        elif self.equity_method is not None:
+            reasoning.append(
+                f"胜率标准误: {estimate.std_error:.3f}（方差缩减{estimate.variance_reduction:.1f}倍）"
+            )
+        
         # 如果没人下注
         if game_state.to_call == 0:
             if equity > 0.7:
@@ -149,11 +210,229 @@ class PokerAdvisor:
             else:
                 return Decision(Action.FOLD, 0, 0.7, reasoning + ["赔率不够，放弃"])
     
+    def track_ranges(self, game_state: GameState, pot: Optional[int] = None) -> 'RangeTracker':
+        """
+        开始跟踪本手牌对手的范围，之后每次翻牌后建议都会增量同步新的动作
+        :param pot: 第一个已记录动作之前的底池，默认从game_state推出（见pot_before_actions）
+        """
+        from .inference import RangeTracker
+        self.range_tracker = RangeTracker.from_game_state(game_state, pot)
+        return self.range_tracker
+    
+    def get_flop_database_advice(
+        self,
+        game_state: GameState,
+        database: 'FlopDatabase',
+        scenario: str
+    ) -> Decision:
+        """
+        从预计算的翻牌数据库查询加注者首次行动的策略
+        :param database: 已打开的翻牌策略数据库
+        :param scenario: 翻前场景名，如'SRP_BTN_BB'
+        """
+        if game_state.current_stage != Stage.FLOP:
+            raise ValueError("Flop database advice is only available on the flop")
+        flop = game_state.get_current_street_state().community_cards[:3]
+        strategy = database.lookup(scenario, flop, game_state.my_hand)
+        label = max(strategy, key=strategy.get)
+        
+        action = Action(label.split(':')[0])
+        amount = 0
+        if action == Action.RAISE:
+            amount = int(game_state.current_pot * STANDARD_POSTFLOP_BETS[label.split(':')[1]])
+        reasoning = [f"翻牌数据库场景: {scenario}（策略来源: {database.source}）"]
+        if database.is_heuristic:
+            reasoning.append("数据库频率来自启发式规则，不是求解结果")
+        reasoning += [
+            f"{name}: {frequency:.2f}" for name, frequency in strategy.items()
+        ]
+        return Decision(action, amount, strategy[label], reasoning + ["按预计算策略的最高频率行动"])
+    
     def get_advice(self, game_state: GameState) -> Decision:
         """
         获取完整的行动建议
         """
+        # 范围跟踪依赖动作历史，不在规范键中，此时不使用缓存
+        if self.decision_cache is not None and self.range_tracker is None:
+            return self.decision_cache.get_or_compute(
+                game_state, self._compute_advice, self.cache_context()
+            )
+        return self._compute_advice(game_state)
+    
+    def cache_context(self) -> Tuple:
+        """
+        影响建议但不在游戏状态中的顾问配置，作为决策缓存键的一部分：
+        树搜索配置、胜率估计方法和模拟次数、分桶表（按内容摘要）
+        """
+        mcts = None
+        if self.mcts_config is not None:
+            items = []
+            for config_field in fields(self.mcts_config):
+                value = getattr(self.mcts_config, config_field.name)
+                if isinstance(value, dict):
+                    value = tuple(sorted(value.items()))
+                items.append((config_field.name, value))
+            mcts = tuple(items)
+        buckets = tuple(sorted((stage.value, table.fingerprint) for stage, table in self.bucket_tables.items()))
+        return (mcts, self.equity_method, self.equity_simulations, buckets)
+    
+    def _compute_advice(self, game_state: GameState) -> Decision:
+        """按阶段计算建议（不经过缓存）"""
         if game_state.current_stage == Stage.PREFLOP:
             return self.get_preflop_advice(game_state)
+        elif self.mcts_config is not None:
+            return self.get_mcts_advice(game_state)
         else:
-            return self.get_postflop_advice(game_state)
\ No newline at end of file
+            return self.get_postflop_advice(game_state)
+    
+    def get_mcts_advice(
+        self,
+        game_state: GameState,
+        config: Optional['MCTSConfig'] = None,
+        pool=None
+    ) -> Decision:
+        """
+        用蒙特卡洛树搜索考虑后续街和对手的应对，在时间/迭代预算内选择行动
+        有范围跟踪时对手手牌按推断出的范围抽样
+        :param config: 搜索配置，默认self.mcts_config
+        :param pool: 根并行使用的已有进程池
+        """
+        from .mcts import MCTSConfig, SearchRoot, search
+        config = config or self.mcts_config or MCTSConfig()
+        ranges = None
+        if self.range_tracker is not None:
+            self.range_tracker.sync(game_state)
+            ranges = self.range_tracker.ranges
+        root = SearchRoot.from_game_state(game_state, ranges)
+        result = search(root, config, self.equity_calculator.rng.getrandbits(64), pool)
+        if not result.iterations:
+            # 预算内没有完成任何迭代，退回基于胜率的建议
+            return self.get_postflop_advice(game_state)
+        
+        values = result.values()
+        reasoning = [
+            f"搜索迭代: {result.iterations}（{result.elapsed:.2f}秒，{result.nodes}个节点）"
+        ] + [
+            f"{action.value}{' ' + str(amount) if amount else ''}: "
+            f"EV {value:+.1f}，访问{visits / result.iterations:.0%}"
+            for (action, amount), value, visits in zip(result.options, values, result.visits)
+        ]
+        best = result.best()
+        action, amount = result.options[best]
+        return Decision(
+            action,
+            amount,
+            result.visits[best] / result.iterations,
+            reasoning + ["按搜索中访问次数最多的行动"]
+        )
+    
+    @staticmethod
+    def _postflop_order() -> List[Position]:
+        """翻牌后的行动顺序（SB最先，BTN最后）"""
+        return PositionEvaluator.get_positions_to_act(Position.BTN) + [Position.BTN]
+    
+    @staticmethod
+    def _solver_history(
+        solution: 'SubgameSolution',
+        game_state: GameState,
+        players: Dict[Position, int]
+    ) -> List[str]:
+        """
+        把本街已记录的行动映射为求解树上的行动标签，下注金额取最接近的尺度
+        """
+        history: List[str] = []
+        for record in game_state.get_current_street_state().actions:
+            if record.player_position not in players:
+                continue
+            options = solution.actions(history)
+            labels = [label for label, _ in options]
+            if record.action == Action.CHECK and Action.CHECK.value in labels:
+                history.append(Action.CHECK.value)
+            elif record.action == Action.CALL and Action.CALL.value in labels:
+                history.append(Action.CALL.value)
+            elif record.action in [Action.RAISE, Action.ALL_IN]:
+                bets = [
+                    (label, amount) for label, amount in options
+                    if label.startswith(Action.RAISE.value) or label == Action.ALL_IN.value
+                ]
+                if not bets:
+                    break
+                history.append(min(bets, key=lambda option: abs(option[1] - record.amount))[0])
+            else:
+                break
+        return history
+    
+    def get_solver_advice(
+        self,
+        game_state: GameState,
+        opponent_range: 'HandRange',
+        opponent_position: Optional[Position] = None,
+        my_range: Optional['HandRange'] = None,
+        iterations: int = 200,
+        config: Optional['SolverConfig'] = None
+    ) -> Decision:
+        """
+        求解当前转牌/河牌单挑子博弈，并按均衡策略给出建议
+        :param opponent_range: 对手的范围
+        :param opponent_position: 对手位置，默认取本街最后行动的其他玩家
+        :param my_range: 我们的范围，默认所有组合
+        """
+        if game_state.current_stage not in [Stage.TURN, Stage.RIVER]:
+            raise ValueError("Solver advice is only available on the turn and river")
+        from .cfr import SubgameSolver
+        from .ranges import HandRange, hand_to_combo
+        
+        street_state = game_state.get_current_street_state()
+        my_position = game_state.my_position
+        
+        if opponent_position is None:
+            others = [r.player_position for r in street_state.actions if r.player_position != my_position]
+            opponent_position = others[-1] if others else (
+                Position.BB if my_position != Position.BB else Position.BTN
+            )
+        order = self._postflop_order()
+        hero_oop = order.index(my_position) < order.index(opponent_position)
+        players = {my_position: 0 if hero_oop else 1, opponent_position: 1 if hero_oop else 0}
+        
+        # 我们的范围必须包含实际手牌
+        my_range = HandRange(my_range.weights if my_range else None)
+        hero_combo = hand_to_combo(game_state.my_hand)
+        my_range.weights[hero_combo] = max(my_range.weights[hero_combo], 1.0)
+        ranges = (my_range, opponent_range) if hero_oop else (opponent_range, my_range)
+        
+        # 子博弈从本街开始：底池取本街开始时记下的底池，
+        # 筹码取各位置当前的剩余筹码（record_action会扣减）加回本街已投入的部分
+        street_invested = {position: 0 for position in players}
+        for record in street_state.actions:
+            if record.player_position in players:
+                street_invested[record.player_position] += record.amount
+        pot = game_state.street_start_pot()
+        stack = game_state.stacks.get(my_position, game_state.my_stack) + street_invested[my_position]
+        # 对手筹码未知时stacks中为0（记录动作后可能为负），此时按我们的筹码计算
+        opponent_stack = game_state.stacks.get(opponent_position, 0) + street_invested[opponent_position]
+        if opponent_stack > 0:
+            stack = min(stack, opponent_stack)
+        
+        solver = SubgameSolver(
+            street_state.community_cards, ranges[0], ranges[1], max(pot, 1), stack, config,
+            seed=self.equity_calculator.rng.getrandbits(64)
+        )
+        solution = solver.solve(iterations)
+        self.solver_solution = solution
+        
+        history = self._solver_history(solution, game_state, players)
+        if solution.acting_player(history) != players[my_position]:
+            raise ValueError("It is not our turn to act in the solved subgame")
+        strategy = solution.strategy(history, *game_state.my_hand.cards)
+        amounts = dict(solution.actions(history))
+        label = max(strategy, key=strategy.get)
+        
+        reasoning = [f"求解迭代: {iterations}"] + [
+            f"{name}: {frequency:.2f}" for name, frequency in strategy.items()
+        ]
+        return Decision(
+            Action(label.split(':')[0]),
+            amounts[label],
+            strategy[label],
+            reasoning + ["按子博弈均衡策略的最高频率行动"]
+        )
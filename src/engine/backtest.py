@@ -0,0 +1,432 @@
+"""
+Backtesting PokerAdvisor against recorded hands
+用历史手牌回测策略顾问
+"""
+
+import json
+import os
+import sys
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from ..core.card import Card, Hand
+from ..core.game_state import GameState
+from ..utils.constants import Action, Position, Stage
+from .advisor import Decision, PokerAdvisor
+from .evaluator import EquityCalculator
+from .rng import RandomStream
+
+STAGES = list(Stage)
+# 每个阶段结束时公共牌的总张数
+BOARD_CARDS = {Stage.PREFLOP: 0, Stage.FLOP: 3, Stage.TURN: 4, Stage.RIVER: 5}
+CHECKPOINT_VERSION = 2
+# 记录中没有盲注时使用的(小盲, 大盲)
+DEFAULT_BLINDS = (5, 10)
+# 回放用到的缓存表（默认配置的顾问只用到评估器在进程内构建的小表），由工作进程共享
+BACKTEST_TABLES: List[str] = []
+
+@dataclass
+class RecordedHand:
+    """
+    一手历史牌
+    JSON格式（每行一手）:
+    {"id": "...", "hero": "BTN", "hand": "AhKh", "stacks": {"UTG": 1000, ...},
+     "board": "2h7dQc5s9d", "actions": [["PREFLOP", "UTG", "RAISE", 30], ...],
+     "blinds": [5, 10], "ante": 0}
+    动作金额与GameState.record_action一致，为本次新投入的筹码
+    stacks是发牌前的筹码；盲注和前注不在actions中，回放时按blinds/ante（缺省时用回测设置）先行扣除
+    """
+    hand_id: str
+    hero: Position
+    hand: Hand
+    stacks: Dict[Position, int]
+    board: List[Card]
+    actions: List[Tuple[Stage, Position, Action, int]] = field(default_factory=list)
+    blinds: Optional[Tuple[int, int]] = None
+    ante: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'RecordedHand':
+        board_str = data.get('board', '')
+        return cls(
+            hand_id=str(data.get('id', '')),
+            hero=Position(data['hero']),
+            hand=Hand.from_string(data['hand']),
+            stacks={Position(pos): int(stack) for pos, stack in data['stacks'].items()},
+            board=[Card.from_string(board_str[i:i+2]) for i in range(0, len(board_str), 2)],
+            actions=[
+                (Stage(stage), Position(pos), Action(action), int(amount))
+                for stage, pos, action, amount in data['actions']
+            ],
+            blinds=tuple(int(blind) for blind in data['blinds']) if 'blinds' in data else None,
+            ante=int(data['ante']) if 'ante' in data else None,
+        )
+
+    def to_dict(self) -> dict:
+        data = {
+            'id': self.hand_id,
+            'hero': self.hero.value,
+            'hand': ''.join(str(card) for card in self.hand.cards),
+            'stacks': {pos.value: stack for pos, stack in self.stacks.items()},
+            'board': ''.join(str(card) for card in self.board),
+            'actions': [
+                [stage.value, pos.value, action.value, amount]
+                for stage, pos, action, amount in self.actions
+            ],
+        }
+        if self.blinds is not None:
+            data['blinds'] = list(self.blinds)
+        if self.ante is not None:
+            data['ante'] = self.ante
+        return data
+
+@dataclass
+class DecisionPoint:
+    """回放中我的一个决策点"""
+    stage: Stage
+    position: Position
+    actual: Action
+    actual_amount: int
+    advised: Decision
+    equity: float
+    ev_actual: float
+    ev_advised: float
+
+    @property
+    def deviates(self) -> bool:
+        return self.actual != self.advised.action
+
+    @property
+    def ev_difference(self) -> float:
+        """建议行动相对实际行动的EV差（正数表示建议更好）"""
+        return self.ev_advised - self.ev_actual
+
+def estimate_ev(action: Action, amount: int, equity: float, pot: int, to_call: int, stack: int) -> float:
+    """
+    简化的筹码EV估计（相对于当前时刻，不计已投入的筹码）
+    假设下注/加注总被一名对手跟注，不计弃牌率；用于比较同一决策点的不同行动
+    """
+    if action == Action.FOLD:
+        return 0.0
+    if action == Action.CHECK:
+        return equity * pot
+    if action == Action.CALL:
+        call = min(to_call, stack)
+        return equity * (pot + call) - call
+    invested = stack if action == Action.ALL_IN else min(max(amount, to_call), stack)
+    return equity * (pot + 2 * invested - to_call) - invested
+
+class BacktestStats:
+    """
+    按(位置, 阶段)汇总的回测统计，可合并，可序列化到检查点
+    每组保存: 决策数, 偏离数, EV差之和, EV差平方和
+    """
+
+    def __init__(self):
+        self.groups: Dict[Tuple[str, str], List[float]] = {}
+        self.hands = 0
+        self.errors = 0
+
+    def add(self, point: DecisionPoint) -> None:
+        key = (point.position.value, point.stage.value)
+        group = self.groups.setdefault(key, [0, 0, 0.0, 0.0])
+        diff = point.ev_difference
+        group[0] += 1
+        group[1] += point.deviates
+        group[2] += diff
+        group[3] += diff * diff
+
+    def merge(self, other: 'BacktestStats') -> None:
+        for key, values in other.groups.items():
+            group = self.groups.setdefault(key, [0, 0, 0.0, 0.0])
+            for i, value in enumerate(values):
+                group[i] += value
+        self.hands += other.hands
+        self.errors += other.errors
+
+    def to_dict(self) -> dict:
+        return {
+            'hands': self.hands,
+            'errors': self.errors,
+            'groups': [[position, stage] + values for (position, stage), values in self.groups.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'BacktestStats':
+        stats = cls()
+        stats.hands = data['hands']
+        stats.errors = data['errors']
+        for position, stage, *values in data['groups']:
+            stats.groups[(position, stage)] = values
+        return stats
+
+    def summary(self) -> List[Dict]:
+        """
+        每组的偏离率、平均EV差及其标准误，按位置和阶段排序
+        """
+        positions = [pos.value for pos in Position]
+        rows = []
+        for (position, stage), (count, deviations, total, total_sq) in sorted(
+            self.groups.items(), key=lambda item: (positions.index(item[0][0]), STAGES.index(Stage(item[0][1])))
+        ):
+            mean = total / count
+            variance = max(total_sq / count - mean * mean, 0.0)
+            rows.append({
+                'position': position,
+                'stage': stage,
+                'decisions': count,
+                'deviation_rate': deviations / count,
+                'mean_ev_difference': mean,
+                'std_error': (variance / count) ** 0.5,
+            })
+        return rows
+
+def _post_forced_bets(
+    game_state: GameState,
+    blinds: Tuple[int, int],
+    ante: int
+) -> Dict[Position, int]:
+    """
+    扣除前注和盲注（筹码不足时全部投入），前注只计入底池，盲注同时计入翻前本街投入
+    :return: 翻前各位置的本街投入
+    """
+    street_bets: Dict[Position, int] = {}
+    postings = [(position, ante, False) for position in game_state.stacks] + [
+        (Position.SB, blinds[0], True), (Position.BB, blinds[1], True)
+    ]
+    for position, amount, street in postings:
+        if position not in game_state.stacks:
+            continue
+        amount = min(amount, game_state.stacks[position])
+        if amount <= 0:
+            continue
+        game_state.stacks[position] -= amount
+        game_state.contributions[position] = game_state.contributions.get(position, 0) + amount
+        game_state.current_pot += amount
+        if position == game_state.my_position:
+            game_state.my_stack -= amount
+        if street:
+            street_bets[position] = street_bets.get(position, 0) + amount
+    return street_bets
+
+def replay_hand(
+    recorded: RecordedHand,
+    advisor: PokerAdvisor,
+    equity_calculator: EquityCalculator,
+    num_simulations: int = 500,
+    blinds: Tuple[int, int] = DEFAULT_BLINDS,
+    ante: int = 0
+) -> List[DecisionPoint]:
+    """
+    逐个决策点回放一手牌：先扣除盲注和前注，在我的每个动作之前询问顾问，然后执行实际动作
+    :param blinds: (小盲, 大盲)，记录中有blinds时以记录为准
+    :param ante: 每人前注，记录中有ante时以记录为准
+    :raises ValueError: 动作的阶段顺序倒退
+    """
+    stage_indices = [STAGES.index(stage) for stage, _, _, _ in recorded.actions]
+    if any(later < earlier for earlier, later in zip(stage_indices, stage_indices[1:])):
+        raise ValueError(f"Actions of hand {recorded.hand_id} are not in stage order")
+    hero = recorded.hero
+    game_state = GameState(
+        my_hand=recorded.hand,
+        my_position=hero,
+        my_stack=recorded.stacks[hero],
+        stacks=dict(recorded.stacks),
+    )
+    street_bets = _post_forced_bets(
+        game_state,
+        recorded.blinds if recorded.blinds is not None else blinds,
+        recorded.ante if recorded.ante is not None else ante,
+    )
+    pot = game_state.current_pot
+    folded = set()
+    points = []
+
+    for stage, position, action, amount in recorded.actions:
+        while game_state.current_stage != stage:
+            game_state.advance_stage()
+            street_bets.clear()
+            # 与交互流程一致：当前阶段的公共牌列表包含截至该阶段的全部公共牌
+            game_state.add_community_cards(recorded.board[:BOARD_CARDS[game_state.current_stage]])
+
+        if position == hero:
+            to_call = max(street_bets.values(), default=0) - street_bets.get(hero, 0)
+            to_call = min(to_call, game_state.my_stack)
+            game_state.to_call = to_call
+            game_state.current_pot = pot
+            board = game_state.get_current_street_state().community_cards
+            advised = advisor.get_advice(game_state)
+            if to_call == 0 and advised.action == Action.FOLD:
+                # 没人下注时顾问用FOLD表示不主动入池，实际可以免费过牌
+                advised = Decision(
+                    Action.CHECK, 0, advised.confidence, advised.reasoning + ["无需跟注，弃牌按过牌计"]
+                )
+            equity = equity_calculator.calculate_equity(
+                recorded.hand, board,
+                num_opponents=max(1, len(recorded.stacks) - len(folded) - 1),
+                num_simulations=num_simulations
+            )
+            stack = game_state.my_stack
+            points.append(DecisionPoint(
+                stage=stage,
+                position=hero,
+                actual=action,
+                actual_amount=amount,
+                advised=advised,
+                equity=equity,
+                ev_actual=estimate_ev(action, amount, equity, pot, to_call, stack),
+                ev_advised=estimate_ev(advised.action, int(advised.amount), equity, pot, to_call, stack),
+            ))
+
+        game_state.record_action(position, action, amount)
+        if action == Action.FOLD:
+            folded.add(position)
+        elif action in (Action.CALL, Action.RAISE, Action.ALL_IN):
+            street_bets[position] = street_bets.get(position, 0) + amount
+            pot += amount
+            if position == hero:
+                game_state.my_stack -= amount
+    return points
+
+def _run_chunk(args) -> Tuple[int, dict]:
+    """回放一个分块的手牌（供进程池调用），分块的随机流只由根种子和分块编号决定"""
+    index, lines, seed, num_simulations, blinds, ante = args
+    stream = RandomStream(seed).substream(index)
+    advisor = PokerAdvisor(stream.getrandbits(64))
+    equity_calculator = EquityCalculator(rng=stream.substream(0))
+    stats = BacktestStats()
+    for line in lines:
+        # 只把格式错误的手牌记为错误，回放中其他异常（程序错误）照常抛出
+        try:
+            recorded = RecordedHand.from_dict(json.loads(line))
+        except (ValueError, KeyError, TypeError):
+            stats.errors += 1
+            continue
+        try:
+            points = replay_hand(recorded, advisor, equity_calculator, num_simulations, blinds, ante)
+        except ValueError:
+            stats.errors += 1
+            continue
+        for point in points:
+            stats.add(point)
+        stats.hands += 1
+    return index, stats.to_dict()
+
+class Backtester:
+    """
+    回测驱动：把手牌文件按固定大小分块，分块分发到进程池，
+    每完成一块就原子地写入检查点（已完成分块编号 + 合并后的统计），中断后从检查点继续
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        chunk_size: int = 1000,
+        workers: int = 1,
+        num_simulations: int = 500,
+        checkpoint_path: Optional[str] = None,
+        blinds: Tuple[int, int] = DEFAULT_BLINDS,
+        ante: int = 0
+    ):
+        """
+        :param seed: 根种子，同一输入和种子得到相同结果（与进程数和中断续跑无关；
+                     EV差之和按分块完成顺序累加，只有浮点舍入差异）
+        :param chunk_size: 每个任务的手牌数
+        :param workers: 并行进程数
+        :param num_simulations: 每个决策点估计胜率的模拟次数
+        :param checkpoint_path: 检查点文件，None表示不保存
+        :param blinds: 记录中没有盲注时使用的(小盲, 大盲)
+        :param ante: 记录中没有前注时使用的每人前注
+        """
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.num_simulations = num_simulations
+        self.checkpoint_path = checkpoint_path
+        self.blinds = tuple(blinds)
+        self.ante = ante
+
+    def _settings(self) -> dict:
+        """影响结果的设置，检查点只能由相同设置继续"""
+        return {
+            'chunk_size': self.chunk_size,
+            'seed': self.seed,
+            'num_simulations': self.num_simulations,
+            'blinds': list(self.blinds),
+            'ante': self.ante,
+        }
+
+    def _load_checkpoint(self) -> Tuple[set, BacktestStats]:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return set(), BacktestStats()
+        with open(self.checkpoint_path) as f:
+            data = json.load(f)
+        if data.get('version') != CHECKPOINT_VERSION or data.get('settings') != self._settings():
+            raise ValueError("Checkpoint does not match backtest settings")
+        return set(data['completed']), BacktestStats.from_dict(data['stats'])
+
+    def _save_checkpoint(self, completed: set, stats: BacktestStats) -> None:
+        if not self.checkpoint_path:
+            return
+        data = {
+            'version': CHECKPOINT_VERSION,
+            'settings': self._settings(),
+            'completed': sorted(completed),
+            'stats': stats.to_dict(),
+        }
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _tasks(self, lines: Iterable[str], completed: set) -> Iterator[tuple]:
+        """按分块产生任务，跳过检查点中已完成的分块（不解析其内容）"""
+        iterator = iter(lines)
+        index = 0
+        while True:
+            chunk = list(islice(iterator, self.chunk_size))
+            if not chunk:
+                return
+            if index not in completed:
+                yield index, chunk, self.seed, self.num_simulations, self.blinds, self.ante
+            index += 1
+
+    def run(self, lines: Iterable[str]) -> BacktestStats:
+        """
+        回测一组JSON行（通常是打开的文件对象）
+        """
+        completed, stats = self._load_checkpoint()
+        tasks = self._tasks(lines, completed)
+        if self.workers > 1:
+            from .shared_tables import shared_pool
+            with shared_pool(self.workers, BACKTEST_TABLES) as pool:
+                for index, chunk_stats in pool.imap_unordered(_run_chunk, tasks):
+                    stats.merge(BacktestStats.from_dict(chunk_stats))
+                    completed.add(index)
+                    self._save_checkpoint(completed, stats)
+        else:
+            for task in tasks:
+                index, chunk_stats = _run_chunk(task)
+                stats.merge(BacktestStats.from_dict(chunk_stats))
+                completed.add(index)
+                self._save_checkpoint(completed, stats)
+        return stats
+
+    def run_file(self, path: str) -> BacktestStats:
+        with open(path) as f:
+            return self.run(f)
+
+if __name__ == '__main__':
+    # python -m src.engine.backtest <手牌文件.jsonl> [进程数] [检查点文件]
+    backtester = Backtester(
+        workers=int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1,
+        checkpoint_path=sys.argv[3] if len(sys.argv) > 3 else None,
+    )
+    result = backtester.run_file(sys.argv[1])
+    print(f"Hands: {result.hands}  Errors: {result.errors}")
+    for row in result.summary():
+        print(
+            f"{row['position']:>4} {row['stage']:>8} n={row['decisions']:<8} "
+            f"deviation={row['deviation_rate']:.3f} "
+            f"ev_diff={row['mean_ev_difference']:+.2f}±{row['std_error']:.2f}"
+        )
@@ -0,0 +1,326 @@
+"""
+Per-seat betting round state machine
+逐座位的下注轮状态机
+"""
+
+from typing import List, Optional, Sequence, Tuple
+from ..core.action import ActionOption
+from ..utils.constants import Action, Position, Stage
+from .evaluator import PositionEvaluator
+from .side_pot import SidePotCalculator
+
+SEAT_POSITIONS = list(Position)
+NUM_SEATS = len(SEAT_POSITIONS)
+SEAT_INDEX = {pos: i for i, pos in enumerate(SEAT_POSITIONS)}
+
+# 每个座位之后第一个行动的座位（顺时针），由PositionEvaluator的行动顺序预先算好
+NEXT_SEAT = [
+    SEAT_INDEX[PositionEvaluator.get_positions_to_act(pos)[0]] for pos in SEAT_POSITIONS
+]
+BUTTON_SEAT = SEAT_INDEX[Position.BTN]
+SMALL_BLIND_SEAT = SEAT_INDEX[Position.SB]
+BIG_BLIND_SEAT = SEAT_INDEX[Position.BB]
+
+STAGE_ORDER = list(Stage)
+
+class BettingRound:
+    """
+    完整牌桌的下注状态机
+    跟踪每个座位的筹码、本街投入、本手牌总投入、弃牌/全下状态、最后一次加注幅度和行动顺序；
+    当前行动者的合法范围(to_call/min_raise/max_raise)由这些量O(1)得出，is_legal不构建选项列表
+
+    金额约定与GameState.record_action一致：CALL/RAISE/ALL_IN的amount是本次新投入的筹码
+    不足一次完整加注的全下不会重新开放已行动玩家的加注权，
+    除非该玩家上次行动后累计的加注（可以来自多次不足额全下）达到一次完整加注
+    """
+
+    __slots__ = (
+        'stacks', 'street_bets', 'contributions', 'folded', 'all_in', 'acted', 'raise_open',
+        'acted_bet', 'big_blind', 'stage', 'current_bet', 'last_raise', 'actor', 'pending',
+        'num_live', 'num_active', 'hand_over', 'history',
+    )
+
+    def __init__(
+        self,
+        stacks: Sequence[int],
+        big_blind: int,
+        small_blind: Optional[int] = None,
+        ante: int = 0,
+        seated: Optional[Sequence[Position]] = None
+    ):
+        """
+        开始一手牌：收取前注和盲注，行动者为大盲之后第一个座位
+        :param stacks: 每个座位的起始筹码（按Position顺序）
+        :param big_blind: 大盲金额，也是最小下注/加注幅度
+        :param small_blind: 小盲金额，默认大盲的一半
+        :param ante: 每人前注（计入底池，不计入本街下注）
+        :param seated: 参与本手牌的位置，默认全部；不在其中的座位视为已弃牌
+        """
+        if len(stacks) != NUM_SEATS:
+            raise ValueError(f"Expected {NUM_SEATS} stacks, got {len(stacks)}")
+        self.stacks = list(stacks)
+        self.street_bets = [0] * NUM_SEATS
+        self.contributions = [0] * NUM_SEATS
+        self.folded = [False] * NUM_SEATS
+        self.all_in = [False] * NUM_SEATS
+        self.acted = [False] * NUM_SEATS
+        self.raise_open = [True] * NUM_SEATS
+        # 每个座位上次行动后面对的下注额，用于累计此后的加注幅度
+        self.acted_bet = [0] * NUM_SEATS
+        self.big_blind = big_blind
+        self.stage = Stage.PREFLOP
+        self.history: List[Tuple[Stage, int, Action, int]] = []
+        self.hand_over = False
+
+        if seated is not None:
+            seated_seats = {SEAT_INDEX[pos] for pos in seated}
+            for seat in range(NUM_SEATS):
+                if seat not in seated_seats:
+                    self.folded[seat] = True
+        for seat in range(NUM_SEATS):
+            if not self.folded[seat] and self.stacks[seat] <= 0:
+                raise ValueError(f"Seat {SEAT_POSITIONS[seat].value} has no chips")
+
+        if ante:
+            for seat in range(NUM_SEATS):
+                if not self.folded[seat]:
+                    self._commit(seat, min(ante, self.stacks[seat]), street=False)
+        if small_blind is None:
+            small_blind = big_blind // 2
+        for seat, blind in ((SMALL_BLIND_SEAT, small_blind), (BIG_BLIND_SEAT, big_blind)):
+            if not self.folded[seat] and self.stacks[seat] > 0:
+                self._commit(seat, min(blind, self.stacks[seat]))
+
+        self.current_bet = max(self.street_bets)
+        self.last_raise = big_blind
+        self._start_street(BIG_BLIND_SEAT)
+
+    # ---- 内部状态维护 ----
+
+    def _commit(self, seat: int, amount: int, street: bool = True) -> None:
+        """座位投入筹码"""
+        self.stacks[seat] -= amount
+        self.contributions[seat] += amount
+        if street:
+            self.street_bets[seat] += amount
+        if self.stacks[seat] == 0:
+            self.all_in[seat] = True
+
+    def _count(self) -> None:
+        self.num_live = NUM_SEATS - sum(self.folded)
+        self.num_active = sum(
+            1 for seat in range(NUM_SEATS) if not self.folded[seat] and not self.all_in[seat]
+        )
+
+    def _next_active(self, seat: int) -> int:
+        """seat之后第一个仍可行动（未弃牌、未全下）的座位，没有则返回-1"""
+        for _ in range(NUM_SEATS):
+            seat = NEXT_SEAT[seat]
+            if not self.folded[seat] and not self.all_in[seat]:
+                return seat
+        return -1
+
+    def _start_street(self, before_seat: int) -> None:
+        """新一街开始：行动者为before_seat之后第一个可行动的座位"""
+        self._count()
+        for seat in range(NUM_SEATS):
+            self.acted[seat] = False
+            self.raise_open[seat] = True
+            self.acted_bet[seat] = 0
+        self.pending = self.num_active
+        self.actor = self._next_active(before_seat)
+        if self.num_live <= 1:
+            self.hand_over = True
+        # 只剩一个可行动玩家且已跟平时不需要行动
+        if self.num_active == 0 or (
+            self.num_active == 1 and self.street_bets[self.actor] >= self.current_bet
+        ):
+            self.pending = 0
+            self.actor = -1
+
+    # ---- 查询 ----
+
+    @property
+    def position(self) -> Optional[Position]:
+        """当前行动的位置，本轮结束时为None"""
+        return SEAT_POSITIONS[self.actor] if self.actor >= 0 else None
+
+    @property
+    def round_over(self) -> bool:
+        """本轮下注是否结束"""
+        return self.actor < 0
+
+    @property
+    def pot(self) -> int:
+        return sum(self.contributions)
+
+    @property
+    def to_call(self) -> int:
+        """当前行动者需要跟注的筹码（不超过其剩余筹码）"""
+        seat = self.actor
+        return min(self.current_bet - self.street_bets[seat], self.stacks[seat])
+
+    @property
+    def min_raise(self) -> int:
+        """当前行动者最小加注需要新投入的筹码（筹码不足时为全下金额）"""
+        seat = self.actor
+        return min(
+            self.current_bet + self.last_raise - self.street_bets[seat], self.stacks[seat]
+        )
+
+    @property
+    def max_raise(self) -> int:
+        """当前行动者最多可以新投入的筹码"""
+        return self.stacks[self.actor]
+
+    def can_raise(self) -> bool:
+        """当前行动者是否可以加注（筹码多于跟注额且加注权未被关闭）"""
+        seat = self.actor
+        return self.raise_open[seat] and self.stacks[seat] > self.current_bet - self.street_bets[seat]
+
+    def is_legal(self, action: Action, amount: int = 0) -> bool:
+        """
+        当前行动者执行该动作是否合法，O(1)
+        """
+        seat = self.actor
+        if seat < 0:
+            return False
+        owed = self.current_bet - self.street_bets[seat]
+        stack = self.stacks[seat]
+        if action == Action.FOLD:
+            return amount == 0
+        if action == Action.CHECK:
+            return owed == 0 and amount == 0
+        if action == Action.CALL:
+            return owed > 0 and amount == min(owed, stack)
+        if action == Action.RAISE:
+            if not self.raise_open[seat] or stack <= owed:
+                return False
+            return self.min_raise <= amount <= stack
+        if action == Action.ALL_IN:
+            # 全下在加注权关闭时只能作为跟注
+            return amount == stack and (self.raise_open[seat] or stack <= owed)
+        return False
+
+    def legal_actions(self) -> List[ActionOption]:
+        """
+        当前行动者的合法动作，格式与ActionManager.get_valid_actions相同
+        """
+        if self.actor < 0:
+            return []
+        seat = self.actor
+        owed = self.current_bet - self.street_bets[seat]
+        stack = self.stacks[seat]
+        options = [ActionOption(Action.FOLD)]
+        if owed == 0:
+            options.append(ActionOption(Action.CHECK))
+        else:
+            call = min(owed, stack)
+            options.append(ActionOption(Action.CALL, call, call))
+        if self.can_raise():
+            options.append(ActionOption(Action.RAISE, self.min_raise, stack))
+        if self.raise_open[seat] or stack <= owed:
+            options.append(ActionOption(Action.ALL_IN, stack, stack))
+        return options
+
+    # ---- 执行 ----
+
+    def apply(self, action: Action, amount: int = 0) -> None:
+        """
+        当前行动者执行动作并把行动权交给下一个座位
+        :raises ValueError: 动作或金额不合法
+        """
+        if not self.is_legal(action, amount):
+            raise ValueError("Invalid action or amount")
+        seat = self.actor
+        self.history.append((self.stage, seat, action, amount))
+        self.acted[seat] = True
+
+        if action == Action.FOLD:
+            self.folded[seat] = True
+            self.num_live -= 1
+            self.num_active -= 1
+            self.pending -= 1
+            if self.num_live <= 1:
+                self.hand_over = True
+                self.actor = -1
+                return
+        elif action == Action.CHECK:
+            self.pending -= 1
+        else:
+            self._commit(seat, amount)
+            new_bet = self.street_bets[seat]
+            if self.all_in[seat]:
+                self.num_active -= 1
+            if new_bet > self.current_bet:
+                raise_size = new_bet - self.current_bet
+                self.current_bet = new_bet
+                if raise_size >= self.last_raise:
+                    # 完整加注：其他人重新获得加注权
+                    self.last_raise = raise_size
+                    for other in range(NUM_SEATS):
+                        if other != seat:
+                            self.acted[other] = False
+                            self.raise_open[other] = True
+                else:
+                    # 不足一次完整加注的全下：已行动的玩家只有在上次行动后累计的加注
+                    # 达到一次完整加注时才能再加注，否则只能跟注或弃牌
+                    for other in range(NUM_SEATS):
+                        if self.acted[other] and other != seat:
+                            self.raise_open[other] = (
+                                self.current_bet - self.acted_bet[other] >= self.last_raise
+                            )
+                self.raise_open[seat] = False
+                # 其他仍可行动的玩家都需要再次表态
+                self.pending = self.num_active - (0 if self.all_in[seat] else 1)
+            else:
+                self.pending -= 1
+        self.acted_bet[seat] = self.current_bet
+
+        if self.pending <= 0:
+            self.actor = -1
+            return
+        self.actor = self._next_active(seat)
+        if self.actor < 0:
+            return
+        # 只剩一个可行动玩家且无需跟注时本轮结束
+        if self.num_active == 1 and self.street_bets[self.actor] >= self.current_bet:
+            self.actor = -1
+
+    def next_street(self) -> Stage:
+        """
+        本轮结束后进入下一街：清空本街下注，由按钮之后第一个可行动座位开始
+        """
+        if self.actor >= 0:
+            raise ValueError("Betting round is not over")
+        if self.stage == Stage.RIVER or self.hand_over:
+            raise ValueError("No further betting rounds")
+        self.stage = STAGE_ORDER[STAGE_ORDER.index(self.stage) + 1]
+        for seat in range(NUM_SEATS):
+            self.street_bets[seat] = 0
+        self.current_bet = 0
+        self.last_raise = self.big_blind
+        self._start_street(BUTTON_SEAT)
+        return self.stage
+
+    # ---- 结算 ----
+
+    def live_mask(self) -> int:
+        """未弃牌座位的位掩码"""
+        mask = 0
+        for seat in range(NUM_SEATS):
+            if not self.folded[seat]:
+                mask |= 1 << seat
+        return mask
+
+    def pots(self) -> List[Tuple[int, int]]:
+        """主池和边池，格式同SidePotCalculator.build_pots_array"""
+        return SidePotCalculator.build_pots_array(self.contributions, self.live_mask())
+
+    def copy(self) -> 'BettingRound':
+        """浅拷贝状态列表，用于模拟中的分支"""
+        clone = BettingRound.__new__(BettingRound)
+        for name in BettingRound.__slots__:
+            value = getattr(self, name)
+            setattr(clone, name, value[:] if isinstance(value, list) else value)
+        return clone
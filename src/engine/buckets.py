@@ -0,0 +1,438 @@
+"""
+Equity distributions and hand-strength bucketing
+胜率分布（手牌强度直方图）与手牌分桶抽象
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+from ..core.card import Card, Hand
+from ..utils.constants import Stage
+from .fast_evaluator import FastEvaluator
+from .flop_db import canonical_flops, canonicalize_flop, flop_index
+from .ranges import COMBOS, COMBO_INDEX, NUM_COMBOS, hand_class
+from .rng import RandomStream
+from .tables import get_table, register_table
+
+DEFAULT_BINS = 10
+
+@dataclass
+class EquityDistribution:
+    """
+    一手牌的胜率分布
+    mean: E[HS]，mean_sq: E[HS²]（越大于mean²表示越两极化，如听牌），histogram: 各区间的概率
+    """
+    mean: float
+    mean_sq: float
+    histogram: List[float]
+
+    @property
+    def potential(self) -> float:
+        """方差，衡量手牌的两极化程度"""
+        return max(0.0, self.mean_sq - self.mean * self.mean)
+
+# ----------------------------------------------------------------------
+# 手牌强度计算
+# ----------------------------------------------------------------------
+
+def board_hand_strengths(board: Sequence[int]) -> List[float]:
+    """
+    计算所有1326个组合在给定公共牌(3-5张)上对随机一手牌的强度HS=(赢+平/2)/总数
+    先按牌力排序再扫描，用每张牌上的计数扣除冲突组合，整个范围只需一次评估
+    与公共牌冲突的组合记为-1
+    """
+    dead = set(board)
+    board = list(board)
+    evaluate = FastEvaluator.evaluate
+    strengths = {}
+    for i, (a, b) in enumerate(COMBOS):
+        if a not in dead and b not in dead:
+            strengths[i] = evaluate([a, b] + board)
+    order = sorted(strengths, key=strengths.__getitem__)
+    n = len(order)
+    card_count = [0] * 52
+    for i in order:
+        a, b = COMBOS[i]
+        card_count[a] += 1
+        card_count[b] += 1
+
+    result = [-1.0] * NUM_COMBOS
+    below = 0
+    card_below = [0] * 52
+    start = 0
+    while start < n:
+        # 同牌力的一组
+        end = start
+        value = strengths[order[start]]
+        while end < n and strengths[order[end]] == value:
+            end += 1
+        group = order[start:end]
+        group_card = {}
+        for i in group:
+            a, b = COMBOS[i]
+            group_card[a] = group_card.get(a, 0) + 1
+            group_card[b] = group_card.get(b, 0) + 1
+        for i in group:
+            a, b = COMBOS[i]
+            compatible = n - card_count[a] - card_count[b] + 1
+            beaten = below - card_below[a] - card_below[b]
+            tied = len(group) - group_card[a] - group_card[b] + 1
+            result[i] = (beaten + 0.5 * tied) / compatible if compatible else 0.0
+        for i in group:
+            a, b = COMBOS[i]
+            card_below[a] += 1
+            card_below[b] += 1
+        below += len(group)
+        start = end
+    return result
+
+def _histogram_bin(value: float, bins: int) -> int:
+    return min(bins - 1, int(value * bins))
+
+def board_distributions(board: Sequence[int], bins: int = DEFAULT_BINS) -> List[Optional[EquityDistribution]]:
+    """
+    计算所有组合在给定公共牌上的胜率分布（对下一张牌的所有可能取平均）
+    河牌没有后续牌，分布退化为当前HS
+    与公共牌冲突的组合为None
+    """
+    board = list(board)
+    if len(board) >= 5:
+        runouts = [board]
+    else:
+        dead = set(board)
+        runouts = [board + [card] for card in range(52) if card not in dead]
+
+    total = [0.0] * NUM_COMBOS
+    total_sq = [0.0] * NUM_COMBOS
+    counts = [0] * NUM_COMBOS
+    histograms = [[0.0] * bins for _ in range(NUM_COMBOS)]
+    for runout in runouts:
+        for i, hs in enumerate(board_hand_strengths(runout)):
+            if hs < 0:
+                continue
+            total[i] += hs
+            total_sq[i] += hs * hs
+            counts[i] += 1
+            histograms[i][_histogram_bin(hs, bins)] += 1
+
+    result: List[Optional[EquityDistribution]] = []
+    for i in range(NUM_COMBOS):
+        if not counts[i]:
+            result.append(None)
+            continue
+        n = counts[i]
+        result.append(EquityDistribution(total[i] / n, total_sq[i] / n, [h / n for h in histograms[i]]))
+    return result
+
+def equity_distribution(hand: Hand, board: List[Card], bins: int = DEFAULT_BINS) -> EquityDistribution:
+    """计算一手牌在翻牌/转牌/河牌上的胜率分布"""
+    if len(board) < 3:
+        raise ValueError("Equity distribution needs at least a flop")
+    a, b = (card.to_int() for card in hand.cards)
+    board_ints = [card.to_int() for card in board]
+    dead = set(board_ints) | {a, b}
+    runouts = [board_ints] if len(board_ints) >= 5 else [
+        board_ints + [card] for card in range(52) if card not in dead
+    ]
+    values = [board_hand_strengths(runout)[COMBO_INDEX[(a, b)]] for runout in runouts]
+    histogram = [0.0] * bins
+    for value in values:
+        histogram[_histogram_bin(value, bins)] += 1.0 / len(values)
+    return EquityDistribution(
+        sum(values) / len(values),
+        sum(v * v for v in values) / len(values),
+        histogram
+    )
+
+def preflop_distributions(num_flops: int = 200, bins: int = DEFAULT_BINS,
+                          rng: Optional[RandomStream] = None) -> List[EquityDistribution]:
+    """
+    翻前：在随机抽取的翻牌上统计每个组合的翻牌HS分布，再按169类起手牌合并
+    """
+    rng = rng or RandomStream(0)
+    class_values: Dict[str, List[float]] = {}
+    for _ in range(num_flops):
+        flop = rng.sample(range(52), 3)
+        for i, hs in enumerate(board_hand_strengths(flop)):
+            if hs >= 0:
+                class_values.setdefault(hand_class(i), []).append(hs)
+    by_class = {}
+    for name, values in class_values.items():
+        histogram = [0.0] * bins
+        for value in values:
+            histogram[_histogram_bin(value, bins)] += 1.0 / len(values)
+        by_class[name] = EquityDistribution(
+            sum(values) / len(values), sum(v * v for v in values) / len(values), histogram
+        )
+    return [by_class[hand_class(i)] for i in range(NUM_COMBOS)]
+
+# ----------------------------------------------------------------------
+# k-means分桶
+# ----------------------------------------------------------------------
+
+def _distance(a: Sequence[float], b: Sequence[float]) -> float:
+    return sum((x - y) * (x - y) for x, y in zip(a, b))
+
+def nearest_centroid(point: Sequence[float], centroids: Sequence[Sequence[float]]) -> int:
+    """最近的中心点编号"""
+    best, best_distance = 0, float('inf')
+    for k, centroid in enumerate(centroids):
+        distance = _distance(point, centroid)
+        if distance < best_distance:
+            best, best_distance = k, distance
+    return best
+
+def kmeans(points: List[List[float]], k: int, iterations: int = 25,
+           rng: Optional[RandomStream] = None) -> List[List[float]]:
+    """
+    k-means聚类（k-means++初始化），返回按E[HS]排序的中心点
+    直方图的各区间按从弱到强排列，因此中心点按加权平均区间排序
+    """
+    rng = rng or RandomStream(0)
+    if len(points) <= k:
+        centroids = [list(p) for p in points]
+    else:
+        centroids = [list(rng.choice(points))]
+        distances = [_distance(p, centroids[0]) for p in points]
+        while len(centroids) < k:
+            total = sum(distances)
+            if total <= 0:
+                break
+            target = rng.random() * total
+            for p, d in zip(points, distances):
+                target -= d
+                if target <= 0:
+                    break
+            centroids.append(list(p))
+            distances = [min(d, _distance(q, p)) for q, d in zip(points, distances)]
+
+    dims = len(points[0])
+    for _ in range(iterations):
+        sums = [[0.0] * dims for _ in centroids]
+        counts = [0] * len(centroids)
+        for p in points:
+            c = nearest_centroid(p, centroids)
+            counts[c] += 1
+            row = sums[c]
+            for d in range(dims):
+                row[d] += p[d]
+        updated = [
+            [v / counts[c] for v in sums[c]] if counts[c] else centroids[c]
+            for c in range(len(centroids))
+        ]
+        if updated == centroids:
+            break
+        centroids = updated
+    return sorted(centroids, key=lambda c: sum(i * v for i, v in enumerate(c)))
+
+# ----------------------------------------------------------------------
+# 分桶表
+# 头部: 魔数(4) 版本 阶段编号 桶数 区间数 (uint16) 条目数(uint32)
+# 中心点: float32[桶数][区间数]
+# 条目: uint8桶编号，UNBUILT表示未计算
+# 翻前条目按组合编号；翻牌条目按 规范翻牌编号 * 1326 + 映射后的组合编号
+# ----------------------------------------------------------------------
+
+MAGIC = b'HSBK'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHHHI')
+UNBUILT = 255
+# 每张表缓存的现场计算公共牌数
+LIVE_CACHE_SIZE = 64
+STAGES: List[Stage] = list(Stage)
+
+class BucketTable:
+    """
+    单个阶段的分桶表，文件通过mmap只读映射
+    """
+
+    def __init__(self, stage: Stage, centroids: List[List[float]], entries, bins: int):
+        self.stage = stage
+        self.centroids = centroids
+        self.entries = entries
+        self.bins = bins
+        # 现场计算的公共牌 -> 所有组合的桶编号
+        self._live: Dict[Tuple[int, ...], bytes] = {}
+        self._fingerprint: Optional[str] = None
+
+    @property
+    def num_buckets(self) -> int:
+        return len(self.centroids)
+
+    @property
+    def fingerprint(self) -> str:
+        """表内容（格式版本、中心点和条目）的摘要，内容相同的表摘要相同，首次访问时计算"""
+        if self._fingerprint is None:
+            self._fingerprint = hashlib.blake2b(self.to_bytes(), digest_size=16).hexdigest()
+        return self._fingerprint
+
+    def entry_index(self, hand: Hand, board: List[Card]) -> int:
+        """某手牌和公共牌在表中的下标"""
+        a, b = (card.to_int() for card in hand.cards)
+        if self.stage == Stage.PREFLOP:
+            return COMBO_INDEX[(a, b)]
+        flop, perm = canonicalize_flop([card.to_int() for card in board[:3]])
+        mapped = COMBO_INDEX[((a & ~3) | perm[a & 3], (b & ~3) | perm[b & 3])]
+        return flop_index()[flop] * NUM_COMBOS + mapped
+
+    def bucket(self, hand: Hand, board: List[Card]) -> int:
+        """
+        查询手牌所属的桶；表中没有的条目（转牌、河牌和未构建的翻牌）现场计算
+        现场计算一次得到该公共牌上所有组合的桶并缓存：转牌约46×1081次评估（约0.3秒），
+        河牌约1081次，之后同一公共牌上的查询不再评估
+        """
+        if self.stage in (Stage.PREFLOP, Stage.FLOP):
+            value = self.entries[self.entry_index(hand, board)]
+            if value != UNBUILT:
+                return value
+        a, b = (card.to_int() for card in hand.cards)
+        return self.live_buckets([card.to_int() for card in board])[COMBO_INDEX[(a, b)]]
+
+    def live_buckets(self, board: Sequence[int]) -> bytes:
+        """现场计算公共牌上每个组合的桶编号（与公共牌冲突的组合为UNBUILT），按公共牌缓存"""
+        key = tuple(sorted(board))
+        assignments = self._live.get(key)
+        if assignments is None:
+            assignments = bytes(
+                UNBUILT if d is None else nearest_centroid(d.histogram, self.centroids)
+                for d in board_distributions(key, self.bins)
+            )
+            if len(self._live) >= LIVE_CACHE_SIZE:
+                self._live.clear()
+            self._live[key] = assignments
+        return assignments
+
+    def to_bytes(self) -> bytes:
+        """序列化为文件格式"""
+        header = HEADER.pack(
+            MAGIC, FORMAT_VERSION, STAGES.index(self.stage), self.num_buckets,
+            self.bins, len(self.entries)
+        )
+        centroids = array('f', [v for centroid in self.centroids for v in centroid]).tobytes()
+        return header + centroids + bytes(self.entries)
+
+    def save(self, path: str) -> None:
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(self.to_bytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_buffer(cls, buffer) -> 'BucketTable':
+        """从已映射的数据创建，条目直接引用该内存（零拷贝）"""
+        magic, version, stage, num_buckets, bins, num_entries = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Unsupported bucket table")
+        floats = array('f')
+        floats.frombytes(buffer[HEADER.size:HEADER.size + 4 * num_buckets * bins])
+        centroids = [list(floats[k * bins:(k + 1) * bins]) for k in range(num_buckets)]
+        start = HEADER.size + 4 * num_buckets * bins
+        return cls(STAGES[stage], centroids, memoryview(buffer)[start:start + num_entries], bins)
+
+    @classmethod
+    def load(cls, path: str) -> 'BucketTable':
+        """映射分桶表文件，条目直接从共享页读取"""
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls.from_buffer(mm)
+
+    @classmethod
+    def default(cls, stage: Stage) -> 'BucketTable':
+        """
+        默认的翻前/翻牌分桶表，由TableManager缓存
+        翻牌表需要对全部1755个翻牌计算分布，必须先用python -m src.engine.tables flop_buckets预构建
+        :raises RuntimeError: 翻牌表还没有构建
+        """
+        if stage not in (Stage.PREFLOP, Stage.FLOP):
+            raise ValueError("Default bucket tables exist for preflop and flop only")
+        return cls.from_buffer(get_table(f"{stage.value.lower()}_buckets"))
+
+def _flop_assignments(args) -> Tuple[int, bytes]:
+    """计算一个规范翻牌上所有组合的桶编号（供进程池调用）"""
+    flop_id, centroids, bins = args
+    distributions = board_distributions(canonical_flops()[flop_id], bins)
+    return flop_id, bytes(
+        UNBUILT if d is None else nearest_centroid(d.histogram, centroids)
+        for d in distributions
+    )
+
+class BucketTableBuilder:
+    """
+    预计算各阶段的分桶表
+    """
+
+    def __init__(self, bins: int = DEFAULT_BINS, seed: int = 0):
+        self.bins = bins
+        self.rng = RandomStream(seed)
+
+    def build_preflop(self, num_buckets: int = 8, num_flops: int = 200) -> BucketTable:
+        """翻前：169类起手牌按翻牌HS分布聚类"""
+        distributions = preflop_distributions(num_flops, self.bins, self.rng)
+        classes = {}
+        for i, d in enumerate(distributions):
+            classes.setdefault(hand_class(i), d.histogram)
+        centroids = kmeans(list(classes.values()), num_buckets, rng=self.rng)
+        entries = bytearray(nearest_centroid(d.histogram, centroids) for d in distributions)
+        return BucketTable(Stage.PREFLOP, centroids, entries, self.bins)
+
+    def build_flop(
+        self,
+        num_buckets: int = 16,
+        flop_ids: Optional[Sequence[int]] = None,
+        sample_flops: int = 20,
+        max_points: int = 4000,
+        workers: int = 1
+    ) -> BucketTable:
+        """
+        翻牌：先在抽样翻牌上拟合中心点，再为每个规范翻牌的所有组合分配桶
+        :param flop_ids: 需要计算的规范翻牌编号，默认全部1755个
+        :param sample_flops: 拟合中心点用的翻牌数
+        :param max_points: 拟合中心点用的最多样本点数
+        """
+        all_flops = canonical_flops()
+        flop_ids = list(range(len(all_flops))) if flop_ids is None else list(flop_ids)
+        points = []
+        for flop_id in self.rng.sample(range(len(all_flops)), sample_flops):
+            points.extend(
+                d.histogram for d in board_distributions(all_flops[flop_id], self.bins) if d
+            )
+        if len(points) > max_points:
+            points = self.rng.sample(points, max_points)
+        centroids = kmeans(points, num_buckets, rng=self.rng)
+
+        entries = bytearray([UNBUILT]) * (len(all_flops) * NUM_COMBOS)
+        tasks = [(flop_id, centroids, self.bins) for flop_id in flop_ids]
+        if workers > 1:
+            from multiprocessing import Pool
+            with Pool(workers) as pool:
+                results = pool.imap_unordered(_flop_assignments, tasks)
+                for flop_id, assignments in results:
+                    entries[flop_id * NUM_COMBOS:(flop_id + 1) * NUM_COMBOS] = assignments
+        else:
+            for task in tasks:
+                flop_id, assignments = _flop_assignments(task)
+                entries[flop_id * NUM_COMBOS:(flop_id + 1) * NUM_COMBOS] = assignments
+        return BucketTable(Stage.FLOP, centroids, entries, self.bins)
+
+    def build_street(self, stage: Stage, boards: Sequence[Sequence[int]], num_buckets: int = 16) -> BucketTable:
+        """
+        转牌/河牌：只保存中心点（条目太多），查询时按现场分布取最近中心点
+        :param boards: 拟合中心点用的公共牌样本
+        """
+        points = []
+        for board in boards:
+            points.extend(d.histogram for d in board_distributions(board, self.bins) if d)
+        centroids = kmeans(points, num_buckets, rng=self.rng)
+        return BucketTable(stage, centroids, bytearray(), self.bins)
+
+register_table('preflop_buckets', lambda: BucketTableBuilder().build_preflop().to_bytes())
+# 翻牌表要为全部1755个翻牌计算分布（单进程数小时），只能显式预构建
+register_table(
+    'flop_buckets',
+    lambda: BucketTableBuilder().build_flop(workers=os.cpu_count() or 1).to_bytes(),
+    on_demand=False
+)
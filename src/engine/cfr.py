@@ -0,0 +1,584 @@
+"""
+Counterfactual regret minimization solver for heads-up turn/river subgames
+单挑转牌/河牌子博弈的反事实遗憾最小化(CFR+/DCFR)求解器
+"""
+
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+from ..core.card import Card
+from ..utils.constants import Action, STANDARD_POSTFLOP_BETS
+from .fast_evaluator import FastEvaluator
+from .ranges import COMBOS, HandRange, combo_index
+from .rng import RandomStream
+
+# 节点类型
+DECISION = 0
+FOLD = 1
+SHOWDOWN = 2
+CHANCE = 3
+
+@dataclass
+class SolverConfig:
+    """
+    求解器配置（行动抽象和算法参数）
+    """
+    bet_sizes: Dict[str, float] = field(default_factory=lambda: dict(STANDARD_POSTFLOP_BETS))
+    raise_sizes: Dict[str, float] = field(
+        default_factory=lambda: {"STANDARD": STANDARD_POSTFLOP_BETS["STANDARD"]}
+    )
+    # 转牌求解时河牌使用的下注尺度（缩小树的规模）
+    river_bet_sizes: Dict[str, float] = field(
+        default_factory=lambda: {"STANDARD": STANDARD_POSTFLOP_BETS["STANDARD"]}
+    )
+    max_raises: int = 1          # 每条街下注之后最多再加注的次数
+    algorithm: str = "dcfr"      # "dcfr" 或 "cfr+"
+    alpha: float = 1.5           # DCFR正遗憾折扣
+    beta: float = 0.0            # DCFR负遗憾折扣
+    gamma: float = 2.0           # DCFR平均策略折扣
+
+class SubgameSolver:
+    """
+    单挑子博弈求解器
+    遗憾值和策略累积存放在扁平数组中，下标为 节点偏移 + 行动 * 组合数 + 组合
+    玩家0为不利位置(OOP)，玩家1为有利位置(IP)
+    """
+
+    def __init__(
+        self,
+        board: List[Card],
+        oop_range: HandRange,
+        ip_range: HandRange,
+        pot: int,
+        stack: int,
+        config: Optional[SolverConfig] = None,
+        seed: Optional[int] = None
+    ):
+        if len(board) not in (4, 5):
+            raise ValueError("Subgame solver needs a turn or river board")
+        self.config = config or SolverConfig()
+        self.board = [card.to_int() for card in board]
+        self.pot = pot
+        self.stack = stack
+        self.rng = RandomStream(seed)
+        self.iteration = 0
+
+        # 去掉与公共牌冲突的组合
+        self.range_index: List[List[int]] = []
+        self.reach: List[List[float]] = []
+        for hand_range in (oop_range, ip_range):
+            filtered = hand_range.remove_cards(self.board)
+            indices = filtered.combos()
+            self.range_index.append(indices)
+            self.reach.append([filtered.weights[i] for i in indices])
+        if not self.range_index[0] or not self.range_index[1]:
+            raise ValueError("Both ranges need at least one combo compatible with the board")
+        self.cards = [[COMBOS[i] for i in indices] for indices in self.range_index]
+        self.num_combos = [len(indices) for indices in self.range_index]
+
+        # 对方范围中相同组合的位置（用于阻断牌修正）
+        self.same: List[List[int]] = []
+        for p in (0, 1):
+            lookup = {index: j for j, index in enumerate(self.range_index[1 - p])}
+            self.same.append([lookup.get(index, -1) for index in self.range_index[p]])
+
+        self.deck = [c for c in range(52) if c not in self.board]
+        self._showdown_cache: Dict[int, tuple] = {}
+
+        # 扁平的博弈树
+        self.kind: List[int] = []
+        self.player: List[int] = []
+        self.invested: List[Tuple[int, int]] = []
+        self.river_card: List[int] = []
+        self.children: List[List[int]] = []
+        self.labels: List[List[str]] = []
+        self.amounts: List[List[int]] = []
+        self.offset: List[int] = []
+        self._size = 0
+        is_turn = len(self.board) == 4
+        self.root = self._build_street((0, 0), -1, is_turn)
+        self.regrets = array('d', bytes(8 * self._size))
+        self.strategy_sum = array('d', bytes(8 * self._size))
+
+    # ------------------------------------------------------------------
+    # 建树
+    # ------------------------------------------------------------------
+
+    def _new_node(self, kind: int, player: int, invested: Tuple[int, int], river_card: int) -> int:
+        node = len(self.kind)
+        self.kind.append(kind)
+        self.player.append(player)
+        self.invested.append(invested)
+        self.river_card.append(river_card)
+        self.children.append([])
+        self.labels.append([])
+        self.amounts.append([])
+        self.offset.append(-1)
+        return node
+
+    def _build_street(self, invested: Tuple[int, int], river_card: int, is_turn: bool) -> int:
+        """新一条街：双方本街投入为0，OOP先行动"""
+        if self.stack - max(invested) <= 0:
+            return self._close_street(invested, river_card, is_turn)
+        return self._build_decision(
+            invested, (0, 0), 0, 0, False, river_card, is_turn, self.config.bet_sizes
+        )
+
+    def _close_street(self, invested: Tuple[int, int], river_card: int, is_turn: bool) -> int:
+        """一条街结束：转牌后进入发河牌的机会节点，河牌后摊牌"""
+        if not is_turn:
+            return self._new_node(SHOWDOWN, -1, invested, river_card)
+        node = self._new_node(CHANCE, -1, invested, river_card)
+        for card in self.deck:
+            child = self._build_street_on_river(invested, card)
+            self.children[node].append(child)
+            self.labels[node].append(str(Card.from_int(card)))
+            self.amounts[node].append(card)
+        return node
+
+    def _build_street_on_river(self, invested: Tuple[int, int], card: int) -> int:
+        if self.stack - max(invested) <= 0:
+            return self._new_node(SHOWDOWN, -1, invested, card)
+        return self._build_decision(
+            invested, (0, 0), 0, 0, False, card, False, self.config.river_bet_sizes
+        )
+
+    def _bet_amounts(
+        self, sizes: Dict[str, float], pot: int, to_call: int, street_max: int,
+        actor_street: int, stack_left: int, raising: bool
+    ) -> List[Tuple[str, int]]:
+        """按底池比例计算下注/加注后本街需要补的筹码，超过筹码则全下，去重"""
+        options = []
+        seen = set()
+        for name, fraction in sorted(sizes.items(), key=lambda item: item[1]):
+            if raising:
+                raise_to = street_max + int(round(fraction * (pot + to_call)))
+                added = raise_to - actor_street
+            else:
+                added = int(round(fraction * pot))
+            added = max(added, to_call + 1)
+            if added >= stack_left:
+                continue
+            if added not in seen:
+                seen.add(added)
+                options.append((f"{Action.RAISE.value}:{name}", added))
+        if stack_left > to_call:
+            options.append((Action.ALL_IN.value, stack_left))
+        return options
+
+    def _build_decision(
+        self, invested: Tuple[int, int], street: Tuple[int, int], actor: int,
+        bets: int, checked: bool, river_card: int, is_turn: bool, sizes: Dict[str, float]
+    ) -> int:
+        node = self._new_node(DECISION, actor, invested, river_card)
+        other = 1 - actor
+        to_call = street[other] - street[actor]
+        stack_left = self.stack - invested[actor]
+        pot = self.pot + invested[0] + invested[1]
+
+        def add(label: str, amount: int, child: int):
+            self.labels[node].append(label)
+            self.amounts[node].append(amount)
+            self.children[node].append(child)
+
+        def after_bet(added: int) -> int:
+            new_invested = list(invested)
+            new_invested[actor] += added
+            new_street = list(street)
+            new_street[actor] += added
+            return self._build_decision(
+                tuple(new_invested), tuple(new_street), other, bets + 1, False,
+                river_card, is_turn, sizes
+            )
+
+        if to_call == 0:
+            if checked:
+                add(Action.CHECK.value, 0, self._close_street(invested, river_card, is_turn))
+            else:
+                add(Action.CHECK.value, 0, self._build_decision(
+                    invested, street, other, bets, True, river_card, is_turn, sizes
+                ))
+            if stack_left > 0 and bets == 0:
+                for label, added in self._bet_amounts(sizes, pot, 0, 0, 0, stack_left, False):
+                    add(label, added, after_bet(added))
+        else:
+            folder = self._new_node(FOLD, actor, invested, river_card)
+            add(Action.FOLD.value, 0, folder)
+            call = min(to_call, stack_left)
+            called = list(invested)
+            called[actor] += call
+            add(Action.CALL.value, call, self._close_street(tuple(called), river_card, is_turn))
+            opponent_left = self.stack - invested[other]
+            if bets <= self.config.max_raises and stack_left > to_call and opponent_left > 0:
+                # 转牌求解中的河牌只保留全下加注
+                raise_sizes = self.config.raise_sizes if sizes is self.config.bet_sizes else {}
+                options = self._bet_amounts(
+                    raise_sizes, pot, to_call, street[other], street[actor], stack_left, True
+                )
+                for label, added in options:
+                    add(label, added, after_bet(added))
+
+        self.offset[node] = self._size
+        self._size += len(self.children[node]) * self.num_combos[actor]
+        return node
+
+    # ------------------------------------------------------------------
+    # 摊牌/弃牌的向量化计算
+    # ------------------------------------------------------------------
+
+    def _showdown_data(self, river_card: int) -> tuple:
+        """
+        计算某张河牌下双方每个组合的牌力及按牌力排序的顺序
+        与河牌冲突的组合牌力记为-1
+        """
+        data = self._showdown_cache.get(river_card)
+        if data is not None:
+            return data
+        board = self.board if river_card < 0 else self.board + [river_card]
+        evaluate = FastEvaluator.evaluate
+        strengths = []
+        orders = []
+        for p in (0, 1):
+            values = [
+                -1 if river_card in (a, b) else evaluate([a, b] + board)
+                for a, b in self.cards[p]
+            ]
+            strengths.append(values)
+            orders.append(sorted(range(len(values)), key=values.__getitem__))
+        data = (strengths, orders)
+        self._showdown_cache[river_card] = data
+        return data
+
+    def _opponent_mass(self, p: int, reach_opp: Sequence[float]) -> Tuple[float, List[float]]:
+        """对手范围的总权重及每张牌上的权重"""
+        total = 0.0
+        card_sum = [0.0] * 52
+        for (a, b), weight in zip(self.cards[1 - p], reach_opp):
+            if weight:
+                total += weight
+                card_sum[a] += weight
+                card_sum[b] += weight
+        return total, card_sum
+
+    def _fold_values(self, p: int, reach_opp: Sequence[float], payoff: float, river_card: int) -> List[float]:
+        """弃牌节点：每个组合的价值 = 收益 * 不冲突的对手权重"""
+        total, card_sum = self._opponent_mass(p, reach_opp)
+        same = self.same[p]
+        values = []
+        for i, (a, b) in enumerate(self.cards[p]):
+            if a == river_card or b == river_card:
+                values.append(0.0)
+                continue
+            mass = total - card_sum[a] - card_sum[b]
+            if same[i] >= 0:
+                mass += reach_opp[same[i]]
+            values.append(payoff * mass)
+        return values
+
+    def _showdown_values(
+        self, p: int, reach_opp: Sequence[float], win: float, lose: float, tie: float, river_card: int
+    ) -> List[float]:
+        """
+        摊牌节点：按牌力排序后扫描，用每张牌上的累计权重扣除阻断组合
+        复杂度O(n log n)而不是O(n*m)
+        """
+        strengths, orders = self._showdown_data(river_card)
+        my_strength, opp_strength = strengths[p], strengths[1 - p]
+        my_order, opp_order = orders[p], orders[1 - p]
+        my_cards, opp_cards = self.cards[p], self.cards[1 - p]
+        n = len(my_cards)
+        beaten = [0.0] * n
+        losing = [0.0] * n
+
+        # 从弱到强：累计严格弱于当前组合的对手权重
+        below = 0.0
+        card_below = [0.0] * 52
+        j = 0
+        m = len(opp_order)
+        for i in my_order:
+            s = my_strength[i]
+            if s < 0:
+                continue
+            while j < m and opp_strength[opp_order[j]] < s:
+                k = opp_order[j]
+                weight = reach_opp[k]
+                if weight and opp_strength[k] >= 0:
+                    a, b = opp_cards[k]
+                    below += weight
+                    card_below[a] += weight
+                    card_below[b] += weight
+                j += 1
+            a, b = my_cards[i]
+            beaten[i] = below - card_below[a] - card_below[b]
+
+        # 从强到弱：累计严格强于当前组合的对手权重
+        above = 0.0
+        card_above = [0.0] * 52
+        j = m - 1
+        for i in reversed(my_order):
+            s = my_strength[i]
+            if s < 0:
+                continue
+            while j >= 0 and opp_strength[opp_order[j]] > s:
+                k = opp_order[j]
+                weight = reach_opp[k]
+                if weight:
+                    a, b = opp_cards[k]
+                    above += weight
+                    card_above[a] += weight
+                    card_above[b] += weight
+                j -= 1
+            a, b = my_cards[i]
+            losing[i] = above - card_above[a] - card_above[b]
+
+        # 平局 = 全部不冲突权重 - 赢 - 输
+        total = 0.0
+        card_sum = [0.0] * 52
+        for k, weight in enumerate(reach_opp):
+            if weight and opp_strength[k] >= 0:
+                a, b = opp_cards[k]
+                total += weight
+                card_sum[a] += weight
+                card_sum[b] += weight
+        same = self.same[p]
+        values = [0.0] * n
+        for i in range(n):
+            if my_strength[i] < 0:
+                continue
+            a, b = my_cards[i]
+            mass = total - card_sum[a] - card_sum[b]
+            if same[i] >= 0 and opp_strength[same[i]] >= 0:
+                mass += reach_opp[same[i]]
+            tied = mass - beaten[i] - losing[i]
+            values[i] = win * beaten[i] + lose * losing[i] + tie * tied
+        return values
+
+    def _terminal_values(self, node: int, p: int, reach_opp: Sequence[float]) -> List[float]:
+        invested = self.invested[node]
+        river_card = self.river_card[node]
+        if self.kind[node] == FOLD:
+            folder = self.player[node]
+            payoff = -invested[p] if folder == p else self.pot + invested[folder]
+            return self._fold_values(p, reach_opp, payoff, river_card)
+        return self._showdown_values(
+            p, reach_opp, self.pot + invested[1 - p], -invested[p], self.pot / 2, river_card
+        )
+
+    # ------------------------------------------------------------------
+    # CFR迭代
+    # ------------------------------------------------------------------
+
+    def _current_strategy(self, node: int) -> List[List[float]]:
+        """遗憾匹配得到当前策略，返回[行动][组合]"""
+        actor = self.player[node]
+        n = self.num_combos[actor]
+        num_actions = len(self.children[node])
+        base = self.offset[node]
+        regrets = self.regrets
+        rows = [
+            [r if r > 0 else 0.0 for r in regrets[base + a * n: base + (a + 1) * n]]
+            for a in range(num_actions)
+        ]
+        totals = [sum(column) for column in zip(*rows)]
+        uniform = 1.0 / num_actions
+        return [
+            [row[i] / totals[i] if totals[i] > 0 else uniform for i in range(n)]
+            for row in rows
+        ]
+
+    def _chance_children(self, node: int) -> List[int]:
+        """机会节点：每次迭代只抽取一张河牌（公共机会采样）"""
+        return [self.rng.randrange(len(self.children[node]))]
+
+    def _cfr(self, node: int, p: int, reach_self: List[float], reach_opp: List[float]) -> List[float]:
+        kind = self.kind[node]
+        if kind == FOLD or kind == SHOWDOWN:
+            return self._terminal_values(node, p, reach_opp)
+
+        if kind == CHANCE:
+            k = self._chance_children(node)[0]
+            child = self.children[node][k]
+            card = self.amounts[node][k]
+            reach_self = [0.0 if card in c else r for c, r in zip(self.cards[p], reach_self)]
+            reach_opp = [0.0 if card in c else r for c, r in zip(self.cards[1 - p], reach_opp)]
+            scale = len(self.deck) / (len(self.deck) - 4)
+            return [v * scale for v in self._cfr(child, p, reach_self, reach_opp)]
+
+        actor = self.player[node]
+        strategy = self._current_strategy(node)
+        children = self.children[node]
+
+        if actor != p:
+            values = [0.0] * self.num_combos[p]
+            for a, child in enumerate(children):
+                child_reach = [r * s for r, s in zip(reach_opp, strategy[a])]
+                for i, v in enumerate(self._cfr(child, p, reach_self, child_reach)):
+                    values[i] += v
+            return values
+
+        n = self.num_combos[p]
+        child_values = [
+            self._cfr(child, p, [r * s for r, s in zip(reach_self, strategy[a])], reach_opp)
+            for a, child in enumerate(children)
+        ]
+        values = [0.0] * n
+        for a in range(len(children)):
+            row, sv = strategy[a], child_values[a]
+            for i in range(n):
+                values[i] += row[i] * sv[i]
+
+        # 更新遗憾值与平均策略
+        t = self.iteration
+        config = self.config
+        base = self.offset[node]
+        regrets = self.regrets
+        strategy_sum = self.strategy_sum
+        plus = config.algorithm == "cfr+"
+        if plus:
+            # CFR+：遗憾值截断为非负，平均策略按迭代次数线性加权
+            positive_discount = negative_discount = strategy_discount = 1.0
+            strategy_weight = float(t)
+        else:
+            # DCFR：正/负遗憾和平均策略分别按迭代次数折扣
+            positive_discount = t ** config.alpha / (t ** config.alpha + 1)
+            negative_discount = t ** config.beta / (t ** config.beta + 1)
+            strategy_discount = (t / (t + 1)) ** config.gamma
+            strategy_weight = 1.0
+        for a in range(len(children)):
+            row, sv = strategy[a], child_values[a]
+            start = base + a * n
+            for i in range(n):
+                r = regrets[start + i]
+                r = r * (positive_discount if r > 0 else negative_discount) + sv[i] - values[i]
+                regrets[start + i] = 0.0 if plus and r < 0 else r
+                strategy_sum[start + i] = (
+                    strategy_sum[start + i] * strategy_discount + strategy_weight * reach_self[i] * row[i]
+                )
+        return values
+
+    def solve(self, iterations: int = 200) -> 'SubgameSolution':
+        """
+        运行CFR迭代
+        :param iterations: 迭代次数（每次迭代双方各更新一遍）
+        """
+        for _ in range(iterations):
+            self.iteration += 1
+            for p in (0, 1):
+                self._cfr(self.root, p, list(self.reach[p]), list(self.reach[1 - p]))
+        return SubgameSolution(self)
+
+    # ------------------------------------------------------------------
+    # 平均策略与可剥削度
+    # ------------------------------------------------------------------
+
+    def average_strategy(self, node: int) -> List[List[float]]:
+        """某个决策节点的平均策略，返回[行动][组合]"""
+        actor = self.player[node]
+        n = self.num_combos[actor]
+        num_actions = len(self.children[node])
+        base = self.offset[node]
+        rows = [list(self.strategy_sum[base + a * n: base + (a + 1) * n]) for a in range(num_actions)]
+        totals = [sum(column) for column in zip(*rows)]
+        uniform = 1.0 / num_actions
+        return [
+            [row[i] / totals[i] if totals[i] > 0 else uniform for i in range(n)]
+            for row in rows
+        ]
+
+    def _best_response(self, node: int, p: int, reach_opp: List[float]) -> List[float]:
+        kind = self.kind[node]
+        if kind == FOLD or kind == SHOWDOWN:
+            return self._terminal_values(node, p, reach_opp)
+        if kind == CHANCE:
+            values = [0.0] * self.num_combos[p]
+            for child, card in zip(self.children[node], self.amounts[node]):
+                child_reach = [0.0 if card in c else r for c, r in zip(self.cards[1 - p], reach_opp)]
+                for i, v in enumerate(self._best_response(child, p, child_reach)):
+                    values[i] += v
+            scale = 1.0 / (len(self.deck) - 4)
+            return [v * scale for v in values]
+        children = self.children[node]
+        if self.player[node] != p:
+            strategy = self.average_strategy(node)
+            values = [0.0] * self.num_combos[p]
+            for a, child in enumerate(children):
+                child_reach = [r * s for r, s in zip(reach_opp, strategy[a])]
+                for i, v in enumerate(self._best_response(child, p, child_reach)):
+                    values[i] += v
+            return values
+        child_values = [self._best_response(child, p, reach_opp) for child in children]
+        return [max(column) for column in zip(*child_values)]
+
+    def exploitability(self) -> float:
+        """
+        平均策略的可剥削度（筹码，双方最佳应对收益之和减去底池后取平均）
+        转牌子博弈需要遍历所有河牌，耗时较长
+        """
+        total = 0.0
+        for p in (0, 1):
+            values = self._best_response(self.root, p, list(self.reach[1 - p]))
+            weighted = sum(r * v for r, v in zip(self.reach[p], values))
+            # 归一化：双方不冲突组合对的总权重
+            reach_opp = self.reach[1 - p]
+            mass_total, card_sum = self._opponent_mass(p, reach_opp)
+            pairs = 0.0
+            for i, ((a, b), r) in enumerate(zip(self.cards[p], self.reach[p])):
+                mass = mass_total - card_sum[a] - card_sum[b]
+                if self.same[p][i] >= 0:
+                    mass += reach_opp[self.same[p][i]]
+                pairs += r * mass
+            total += weighted / pairs if pairs else 0.0
+        return (total - self.pot) / 2
+
+class SubgameSolution:
+    """
+    求解结果：按行动序列查询某个组合的策略
+    """
+
+    def __init__(self, solver: SubgameSolver):
+        self.solver = solver
+
+    def find_node(self, history: Sequence[str]) -> int:
+        """
+        根据行动标签序列找到节点
+        :param history: 如['CHECK', 'RAISE:STANDARD']，转牌求解时河牌用牌面字符串表示如'Ah'
+        """
+        solver = self.solver
+        node = solver.root
+        for label in history:
+            try:
+                node = solver.children[node][solver.labels[node].index(label)]
+            except ValueError:
+                raise ValueError(f"Action {label} not available at this node")
+        return node
+
+    def actions(self, history: Sequence[str] = ()) -> List[Tuple[str, int]]:
+        """某节点可选的(行动标签, 本次投入筹码)"""
+        node = self.find_node(history)
+        return list(zip(self.solver.labels[node], self.solver.amounts[node]))
+
+    def strategy(self, history: Sequence[str], card1: Card, card2: Card) -> Dict[str, float]:
+        """
+        查询某个组合在某节点的平均策略
+        :return: 行动标签 -> 频率
+        """
+        solver = self.solver
+        node = self.find_node(history)
+        if solver.kind[node] != DECISION:
+            raise ValueError("History does not end at a decision node")
+        actor = solver.player[node]
+        index = combo_index(card1.to_int(), card2.to_int())
+        try:
+            i = solver.range_index[actor].index(index)
+        except ValueError:
+            raise ValueError("Combo is not in the acting player's range")
+        strategy = solver.average_strategy(node)
+        return {label: strategy[a][i] for a, label in enumerate(solver.labels[node])}
+
+    def acting_player(self, history: Sequence[str]) -> int:
+        """某节点行动的玩家(0=OOP, 1=IP)"""
+        return self.solver.player[self.find_node(history)]
+
+    def exploitability(self) -> float:
+        """平均策略的可剥削度（筹码）"""
+        return self.solver.exploitability()
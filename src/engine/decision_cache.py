@@ -0,0 +1,199 @@
+"""
+Memoized decisions keyed by canonical game state
+按规范化游戏状态缓存决策结果
+"""
+
+import math
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+from ..core.game_state import GameState
+from ..utils.constants import (
+    Stage, POSITION_WEIGHTS_6MAX, POSITION_CONTINUE_FRACTIONS,
+    STANDARD_PREFLOP_RAISES, STANDARD_POSTFLOP_BETS
+)
+from .advisor import Decision
+from .flop_db import SUIT_PERMUTATIONS
+from .ranges import hand_class, hand_to_combo
+
+# 跟注额占(底池+跟注额)比例的量化档数
+POT_ODDS_BUCKETS = 50
+# 筹码底池比按log2量化，每档半个2的幂
+SPR_BUCKETS_PER_DOUBLING = 2
+SPR_MAX_BUCKET = 16
+# 命中时的理由：原理由中的胜率、赔率和金额来自首次计算的状态，不能照搬
+CACHE_HIT_REASON = "决策缓存命中：沿用同一规范状态的动作、金额比例和确信度，未按当前底池重新计算"
+
+def strategy_version() -> int:
+    """
+    策略配置的版本号：下注尺度、位置权重等常量的哈希，任何一项变化都会使缓存失效
+    """
+    config = (
+        tuple(sorted(STANDARD_PREFLOP_RAISES.items())),
+        tuple(sorted(STANDARD_POSTFLOP_BETS.items())),
+        tuple(sorted((pos.value, weight) for pos, weight in POSITION_WEIGHTS_6MAX.items())),
+        tuple(sorted((pos.value, fraction) for pos, fraction in POSITION_CONTINUE_FRACTIONS.items())),
+    )
+    return hash(config)
+
+def canonical_cards(hole, board) -> Tuple:
+    """
+    手牌和公共牌在24种花色置换下的规范形式（字典序最小的(公共牌, 手牌)排序元组）
+    """
+    best = None
+    for perm in SUIT_PERMUTATIONS:
+        mapped = (
+            tuple(sorted(((c & ~3) | perm[c & 3] for c in board), reverse=True)),
+            tuple(sorted(((c & ~3) | perm[c & 3] for c in hole), reverse=True)),
+        )
+        if best is None or mapped < best:
+            best = mapped
+    return best
+
+def canonical_key(game_state: GameState) -> Tuple:
+    """
+    把GameState量化为规范键：
+    翻前用169类起手牌，翻后用花色规范化的(公共牌, 手牌)；
+    加上位置、阶段、底池赔率档和筹码底池比档
+    """
+    stage = game_state.current_stage
+    if stage == Stage.PREFLOP:
+        cards = hand_class(hand_to_combo(game_state.my_hand))
+    else:
+        cards = canonical_cards(
+            [card.to_int() for card in game_state.my_hand.cards],
+            [card.to_int() for card in game_state.get_current_street_state().community_cards],
+        )
+    to_call = game_state.to_call
+    pot = game_state.current_pot
+    if to_call <= 0:
+        odds_bucket = -1
+    else:
+        odds_bucket = min(POT_ODDS_BUCKETS - 1, int(to_call / (pot + to_call) * POT_ODDS_BUCKETS))
+    spr = game_state.my_stack / pot if pot > 0 else float('inf')
+    if spr <= 0:
+        spr_bucket = 0
+    elif math.isinf(spr):
+        spr_bucket = SPR_MAX_BUCKET
+    else:
+        spr_bucket = max(-SPR_MAX_BUCKET, min(SPR_MAX_BUCKET, int(math.floor(math.log2(spr) * SPR_BUCKETS_PER_DOUBLING))))
+    return (cards, game_state.my_position.value, stage.value, odds_bucket, spr_bucket)
+
+def _amount_base(game_state: GameState) -> float:
+    """
+    决策金额的参照量：面对下注时是跟注额，翻后开池时是底池，翻前开池时金额是绝对值
+    缓存按参照量的比例保存金额，命中时换算回当前状态
+    """
+    if game_state.to_call > 0:
+        return game_state.to_call
+    if game_state.current_stage != Stage.PREFLOP and game_state.current_pot > 0:
+        return game_state.current_pot
+    return 1
+
+class DecisionCache:
+    """
+    决策缓存：容量有限的LRU，条目带过期时间；策略配置变化时整体失效
+    """
+
+    def __init__(self, max_size: int = 100000, ttl: Optional[float] = None):
+        """
+        :param max_size: 最多缓存的决策数，超出时淘汰最久未使用的
+        :param ttl: 条目存活秒数，None表示不过期
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version = strategy_version()
+        # 键 -> (过期时间, 动作, 金额比例, 金额是否为整数, 确信度)
+        self._entries: 'OrderedDict[Tuple, tuple]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_version(self) -> None:
+        version = strategy_version()
+        if version != self.version:
+            self.version = version
+            self._entries.clear()
+            self.invalidations += 1
+
+    def get(self, game_state: GameState, key: Optional[Tuple] = None) -> Optional[Decision]:
+        """
+        查找缓存的决策，未命中返回None
+        返回的是新建的Decision对象，修改它不影响缓存；理由只有CACHE_HIT_REASON一条
+        """
+        self._check_version()
+        key = key or canonical_key(game_state)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires, action, ratio, integral, confidence = entry
+        if expires is not None and time.monotonic() > expires:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        amount = ratio * _amount_base(game_state)
+        if integral:
+            amount = int(round(amount))
+        return Decision(action, amount, confidence, [CACHE_HIT_REASON])
+
+    def put(self, game_state: GameState, decision: Decision, key: Optional[Tuple] = None) -> None:
+        """缓存一个决策（理由中的数值只对当前状态成立，不缓存）"""
+        key = key or canonical_key(game_state)
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._entries[key] = (
+            expires,
+            decision.action,
+            decision.amount / _amount_base(game_state),
+            isinstance(decision.amount, int),
+            decision.confidence,
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute(
+        self,
+        game_state: GameState,
+        compute: Callable[[GameState], Decision],
+        context: Tuple = ()
+    ) -> Decision:
+        """
+        命中则返回缓存的决策，否则调用compute并缓存结果
+        :param context: 影响决策但不在游戏状态中的设置（如PokerAdvisor.cache_context()），并入缓存键
+        """
+        key = canonical_key(game_state) + tuple(context)
+        decision = self.get(game_state, key)
+        if decision is None:
+            decision = compute(game_state)
+            self.put(game_state, decision, key)
+        return decision
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """命中率等统计"""
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
@@ -0,0 +1,174 @@
+"""
+Differential testing of fast evaluators against HandEvaluator
+用HandEvaluator作为参照，对快速评估器做差分测试
+"""
+
+import os
+import sys
+import time
+from itertools import combinations
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from ..core.card import Card
+from .evaluator import HandEvaluator
+from .fast_evaluator import FastEvaluator
+from .rng import RandomStream
+
+CARDS = [Card.from_int(i) for i in range(52)]
+
+def reference_key(cards: Sequence[int]) -> Tuple:
+    """参照实现的可比较键：(牌型等级, 关键牌值)，比较顺序与compare_hands一致"""
+    category, values = HandEvaluator.evaluate_hand_strength([CARDS[c] for c in cards])
+    return (category, tuple(values))
+
+def _omaha_table_five(cards: Sequence[int]) -> int:
+    """奥马哈的5张牌查找表（5张牌时等价于2张手牌+3张公共牌）"""
+    from .variants import evaluate_omaha
+    return evaluate_omaha(cards[:2], cards[2:])
+
+# 被测后端：名称 -> (评估函数, 支持的牌数)
+BACKENDS: Dict[str, Tuple[Callable[[Sequence[int]], int], Tuple[int, ...]]] = {
+    'fast': (FastEvaluator.evaluate, (5, 6, 7)),
+    'omaha_table': (_omaha_table_five, (5,)),
+}
+
+# 各后端用到的查找表，在父进程构建一次后由子进程共享
+DIFFTEST_TABLES = ['five_card_ranks', 'five_card_flush']
+
+class Disagreement:
+    """一处不一致：两手牌在参照实现和被测后端中的顺序不同"""
+
+    def __init__(self, backend: str, hand1: Sequence[int], hand2: Sequence[int], reference: Tuple, actual: Tuple):
+        self.backend = backend
+        self.hand1 = list(hand1)
+        self.hand2 = list(hand2)
+        self.reference = reference  # 两手牌的参照键
+        self.actual = actual        # 两手牌的后端牌力
+
+    def __str__(self) -> str:
+        hand1 = ''.join(str(CARDS[c]) for c in self.hand1)
+        hand2 = ''.join(str(CARDS[c]) for c in self.hand2)
+        return (
+            f"[{self.backend}] {hand1} vs {hand2}: "
+            f"reference {self.reference[0]} / {self.reference[1]}, "
+            f"backend {self.actual[0]} / {self.actual[1]}"
+        )
+
+def _check_hands(backend_names: Sequence[str], hands) -> Dict[str, Tuple[Dict, Optional[tuple]]]:
+    """
+    评估一批手牌，为每个后端记录 参照键 -> (后端牌力, 示例手牌)
+    同一参照键得到不同后端牌力时立即记下第一处冲突
+    """
+    mappings: Dict[str, Dict] = {name: {} for name in backend_names}
+    conflicts: Dict[str, Optional[tuple]] = {name: None for name in backend_names}
+    evaluators = [(name, BACKENDS[name][0], mappings[name]) for name in backend_names]
+    for hand in hands:
+        key = reference_key(hand)
+        for name, evaluate, mapping in evaluators:
+            value = evaluate(hand)
+            seen = mapping.get(key)
+            if seen is None:
+                mapping[key] = (value, hand)
+            elif seen[0] != value and conflicts[name] is None:
+                conflicts[name] = (seen[1], hand, (key, key), (seen[0], value))
+    return {name: (mappings[name], conflicts[name]) for name in backend_names}
+
+def _five_card_task(args):
+    """穷举第一张牌为first的所有5张牌组合（第一张牌是组合中最小的牌）"""
+    first, backend_names = args
+    hands = ((first,) + rest for rest in combinations(range(first + 1, 52), 4))
+    return _check_hands(backend_names, hands)
+
+def _sample_task(args):
+    """随机抽样count手size张牌，随机流由(种子, 任务编号)决定"""
+    seed, index, count, size, backend_names = args
+    rng = RandomStream(seed).substream(index)
+    deck = list(range(52))
+    hands = (tuple(rng.deal(deck, size)) for _ in range(count))
+    return _check_hands(backend_names, hands)
+
+def _merge(backend_names, partials) -> Dict[str, List[Disagreement]]:
+    """
+    合并各任务的映射并检查顺序：
+    1. 同一参照键必须对应同一后端牌力（相等关系一致）
+    2. 按参照键排序后，后端牌力必须严格递增（大小关系一致）
+    """
+    mappings = {name: {} for name in backend_names}
+    failures: Dict[str, List[Disagreement]] = {name: [] for name in backend_names}
+    for partial in partials:
+        for name in backend_names:
+            mapping, conflict = partial[name]
+            if conflict is not None:
+                failures[name].append(Disagreement(name, *conflict))
+            merged = mappings[name]
+            for key, (value, hand) in mapping.items():
+                seen = merged.get(key)
+                if seen is None:
+                    merged[key] = (value, hand)
+                elif seen[0] != value:
+                    failures[name].append(Disagreement(name, seen[1], hand, (key, key), (seen[0], value)))
+    for name in backend_names:
+        ordered = sorted(mappings[name].items())
+        for (key1, (value1, hand1)), (key2, (value2, hand2)) in zip(ordered, ordered[1:]):
+            if value1 >= value2:
+                failures[name].append(Disagreement(name, hand1, hand2, (key1, key2), (value1, value2)))
+                break
+    return failures
+
+class DifferentialTester:
+    """
+    差分测试：穷举全部2,598,960手5张牌，并随机抽样6/7张牌，
+    比较各后端与参照实现给出的大小顺序（不仅是牌型）
+    """
+
+    def __init__(self, backends: Optional[Sequence[str]] = None, workers: int = 1, seed: int = 0):
+        self.backends = list(backends or BACKENDS)
+        self.workers = workers
+        self.seed = seed
+
+    def _map(self, function, tasks):
+        if self.workers > 1:
+            from .shared_tables import shared_pool
+            with shared_pool(self.workers, DIFFTEST_TABLES) as pool:
+                return pool.map(function, tasks, chunksize=1)
+        return [function(task) for task in tasks]
+
+    def check_five_card(self, first_cards: Optional[Sequence[int]] = None) -> Dict[str, List[Disagreement]]:
+        """
+        穷举5张牌
+        :param first_cards: 只检查最小牌在其中的组合（默认全部，即0-47）
+        """
+        names = [name for name in self.backends if 5 in BACKENDS[name][1]]
+        tasks = [(first, names) for first in (first_cards if first_cards is not None else range(48))]
+        return _merge(names, self._map(_five_card_task, tasks))
+
+    def check_random(self, size: int = 7, samples: int = 1000000, chunk: int = 50000) -> Dict[str, List[Disagreement]]:
+        """随机抽样size张牌"""
+        names = [name for name in self.backends if size in BACKENDS[name][1]]
+        tasks = [
+            (self.seed, index, min(chunk, samples - start), size, names)
+            for index, start in enumerate(range(0, samples, chunk))
+        ]
+        return _merge(names, self._map(_sample_task, tasks))
+
+def report(title: str, failures: Dict[str, List[Disagreement]]) -> bool:
+    """打印结果，全部一致时返回True"""
+    ok = True
+    for name, items in failures.items():
+        if items:
+            ok = False
+            print(f"{title} [{name}] FAILED ({len(items)} disagreements), first: {items[0]}")
+        else:
+            print(f"{title} [{name}] OK")
+    return ok
+
+if __name__ == '__main__':
+    # python -m src.engine.difftest [进程数] [7张牌抽样数]
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1
+    samples = int(sys.argv[2]) if len(sys.argv) > 2 else 1000000
+    tester = DifferentialTester(workers=workers)
+    start = time.time()
+    ok = report("5-card exhaustive", tester.check_five_card())
+    ok = report("6-card random", tester.check_random(6, samples // 2)) and ok
+    ok = report("7-card random", tester.check_random(7, samples)) and ok
+    print(f"Elapsed {time.time() - start:.1f}s")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,346 @@
+"""
+Coordinator/worker protocol for distributing simulations over TCP
+基于TCP的分布式模拟任务分发（协调者/工作者）
+"""
+
+import hashlib
+import hmac
+import ipaddress
+import json
+import os
+import queue
+import socket
+import struct
+import sys
+import threading
+import time
+from fractions import Fraction
+from typing import Callable, Dict, List, Optional, Tuple
+from ..core.card import Card, Hand
+from .evaluator import EquityCalculator
+from .rng import RandomStream
+
+# 消息格式: 4字节大端长度 + UTF-8 JSON
+LENGTH = struct.Struct('>I')
+MAX_MESSAGE = 64 * 1024 * 1024
+# 连接后完成握手的最长秒数
+HANDSHAKE_TIMEOUT = 10.0
+# 命令行工作者读取共享令牌的环境变量（不放在命令行参数里，避免被ps看到）
+TOKEN_ENV = 'POKER_ADVISOR_TOKEN'
+
+def send_message(sock: socket.socket, message: dict) -> None:
+    payload = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    sock.sendall(LENGTH.pack(len(payload)) + payload)
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed")
+        data += chunk
+    return bytes(data)
+
+def recv_message(sock: socket.socket) -> dict:
+    (size,) = LENGTH.unpack(_recv_exact(sock, LENGTH.size))
+    if size > MAX_MESSAGE:
+        raise ConnectionError(f"Message too large: {size}")
+    return json.loads(_recv_exact(sock, size).decode('utf-8'))
+
+def auth_digest(token: str, nonce: str) -> str:
+    """握手应答：共享令牌对协调者随机数的HMAC-SHA256，令牌本身不经过网络"""
+    return hmac.new(token.encode('utf-8'), nonce.encode('utf-8'), hashlib.sha256).hexdigest()
+
+def _is_loopback(host: str) -> bool:
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+def _parse_cards(text: str) -> List[Card]:
+    return [Card.from_string(text[i:i+2]) for i in range(0, len(text), 2)]
+
+# ----------------------------------------------------------------------
+# 任务类型：每种任务把一个分块的参数变成整数计数，合并时逐项相加
+# ----------------------------------------------------------------------
+
+def _run_equity(params: dict, rng: RandomStream, count: int) -> Dict[str, int]:
+    calculator = EquityCalculator(rng=rng)
+    wins, total = calculator.count_equity(
+        Hand.from_string(params['hand']), _parse_cards(params.get('board', '')),
+        params.get('num_opponents', 1), count
+    )
+    return {'wins': wins, 'total': total}
+
+def _run_allin(params: dict, rng: RandomStream, count: int) -> Dict[str, int]:
+    calculator = EquityCalculator(rng=rng)
+    chips = calculator.count_allin_chips(
+        Hand.from_string(params['hand']), _parse_cards(params.get('board', '')),
+        params['my_stack'], params['opponent_stacks'], params.get('dead_money', 0), count
+    )
+    return {'chips': chips, 'simulations': count}
+
+JOB_TYPES: Dict[str, Callable[[dict, RandomStream, int], Dict[str, int]]] = {
+    'equity': _run_equity,
+    'allin_ev': _run_allin,
+}
+
+def run_chunk(task: dict) -> Dict[str, int]:
+    """
+    执行一个分块：随机流只由(任务种子, 分块编号)决定，重试或换机器执行结果不变
+    """
+    rng = RandomStream(task['seed']).substream(task['chunk'])
+    return JOB_TYPES[task['kind']](task['params'], rng, task['count'])
+
+def merge_counts(results: List[Dict[str, int]]) -> Dict[str, int]:
+    """逐项相加整数计数（精确，与合并顺序无关）"""
+    merged: Dict[str, int] = {}
+    for result in results:
+        for name, value in result.items():
+            merged[name] = merged.get(name, 0) + value
+    return merged
+
+# ----------------------------------------------------------------------
+# 协调者
+# ----------------------------------------------------------------------
+
+class Coordinator:
+    """
+    任务协调者
+    监听TCP端口，每个连上的工作者由一个线程服务：从待办队列取分块发出，等待结果；
+    连接断开或超时时把分块放回队列由其他工作者重试。同一分块的重复结果只计一次
+    工作者连上后先完成握手：协调者发随机数，工作者用共享令牌回复HMAC，不符的连接直接关闭
+    """
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        task_timeout: float = 300.0,
+        token: Optional[str] = None
+    ):
+        """
+        :param host: 监听地址，默认只接受本机连接
+        :param port: 监听端口，0表示由系统分配（见address）
+        :param task_timeout: 单个分块的最长等待秒数，超时视为工作者丢失
+        :param token: 共享令牌；监听非回环地址时必须指定
+        :raises ValueError: 监听非回环地址但没有令牌
+        """
+        if token is None and not _is_loopback(host):
+            raise ValueError(f"A shared token is required to listen on {host}")
+        self.task_timeout = task_timeout
+        self.token = token
+        self._server = socket.create_server((host, port))
+        self._pending: 'queue.Queue[dict]' = queue.Queue()
+        self._results: Dict[int, Dict[str, int]] = {}
+        self._job_id = 0
+        self._lock = threading.Condition()
+        self._closed = False
+        self.workers = 0
+        self.retries = 0
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.getsockname()[:2]
+
+    def _accept_loop(self) -> None:
+        while not self._closed:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _handshake(self, conn: socket.socket) -> bool:
+        """发出随机数并校验工作者的应答，没有令牌时只要求hello"""
+        nonce = os.urandom(16).hex()
+        conn.settimeout(HANDSHAKE_TIMEOUT)
+        send_message(conn, {'type': 'challenge', 'nonce': nonce})
+        hello = recv_message(conn)
+        conn.settimeout(None)
+        if not isinstance(hello, dict) or hello.get('type') != 'hello':
+            return False
+        if self.token is None:
+            return True
+        auth = hello.get('auth')
+        return isinstance(auth, str) and hmac.compare_digest(auth, auth_digest(self.token, nonce))
+
+    def _serve(self, conn: socket.socket) -> None:
+        """为一个工作者服务直到连接断开或协调者关闭"""
+        counted = False
+        try:
+            with conn:
+                if not self._handshake(conn):
+                    return
+                with self._lock:
+                    self.workers += 1
+                counted = True
+                while not self._closed:
+                    try:
+                        task = self._pending.get(timeout=0.5)
+                    except queue.Empty:
+                        continue
+                    if task['job'] != self._job_id or task['chunk'] in self._results:
+                        continue
+                    try:
+                        conn.settimeout(self.task_timeout)
+                        send_message(conn, {'type': 'task', **task})
+                        reply = recv_message(conn)
+                        conn.settimeout(None)
+                    except (OSError, ValueError):
+                        # 工作者丢失：分块放回队列
+                        with self._lock:
+                            self.retries += 1
+                        self._pending.put(task)
+                        return
+                    if reply.get('type') != 'result' or reply.get('chunk') != task['chunk']:
+                        self._pending.put(task)
+                        return
+                    with self._lock:
+                        if task['job'] == self._job_id and task['chunk'] not in self._results:
+                            self._results[task['chunk']] = reply['result']
+                            self._lock.notify_all()
+                try:
+                    send_message(conn, {'type': 'shutdown'})
+                except OSError:
+                    pass
+        except (OSError, ValueError):
+            pass
+        finally:
+            if counted:
+                with self._lock:
+                    self.workers -= 1
+
+    def run_job(
+        self,
+        kind: str,
+        params: dict,
+        total: int,
+        chunk_size: int = 10000,
+        seed: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, int]:
+        """
+        把total次模拟拆成分块分发给工作者，等待全部完成后合并
+        :param kind: 任务类型（JOB_TYPES中的键）
+        :param seed: 任务根种子，None时随机生成；同一种子和分块大小的结果完全可复现
+        :param timeout: 整个任务的最长等待秒数
+        :return: 合并后的整数计数
+        """
+        if kind not in JOB_TYPES:
+            raise ValueError(f"Unknown job type: {kind}")
+        seed = RandomStream(seed).root_seed
+        with self._lock:
+            self._job_id += 1
+            self._results = {}
+            job_id = self._job_id
+        chunks = [
+            {'job': job_id, 'kind': kind, 'params': params, 'seed': seed,
+             'chunk': index, 'count': min(chunk_size, total - start)}
+            for index, start in enumerate(range(0, total, chunk_size))
+        ]
+        for task in chunks:
+            self._pending.put(task)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._lock:
+            while len(self._results) < len(chunks):
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"Job finished {len(self._results)}/{len(chunks)} chunks")
+                self._lock.wait(remaining if remaining is not None else 1.0)
+            results = [self._results[index] for index in range(len(chunks))]
+        return merge_counts(results)
+
+    def equity(self, hand: Hand, board: List[Card], num_opponents: int = 1,
+               num_simulations: int = 100000, **kwargs) -> Fraction:
+        """分布式胜率（精确分数，float()即可得到胜率）"""
+        counts = self.run_job('equity', {
+            'hand': str(hand),
+            'board': ''.join(str(card) for card in board),
+            'num_opponents': num_opponents,
+        }, num_simulations, **kwargs)
+        return Fraction(counts['wins'], counts['total'])
+
+    def close(self) -> None:
+        """关闭监听；工作者在完成当前分块后收到shutdown"""
+        self._closed = True
+        self._server.close()
+
+# ----------------------------------------------------------------------
+# 工作者
+# ----------------------------------------------------------------------
+
+class Worker:
+    """
+    工作者：连接协调者，循环执行收到的分块直到收到shutdown
+    连接失败（包括令牌不符被关闭）时按退避间隔重连
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        retry_delay: float = 1.0,
+        max_retries: int = 10,
+        token: Optional[str] = None
+    ):
+        """
+        :param token: 与协调者相同的共享令牌
+        """
+        self.host = host
+        self.port = port
+        self.token = token
+        self.retry_delay = retry_delay
+        self.max_retries = max_retries
+        self.completed = 0
+
+    def run(self) -> None:
+        failures = 0
+        while True:
+            try:
+                with socket.create_connection((self.host, self.port)) as sock:
+                    failures = 0
+                    challenge = recv_message(sock)
+                    hello = {'type': 'hello'}
+                    if self.token is not None:
+                        hello['auth'] = auth_digest(self.token, str(challenge.get('nonce', '')))
+                    send_message(sock, hello)
+                    while True:
+                        message = recv_message(sock)
+                        if message.get('type') == 'shutdown':
+                            return
+                        if message.get('type') != 'task':
+                            continue
+                        result = run_chunk(message)
+                        send_message(sock, {'type': 'result', 'chunk': message['chunk'], 'result': result})
+                        self.completed += 1
+            except (OSError, ValueError):
+                failures += 1
+                if failures > self.max_retries:
+                    return
+                time.sleep(self.retry_delay * min(failures, 10))
+
+def start_local_workers(
+    address: Tuple[str, int],
+    count: int,
+    token: Optional[str] = None
+) -> List[threading.Thread]:
+    """
+    在本进程内启动count个工作者线程连接协调者（测试和单机调试用）
+    """
+    threads = []
+    for _ in range(count):
+        worker = Worker(address[0], address[1], retry_delay=0.1, max_retries=3, token=token)
+        thread = threading.Thread(target=worker.run, daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
+
+if __name__ == '__main__':
+    # POKER_ADVISOR_TOKEN=<共享令牌> python -m src.engine.distributed worker <协调者地址> <端口>
+    if len(sys.argv) != 4 or sys.argv[1] != 'worker':
+        sys.exit(f"usage: {TOKEN_ENV}=<token> python -m src.engine.distributed worker <host> <port>")
+    Worker(sys.argv[2], int(sys.argv[3]), token=os.environ.get(TOKEN_ENV)).run()
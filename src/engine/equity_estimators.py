@@ -0,0 +1,281 @@
+"""
+Variance-reduced Monte Carlo equity estimators
+降低方差的蒙特卡洛胜率估计：分层抽样、对偶发牌和控制变量
+"""
+
+from dataclasses import dataclass
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence, Tuple
+from .fast_evaluator import CATEGORY_SHIFT, FastEvaluator
+from .rng import RandomStream
+
+# 方法名 -> (分层, 对偶, 控制变量)
+# 对偶发牌在实测中方差缩减不稳定（约0.85-1.4倍），不计入默认的combined
+METHODS: Dict[str, Tuple[bool, bool, bool]] = {
+    'plain': (False, False, False),
+    'stratified': (True, False, False),
+    'antithetic': (False, True, False),
+    'control': (False, False, True),
+    'combined': (True, False, True),
+}
+
+# 缓存的牌型期望：(手牌, 公共牌) -> 我们最终牌型等级的期望
+_category_means: Dict[Tuple[Tuple[int, ...], Tuple[int, ...]], float] = {}
+CATEGORY_CACHE_SIZE = 4096
+# 缓存的当前牌力表：公共牌 -> 每个组合的牌力
+_board_strengths: Dict[Tuple[int, ...], Sequence[float]] = {}
+BOARD_CACHE_SIZE = 64
+
+@dataclass
+class EquityEstimate:
+    """
+    胜率估计及其精度
+    variance_reduction是相同发牌次数下普通蒙特卡洛的方差与本估计方差之比（由同一批样本估计）；
+    speedup再扣除控制变量期望的枚举开销，是达到相同精度时评估次数可以减少的倍数
+    """
+    equity: float
+    std_error: float
+    samples: int                 # 模拟的发牌次数
+    evaluations: int             # 牌力评估次数（包括计算控制变量期望的枚举，命中缓存时不计）
+    variance_reduction: float
+    speedup: float
+    method: str
+
+def runout_category_mean(hero: Sequence[int], board: Sequence[int]) -> Tuple[Optional[float], int]:
+    """
+    我们最终牌型等级的精确期望：枚举剩余公共牌（翻牌1081种，转牌46种）
+    翻前枚举太多、河牌是常数，这两种情况返回None
+    :return: (期望, 本次实际评估次数，命中缓存时为0)
+    """
+    board_needed = 5 - len(board)
+    if board_needed not in (1, 2):
+        return None, 0
+    key = (tuple(sorted(hero)), tuple(sorted(board)))
+    mean = _category_means.get(key)
+    if mean is not None:
+        return mean, 0
+    dead = set(hero) | set(board)
+    deck = [card for card in range(52) if card not in dead]
+    known = list(hero) + list(board)
+    evaluate = FastEvaluator.evaluate
+    total = 0
+    count = 0
+    for runout in combinations(deck, board_needed):
+        total += evaluate(known + list(runout)) >> CATEGORY_SHIFT
+        count += 1
+    if len(_category_means) >= CATEGORY_CACHE_SIZE:
+        _category_means.clear()
+    mean = total / count
+    _category_means[key] = mean
+    return mean, count
+
+def current_strengths(board: Sequence[int]) -> Tuple[Sequence[float], int]:
+    """
+    每个组合当前的牌力(0-1)：翻前为起手牌百分位，翻后为对随机手牌的HS（与公共牌冲突的组合为负数）
+    翻后的表按公共牌缓存
+    :return: (牌力表, 本次实际评估次数，命中缓存时为0)
+    """
+    if len(board) < 3:
+        from .inference import preflop_percentiles
+        return preflop_percentiles(), 0
+    key = tuple(sorted(board))
+    strengths = _board_strengths.get(key)
+    if strengths is not None:
+        return strengths, 0
+    from .buckets import board_hand_strengths
+    strengths = board_hand_strengths(board)
+    if len(_board_strengths) >= BOARD_CACHE_SIZE:
+        _board_strengths.clear()
+    _board_strengths[key] = strengths
+    return strengths, sum(1 for strength in strengths if strength >= 0)
+
+def _solve(matrix: List[List[float]], vector: List[float]) -> Optional[List[float]]:
+    """小规模线性方程组（部分主元高斯消元），奇异时返回None"""
+    n = len(vector)
+    rows = [matrix[i][:] + [vector[i]] for i in range(n)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        if abs(rows[pivot][col]) < 1e-12:
+            return None
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(n):
+            if r != col:
+                factor = rows[r][col] / rows[col][col]
+                for c in range(col, n + 1):
+                    rows[r][c] -= factor * rows[col][c]
+    return [rows[i][n] / rows[i][i] for i in range(n)]
+
+def _control_coefficients(xs: List[float], controls: List[Tuple[List[float], float]]) -> List[float]:
+    """
+    控制变量系数：结果对各控制变量的最小二乘回归系数
+    （与估计使用同一批样本，偏差是O(1/n)，相对标准误可以忽略）
+    """
+    n = len(xs)
+    x_mean = sum(xs) / n
+    centered = []
+    for values, _ in controls:
+        mean = sum(values) / n
+        centered.append([value - mean for value in values])
+    k = len(controls)
+    matrix = [[sum(a * b for a, b in zip(centered[i], centered[j])) for j in range(k)] for i in range(k)]
+    vector = [sum(a * (x - x_mean) for a, x in zip(centered[i], xs)) for i in range(k)]
+    return _solve(matrix, vector) or [0.0] * k
+
+def _variance(values: List[float]) -> float:
+    n = len(values)
+    if n < 2:
+        return 0.0
+    mean = sum(values) / n
+    return sum((value - mean) ** 2 for value in values) / (n - 1)
+
+def estimate_equity(
+    hero: Sequence[int],
+    board: Sequence[int],
+    num_opponents: int = 1,
+    num_simulations: int = 1000,
+    rng: Optional[RandomStream] = None,
+    method: str = 'combined',
+    seed: Optional[int] = None
+) -> EquityEstimate:
+    """
+    对随机手牌的胜率估计（平分底池按份额计入），牌用整数编码
+    - 分层：按第一张发出的牌（翻前/翻牌/转牌为下一张公共牌，河牌为第一个对手的第一张牌）分层，
+      每层等概率、等量分配样本，消除层间方差
+    - 对偶：每次发牌再配一次“镜像”发牌，剩余牌组按大小排序后第i张换成倒数第i张，
+      镜像仍是均匀的发牌，且高牌/低牌互换使两次结果负相关
+    - 控制变量：我们最终的牌型等级（期望由枚举剩余公共牌精确得到）和当前领先的对手比例
+      （按当前牌力表比较，期望是所有相容组合的平均），模拟中不需要额外的评估；
+      两者的期望各需一次约1000次评估的枚举，按手牌/公共牌缓存
+    :param rng: 随机数流，优先于seed
+    :param method: METHODS中的方法名
+    :param seed: 未指定rng时的根种子，不指定则从系统熵源生成（可通过rng.root_seed取回以复现）
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown equity method: {method}")
+    stratify, antithetic, control = METHODS[method]
+    rng = rng or RandomStream(seed)
+    from .inference import COMBOS_BY_CARDS
+    from .ranges import COMBOS
+
+    hero = list(hero)
+    board = list(board)
+    dead = set(hero) | set(board)
+    deck = [card for card in range(52) if card not in dead]
+    mirror = {card: deck[len(deck) - 1 - i] for i, card in enumerate(deck)}
+    board_needed = 5 - len(board)
+    cards_needed = board_needed + 2 * num_opponents
+    evaluate = FastEvaluator.evaluate
+
+    # 控制变量的精确期望
+    category_mean = None
+    ahead_mean = 0.0
+    # 每个组合是否落后于我们当前的牌（平局记0.5）
+    ahead = None
+    setup_evaluations = 0
+    if control:
+        category_mean, setup_evaluations = runout_category_mean(hero, board)
+        strengths, count = current_strengths(board)
+        setup_evaluations += count
+        hero_strength = strengths[COMBOS_BY_CARDS[hero[0]][hero[1]]]
+        ahead = [
+            1.0 if strength < hero_strength else (0.5 if strength == hero_strength else 0.0)
+            for strength in strengths
+        ]
+        compatible = [ahead[i] for i, (a, b) in enumerate(COMBOS) if a not in dead and b not in dead]
+        ahead_mean = sum(compatible) / len(compatible)
+
+    xs: List[float] = []
+    categories: List[float] = []
+    leads: List[float] = []
+    evaluations = 0
+
+    def play(dealt: List[int]) -> None:
+        nonlocal evaluations
+        full_board = board + dealt[:board_needed]
+        ours = evaluate(hero + full_board)
+        evaluations += 1
+        tied = 1
+        won = True
+        lead = 0.0
+        for i in range(board_needed, cards_needed, 2):
+            a, b = dealt[i], dealt[i + 1]
+            if ahead is not None:
+                lead += ahead[COMBOS_BY_CARDS[a][b]]
+            if won:
+                theirs = evaluate([a, b] + full_board)
+                evaluations += 1
+                if theirs > ours:
+                    won = False
+                elif theirs == ours:
+                    tied += 1
+        xs.append(1.0 / tied if won else 0.0)
+        categories.append(ours >> CATEGORY_SHIFT)
+        leads.append(lead / num_opponents)
+
+    # 每个单元是一次发牌（对偶时为一对），按层记录单元包含的样本下标
+    per_unit = 2 if antithetic else 1
+    strata: List[List[List[int]]] = []
+    if stratify:
+        units = max(2, round(num_simulations / (len(deck) * per_unit)))
+        for first in deck:
+            rest = [card for card in deck if card != first]
+            stratum = []
+            for _ in range(units):
+                dealt = [first] + rng.deal(rest, cards_needed - 1)
+                stratum.append(list(range(len(xs), len(xs) + per_unit)))
+                play(dealt)
+                if antithetic:
+                    play([mirror[card] for card in dealt])
+            strata.append(stratum)
+    else:
+        stratum = []
+        for _ in range(max(2, num_simulations // per_unit)):
+            dealt = rng.deal(deck, cards_needed)
+            stratum.append(list(range(len(xs), len(xs) + per_unit)))
+            play(dealt)
+            if antithetic:
+                play([mirror[card] for card in dealt])
+        strata.append(stratum)
+
+    # 控制变量调整：z = x - Σβ(y - E[y])，常数控制变量（河牌的牌型）不参与回归
+    values = xs
+    if control:
+        controls = [(leads, ahead_mean)]
+        if category_mean is not None:
+            controls.append((categories, category_mean))
+        controls = [(ys, mean) for ys, mean in controls if _variance(ys) > 0]
+        if controls:
+            betas = _control_coefficients(xs, controls)
+            values = [
+                x - sum(beta * (ys[i] - mean) for beta, (ys, mean) in zip(betas, controls))
+                for i, x in enumerate(xs)
+            ]
+
+    # 分层估计：各层等概率，估计为层均值的平均，方差为各层均值方差之和/层数²
+    layer_count = len(strata)
+    equity = 0.0
+    variance = 0.0
+    for stratum in strata:
+        unit_values = [sum(values[i] for i in unit) / len(unit) for unit in stratum]
+        equity += sum(unit_values) / len(unit_values)
+        variance += _variance(unit_values) / len(unit_values)
+    equity /= layer_count
+    variance /= layer_count * layer_count
+    if variance < 1e-15:
+        # 河牌单挑时控制变量等于结果本身，剩下的只是舍入误差
+        variance = 0.0
+
+    plain_variance = _variance(xs) / len(xs)
+    if variance > 0:
+        reduction = plain_variance / variance
+    else:
+        reduction = float('inf') if plain_variance > 0 else 1.0
+    return EquityEstimate(
+        min(1.0, max(0.0, equity)),
+        variance ** 0.5,
+        len(xs),
+        evaluations + setup_evaluations,
+        reduction,
+        reduction * evaluations / (evaluations + setup_evaluations),
+        method,
+    )
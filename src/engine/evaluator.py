@@ -3,28 +3,20 @@ Hand strength and equity evaluation
 手牌强度和期望值评估系统
 """
 
-from typing import List, Tuple, Dict, Optional, Set
+from typing import TYPE_CHECKING, List, Tuple, Dict, Optional, Set
 from itertools import combinations
+from math import gcd
 from collections import Counter
-import random
 from ..core.card import Card, Hand, Rank, Suit
 from ..core.game_state import GameState
-from ..utils.constants import Stage, Position, POSITION_WEIGHTS_6MAX
+from ..utils.constants import Stage, Position, HandRank, Variant, POSITION_WEIGHTS_6MAX
+from .fast_evaluator import FastEvaluator
+from .side_pot import SidePotCalculator
+from .rng import RandomStream
 
-class HandRank:
-    """
-    手牌等级定义
-    """
-    HIGH_CARD = 0
-    PAIR = 1
-    TWO_PAIR = 2
-    THREE_OF_A_KIND = 3
-    STRAIGHT = 4
-    FLUSH = 5
-    FULL_HOUSE = 6
-    FOUR_OF_A_KIND = 7
-    STRAIGHT_FLUSH = 8
-    ROYAL_FLUSH = 9
+if TYPE_CHECKING:
+    from .ranges import HandRange
+    from .equity_estimators import EquityEstimate
 
 class HandEvaluator:
     """
@@ -47,13 +39,14 @@ class HandEvaluator:
         检查是否有顺子
         :return: 顺子的最大牌值，如果没有则返回None
         """
+        ranks = set(ranks)
         # 处理A可以当1用的特殊情况
         if 14 in ranks:  # Ace
             ranks.add(1)
             
         ranks = sorted(ranks)
         count = 1
-        max_rank = ranks[0]
+        max_rank = None
         
         for i in range(1, len(ranks)):
             if ranks[i] == ranks[i-1] + 1:
@@ -63,7 +56,7 @@ class HandEvaluator:
             else:
                 count = 1
                 
-        return max_rank if count >= 5 else None
+        return max_rank
 
     @staticmethod
     def evaluate_hand_strength(cards: List[Card]) -> Tuple[int, List[int]]:
@@ -79,7 +72,7 @@ class HandEvaluator:
         suit_counts = HandEvaluator._get_suit_counts(cards)
         
         # 获取所有点数值
-        ranks = {card.rank.value for card in cards}
+        ranks = {card.rank.rank_value for card in cards}
         
         # 检查同花
         flush_suit = next(
@@ -93,7 +86,7 @@ class HandEvaluator:
         # 如果有同花和顺子，检查是否是同花顺
         if flush_suit and straight_high:
             flush_cards = [card for card in cards if card.suit == flush_suit]
-            flush_ranks = {card.rank.value for card in flush_cards}
+            flush_ranks = {card.rank.rank_value for card in flush_cards}
             straight_flush_high = HandEvaluator._has_straight(flush_ranks)
             
             if straight_flush_high:
@@ -102,22 +95,31 @@ class HandEvaluator:
                     return (HandRank.ROYAL_FLUSH, [14])
                 return (HandRank.STRAIGHT_FLUSH, [straight_flush_high])
         
+        # 按数值从大到小排列的点数，保证多组同型牌时取最大的一组
+        values_by_count = sorted(
+            ((count, rank.rank_value) for rank, count in rank_counts.items()),
+            key=lambda item: item[1],
+            reverse=True
+        )
+        quads = [value for count, value in values_by_count if count == 4]
+        trips = [value for count, value in values_by_count if count == 3]
+        pairs = [value for count, value in values_by_count if count == 2]
+        all_values = [value for _, value in values_by_count]
+        
         # 检查四条
-        quads = [rank for rank, count in rank_counts.items() if count == 4]
         if quads:
-            kicker = max(rank for rank in rank_counts if rank not in quads)
-            return (HandRank.FOUR_OF_A_KIND, [quads[0].value, kicker.value])
+            kicker = max(value for value in all_values if value != quads[0])
+            return (HandRank.FOUR_OF_A_KIND, [quads[0], kicker])
             
-        # 检查葫芦
-        trips = [rank for rank, count in rank_counts.items() if count == 3]
-        pairs = [rank for rank, count in rank_counts.items() if count == 2]
-        if trips and pairs:
-            return (HandRank.FULL_HOUSE, [trips[0].value, pairs[0].value])
+        # 检查葫芦（第二组三条也可以当对子用）
+        if trips and (pairs or len(trips) >= 2):
+            pair_value = max(pairs + trips[1:])
+            return (HandRank.FULL_HOUSE, [trips[0], pair_value])
             
         # 检查同花
         if flush_suit:
             flush_cards = [card for card in cards if card.suit == flush_suit]
-            flush_values = sorted([card.rank.value for card in flush_cards], reverse=True)
+            flush_values = sorted([card.rank.rank_value for card in flush_cards], reverse=True)
             return (HandRank.FLUSH, flush_values[:5])
             
         # 检查顺子
@@ -126,29 +128,21 @@ class HandEvaluator:
             
         # 检查三条
         if trips:
-            kickers = sorted(
-                [rank.value for rank in rank_counts if rank != trips[0]],
-                reverse=True
-            )
-            return (HandRank.THREE_OF_A_KIND, [trips[0].value] + kickers[:2])
+            kickers = [value for value in all_values if value != trips[0]]
+            return (HandRank.THREE_OF_A_KIND, [trips[0]] + kickers[:2])
             
         # 检查两对
         if len(pairs) >= 2:
-            pairs_values = sorted([p.value for p in pairs], reverse=True)
-            kicker = max(rank.value for rank in rank_counts if rank not in pairs)
-            return (HandRank.TWO_PAIR, pairs_values[:2] + [kicker])
+            kicker = max(value for value in all_values if value not in pairs[:2])
+            return (HandRank.TWO_PAIR, pairs[:2] + [kicker])
             
         # 检查一对
         if pairs:
-            kickers = sorted(
-                [rank.value for rank in rank_counts if rank != pairs[0]],
-                reverse=True
-            )
-            return (HandRank.PAIR, [pairs[0].value] + kickers[:3])
+            kickers = [value for value in all_values if value != pairs[0]]
+            return (HandRank.PAIR, [pairs[0]] + kickers[:3])
             
         # 高牌
-        high_cards = sorted([card.rank.value for card in cards], reverse=True)
-        return (HandRank.HIGH_CARD, high_cards[:5])
+        return (HandRank.HIGH_CARD, all_values[:5])
 
     @staticmethod
     def compare_hands(hand1: List[Card], hand2: List[Card]) -> int:
@@ -215,8 +209,23 @@ class HandEvaluator:
 class EquityCalculator:
     """
     计算精确胜率
+    每个实例持有自己的随机数流，相同种子的模拟结果完全可复现
     """
     
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        rng: Optional[RandomStream] = None,
+        variant: Variant = Variant.HOLDEM
+    ):
+        """
+        :param seed: 根种子，不指定则从系统熵源生成（可通过self.rng.root_seed取回以复现）
+        :param rng: 直接指定随机数流（如并行任务的子流），优先于seed
+        :param variant: 玩法，决定牌组、手牌张数和摊牌评估
+        """
+        self.rng = rng or RandomStream(seed)
+        self.variant = variant
+    
     @staticmethod
     def _create_deck(excluded_cards: List[Card]) -> List[Card]:
         """创建一副排除了已知牌的牌组"""
@@ -228,53 +237,308 @@ class EquityCalculator:
                     all_cards.append(card)
         return all_cards
 
-    @staticmethod
     def calculate_equity(
+        self,
         hand: Hand,
         board: List[Card],
         num_opponents: int = 1,
-        num_simulations: int = 1000
+        num_simulations: int = 1000,
+        method: Optional[str] = None
     ) -> float:
         """
-        使用蒙特卡洛模拟计算胜率
+        使用蒙特卡洛模拟计算胜率（平分底池按份额计入）
+        :param method: 降低方差的估计方法（见estimate_equity），默认普通蒙特卡洛
+        """
+        if method is not None:
+            return self.estimate_equity(hand, board, num_opponents, num_simulations, method).equity
+        wins, total = self.count_equity(hand, board, num_opponents, num_simulations)
+        return wins / total
+    
+    def estimate_equity(
+        self,
+        hand: Hand,
+        board: List[Card],
+        num_opponents: int = 1,
+        num_simulations: int = 1000,
+        method: str = 'combined'
+    ) -> 'EquityEstimate':
+        """
+        降低方差的胜率估计，同时给出标准误和相对普通蒙特卡洛的方差缩减倍数
+        :param method: 'plain'、'stratified'、'antithetic'、'control'或'combined'（分层+控制变量）
         """
+        if self.variant != Variant.HOLDEM:
+            raise ValueError("Variance-reduced equity is only available for Hold'em")
+        from .equity_estimators import estimate_equity
+        return estimate_equity(
+            [card.to_int() for card in hand.cards],
+            [card.to_int() for card in board],
+            num_opponents,
+            num_simulations,
+            self.rng,
+            method,
+        )
+    
+    def count_equity(
+        self,
+        hand: Hand,
+        board: List[Card],
+        num_opponents: int = 1,
+        num_simulations: int = 1000
+    ) -> Tuple[int, int]:
+        """
+        胜率模拟的整数计数，便于把多个分块的结果精确合并
+        每次模拟记share_units份，n人平分时每人得share_units/n份（share_units是1..对手数+1的最小公倍数）
+        :return: (赢得的份数, 总份数)
+        """
+        share_units = 1
+        for players in range(2, num_opponents + 2):
+            share_units = share_units * players // gcd(share_units, players)
+        if self.variant != Variant.HOLDEM:
+            return self._count_variant_equity(
+                hand, board, num_opponents, num_simulations, share_units
+            )
         wins = 0
         
-        # 创建剩余牌组
-        deck = EquityCalculator._create_deck(hand.cards + board)
+        # 创建剩余牌组（整数编码）
+        deck = [card.to_int() for card in EquityCalculator._create_deck(hand.cards + board)]
+        hero = [card.to_int() for card in hand.cards]
+        known_board = [card.to_int() for card in board]
+        board_needed = 5 - len(board)
+        cards_needed = board_needed + 2 * num_opponents
+        evaluate = FastEvaluator.evaluate
+        deal = self.rng.deal
         
         for _ in range(num_simulations):
-            # 洗牌
-            random.shuffle(deck)
-            
-            # 为对手发牌
-            opponent_cards = []
-            for _ in range(num_opponents):
-                opponent_cards.extend(deck[:2])
-                deck = deck[2:]
+            # 只发需要的牌（一次随机数调用）
+            dealt = deal(deck, cards_needed)
             
-            # 补齐公共牌
-            remaining_board = deck[:5-len(board)]
-            full_board = board + remaining_board
+            # 补齐公共牌，剩下的牌发给对手
+            full_board = known_board + dealt[:board_needed]
             
             # 计算我们的最终牌力
-            our_hand = hand.cards + full_board
-            our_score = HandEvaluator.evaluate_hand_strength(our_hand)
+            our_score = evaluate(hero + full_board)
             
             # 计算对手的牌力
+            tied = 1
             won_hand = True
-            for i in range(0, len(opponent_cards), 2):
-                opponent_hand = opponent_cards[i:i+2] + full_board
-                opponent_score = HandEvaluator.evaluate_hand_strength(opponent_hand)
-                
-                if HandEvaluator.compare_hands(our_hand, opponent_hand) <= 0:
+            for i in range(board_needed, board_needed + 2 * num_opponents, 2):
+                opponent_score = evaluate(dealt[i:i+2] + full_board)
+                if opponent_score > our_score:
+                    won_hand = False
+                    break
+                if opponent_score == our_score:
+                    tied += 1
+            
+            if won_hand:
+                wins += share_units // tied
+        
+        return wins, share_units * num_simulations
+
+    def _variant_setup(self, hand: Hand, board: List[Card]):
+        """非德州玩法的牌组、我们的手牌和已知公共牌（整数编码）"""
+        from .variants import rules
+        variant_rules = rules(self.variant)
+        if len(hand.cards) != variant_rules.hole_cards:
+            raise ValueError(
+                f"{self.variant.value} hands need {variant_rules.hole_cards} cards"
+            )
+        hero = [card.to_int() for card in hand.cards]
+        known_board = [card.to_int() for card in board]
+        dead = set(hero + known_board)
+        if any(card not in variant_rules.deck for card in dead):
+            raise ValueError(f"Card not in the {self.variant.value} deck")
+        deck = [card for card in variant_rules.deck if card not in dead]
+        return variant_rules, deck, hero, known_board
+    
+    def _count_variant_equity(
+        self,
+        hand: Hand,
+        board: List[Card],
+        num_opponents: int,
+        num_simulations: int,
+        share_units: int
+    ) -> Tuple[int, int]:
+        """奥马哈/短牌的胜率计数，对手按该玩法的手牌张数发牌"""
+        variant_rules, deck, hero, known_board = self._variant_setup(hand, board)
+        hole_cards = variant_rules.hole_cards
+        board_needed = 5 - len(board)
+        cards_needed = board_needed + hole_cards * num_opponents
+        prepare_board = variant_rules.prepare_board
+        score = variant_rules.score
+        deal = self.rng.deal
+        wins = 0
+        
+        for _ in range(num_simulations):
+            dealt = deal(deck, cards_needed)
+            full_board = known_board + dealt[:board_needed]
+            prepared = prepare_board(full_board)
+            our_score = score(hero, full_board, prepared)
+            tied = 1
+            won_hand = True
+            for i in range(board_needed, cards_needed, hole_cards):
+                opponent_score = score(dealt[i:i + hole_cards], full_board, prepared)
+                if opponent_score > our_score:
                     won_hand = False
                     break
+                if opponent_score == our_score:
+                    tied += 1
+            if won_hand:
+                wins += share_units // tied
+        
+        return wins, share_units * num_simulations
+
+    def calculate_range_equity(
+        self,
+        hand: Hand,
+        board: List[Card],
+        ranges: List['HandRange'],
+        num_simulations: int = 1000
+    ) -> float:
+        """
+        对手按给定范围持牌时的胜率（平分底池按份额计入）
+        每个对手的组合按范围权重抽样，与我们的牌、公共牌或其他对手冲突时重抽
+        :param ranges: 每个仍在手牌中的对手的范围
+        """
+        if self.variant != Variant.HOLDEM:
+            raise ValueError("Range equity is only available for Hold'em")
+        from bisect import bisect_right
+        from itertools import accumulate
+        from .ranges import COMBOS
+        
+        hero = [card.to_int() for card in hand.cards]
+        known_board = [card.to_int() for card in board]
+        dead = set(hero + known_board)
+        deck = [card for card in range(52) if card not in dead]
+        board_needed = 5 - len(board)
+        num_opponents = len(ranges)
+        
+        # 每个范围去掉冲突组合后的累积权重，用于按权重抽样
+        samplers = []
+        for hand_range in ranges:
+            combos = [
+                i for i, weight in enumerate(hand_range.weights)
+                if weight > 0 and COMBOS[i][0] not in dead and COMBOS[i][1] not in dead
+            ]
+            if not combos:
+                raise ValueError("Range has no combos compatible with the known cards")
+            cumulative = list(accumulate(hand_range.weights[i] for i in combos))
+            samplers.append((combos, cumulative, cumulative[-1]))
+        
+        evaluate = FastEvaluator.evaluate
+        deal = self.rng.deal
+        random = self.rng.random
+        wins = 0.0
+        completed = 0
+        
+        for _ in range(num_simulations):
+            used = set()
+            opponents = []
+            for combos, cumulative, total in samplers:
+                for _attempt in range(20):
+                    a, b = COMBOS[combos[bisect_right(cumulative, random() * total)]]
+                    if a not in used and b not in used:
+                        break
+                else:
+                    break
+                used.add(a)
+                used.add(b)
+                opponents.append([a, b])
+            if len(opponents) < num_opponents:
+                continue
             
+            # 多发的牌覆盖被对手占用的牌
+            dealt = [card for card in deal(deck, board_needed + 2 * num_opponents) if card not in used]
+            full_board = known_board + dealt[:board_needed]
+            our_score = evaluate(hero + full_board)
+            tied = 1
+            won_hand = True
+            for opponent in opponents:
+                opponent_score = evaluate(opponent + full_board)
+                if opponent_score > our_score:
+                    won_hand = False
+                    break
+                if opponent_score == our_score:
+                    tied += 1
             if won_hand:
-                wins += 1
+                wins += 1.0 / tied
+            completed += 1
+        
+        return wins / completed if completed else 0.0
+
+    def calculate_allin_ev(
+        self,
+        hand: Hand,
+        board: List[Card],
+        my_stack: int,
+        opponent_stacks: List[int],
+        dead_money: int = 0,
+        num_simulations: int = 1000
+    ) -> float:
+        """
+        多人全下且筹码不等时，按主池/边池模拟我们的期望收回筹码
+        :param my_stack: 我们全下的筹码
+        :param opponent_stacks: 每个跟注对手全下的筹码
+        :param dead_money: 已在底池中的死钱（如盲注、弃牌玩家的投入），并入主池
+        :return: 期望赢回的筹码数（包括自己投入的部分）
+        """
+        return self.count_allin_chips(
+            hand, board, my_stack, opponent_stacks, dead_money, num_simulations
+        ) / num_simulations
+    
+    def count_allin_chips(
+        self,
+        hand: Hand,
+        board: List[Card],
+        my_stack: int,
+        opponent_stacks: List[int],
+        dead_money: int = 0,
+        num_simulations: int = 1000
+    ) -> int:
+        """
+        calculate_allin_ev的整数版本：所有模拟中我们赢回的筹码总数
+        """
+        total = 0
+        
+        if self.variant != Variant.HOLDEM:
+            variant_rules, deck, hero, known_board = self._variant_setup(hand, board)
+        else:
+            variant_rules = None
+            deck = [card.to_int() for card in EquityCalculator._create_deck(hand.cards + board)]
+            hero = [card.to_int() for card in hand.cards]
+            known_board = [card.to_int() for card in board]
+        hole_cards = variant_rules.hole_cards if variant_rules else 2
+        board_needed = 5 - len(board)
+        num_opponents = len(opponent_stacks)
+        evaluate = FastEvaluator.evaluate
+        
+        # 座位0是我们；死钱作为一个已弃牌座位的投入计入主池
+        contributions = [my_stack] + list(opponent_stacks) + [dead_money]
+        live_mask = (1 << (num_opponents + 1)) - 1
+        pots = SidePotCalculator.build_pots_array(contributions, live_mask)
+        # 座位未知，不能按按钮顺序分零头：分配顺序逐次模拟轮换，我们和每个对手先拿零头的次数相同
+        seats = num_opponents + 1
+        chip_orders = [list(range(k, seats)) + list(range(k)) for k in range(seats)]
+        strengths = [0] * (num_opponents + 2)
+        cards_needed = board_needed + hole_cards * num_opponents
+        deal = self.rng.deal
+        
+        for simulation in range(num_simulations):
+            dealt = deal(deck, cards_needed)
+            full_board = known_board + dealt[:board_needed]
+            if variant_rules:
+                prepared = variant_rules.prepare_board(full_board)
+                strengths[0] = variant_rules.score(hero, full_board, prepared)
+                for seat in range(1, num_opponents + 1):
+                    i = board_needed + hole_cards * (seat - 1)
+                    strengths[seat] = variant_rules.score(dealt[i:i + hole_cards], full_board, prepared)
+            else:
+                strengths[0] = evaluate(hero + full_board)
+                for seat in range(1, num_opponents + 1):
+                    i = board_needed + 2 * (seat - 1)
+                    strengths[seat] = evaluate(dealt[i:i+2] + full_board)
+            total += SidePotCalculator.award_pots_array(pots, strengths, chip_orders[simulation % seats])[0]
         
-        return wins / num_simulations
+        return total
 
 class PotOddsCalculator:
     """
@@ -0,0 +1,178 @@
+"""
+Integer-encoded fast hand evaluator
+基于整数编码和位运算的快速牌力评估器
+"""
+
+from typing import List, Optional, Sequence, Tuple
+from ..core.card import Card
+from ..utils.constants import HandRank
+
+# 牌力编码: 牌型等级 << 20 | 最多5个关键牌值(每个4位，2-14)
+# 编码后的整数大小顺序与HandEvaluator.evaluate_hand_strength的(等级, 牌值)顺序一致
+CATEGORY_SHIFT = 20
+
+def _build_straight_table() -> bytes:
+    """构建13位点数掩码 -> 顺子最大牌值(没有顺子为0)的查找表"""
+    table = bytearray(8192)
+    windows = [(0b11111 << low, low + 6) for low in range(8, -1, -1)]
+    wheel = (1 << 12) | 0b1111  # A2345
+    for mask in range(8192):
+        for window, high in windows:
+            if mask & window == window:
+                table[mask] = high
+                break
+        else:
+            if mask & wheel == wheel:
+                table[mask] = 5
+    return bytes(table)
+
+def _build_popcount_table() -> bytes:
+    return bytes(bin(mask).count('1') for mask in range(8192))
+
+# 两张表各8KB、构建只需几毫秒，直接在进程内构建，不经过TableManager的磁盘缓存
+# 第一次评估时才构建，导入本模块不做任何计算
+STRAIGHT_HIGH: Optional[bytes] = None
+POPCOUNT: Optional[bytes] = None
+
+def load_tables() -> None:
+    """构建评估用的查找表"""
+    global STRAIGHT_HIGH, POPCOUNT
+    if STRAIGHT_HIGH is None:
+        POPCOUNT = _build_popcount_table()
+        STRAIGHT_HIGH = _build_straight_table()
+
+def straight_high(rank_mask: int) -> int:
+    """13位点数掩码中最大顺子的最大牌值，没有顺子为0"""
+    if STRAIGHT_HIGH is None:
+        load_tables()
+    return STRAIGHT_HIGH[rank_mask]
+
+def _top_values(mask: int, count: int) -> List[int]:
+    """从点数掩码中取出最大的count个牌值"""
+    values = []
+    r = 12
+    while r >= 0 and len(values) < count:
+        if mask & (1 << r):
+            values.append(r + 2)
+        r -= 1
+    return values
+
+class FastEvaluator:
+    """
+    快速评估器：牌用0-51整数表示(见Card.to_int)，返回可直接比较大小的整数牌力
+    """
+
+    @staticmethod
+    def encode(category: int, values: Sequence[int]) -> int:
+        """把(牌型等级, 关键牌值)编码为单个整数"""
+        strength = category
+        for i in range(5):
+            strength = (strength << 4) | (values[i] if i < len(values) else 0)
+        return strength
+
+    @staticmethod
+    def decode(strength: int) -> Tuple[int, List[int]]:
+        """把整数牌力还原为(牌型等级, 关键牌值)"""
+        values = [(strength >> (16 - 4 * i)) & 0xF for i in range(5)]
+        return strength >> CATEGORY_SHIFT, [v for v in values if v]
+
+    @staticmethod
+    def evaluate(cards: Sequence[int]) -> int:
+        """
+        评估5-7张整数编码牌的最大牌力
+        :return: 整数牌力，越大越强
+        """
+        if STRAIGHT_HIGH is None:
+            load_tables()
+        suit_masks = [0, 0, 0, 0]
+        counts = [0] * 13
+        for c in cards:
+            r = c >> 2
+            suit_masks[c & 3] |= 1 << r
+            counts[r] += 1
+
+        # 同花/同花顺
+        flush_mask = 0
+        for mask in suit_masks:
+            if POPCOUNT[mask] >= 5:
+                flush_mask = mask
+                break
+        if flush_mask:
+            straight_flush = STRAIGHT_HIGH[flush_mask]
+            if straight_flush == 14:
+                return (HandRank.ROYAL_FLUSH << CATEGORY_SHIFT) | (14 << 16)
+            if straight_flush:
+                return (HandRank.STRAIGHT_FLUSH << CATEGORY_SHIFT) | (straight_flush << 16)
+
+        # 按点数从大到小分组
+        quad = trip = -1
+        second_trip = -1
+        pairs = []
+        singles_mask = 0
+        for r in range(12, -1, -1):
+            n = counts[r]
+            if n == 0:
+                continue
+            if n == 4:
+                if quad < 0:
+                    quad = r
+                else:
+                    singles_mask |= 1 << r
+            elif n == 3:
+                if trip < 0:
+                    trip = r
+                else:
+                    second_trip = r if second_trip < 0 else second_trip
+            elif n == 2:
+                pairs.append(r)
+            else:
+                singles_mask |= 1 << r
+
+        if quad >= 0:
+            others = singles_mask | (1 << trip if trip >= 0 else 0) | (1 << second_trip if second_trip >= 0 else 0)
+            for r in pairs:
+                others |= 1 << r
+            kicker = others.bit_length() - 1
+            return (HandRank.FOUR_OF_A_KIND << CATEGORY_SHIFT) | ((quad + 2) << 16) | ((kicker + 2) << 12)
+
+        if trip >= 0 and (pairs or second_trip >= 0):
+            pair = max(pairs[0] if pairs else -1, second_trip)
+            return (HandRank.FULL_HOUSE << CATEGORY_SHIFT) | ((trip + 2) << 16) | ((pair + 2) << 12)
+
+        if flush_mask:
+            return FastEvaluator.encode(HandRank.FLUSH, _top_values(flush_mask, 5))
+
+        rank_mask = suit_masks[0] | suit_masks[1] | suit_masks[2] | suit_masks[3]
+        straight = STRAIGHT_HIGH[rank_mask]
+        if straight:
+            return (HandRank.STRAIGHT << CATEGORY_SHIFT) | (straight << 16)
+
+        if trip >= 0:
+            return FastEvaluator.encode(
+                HandRank.THREE_OF_A_KIND, [trip + 2] + _top_values(singles_mask, 2)
+            )
+
+        if len(pairs) >= 2:
+            rest = singles_mask
+            for r in pairs[2:]:
+                rest |= 1 << r
+            return FastEvaluator.encode(
+                HandRank.TWO_PAIR, [pairs[0] + 2, pairs[1] + 2] + _top_values(rest, 1)
+            )
+
+        if pairs:
+            return FastEvaluator.encode(
+                HandRank.PAIR, [pairs[0] + 2] + _top_values(singles_mask, 3)
+            )
+
+        return FastEvaluator.encode(HandRank.HIGH_CARD, _top_values(singles_mask, 5))
+
+    @staticmethod
+    def evaluate_cards(cards: List[Card]) -> int:
+        """评估Card对象列表"""
+        return FastEvaluator.evaluate([card.to_int() for card in cards])
+
+    @staticmethod
+    def category(strength: int) -> int:
+        """获取整数牌力对应的牌型等级"""
+        return strength >> CATEGORY_SHIFT
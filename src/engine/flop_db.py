@@ -0,0 +1,456 @@
+"""
+Precomputed flop strategy database with memory-mapped lookup
+预计算翻牌策略数据库（内存映射查询）
+"""
+
+import mmap
+import os
+import struct
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import combinations, permutations
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from ..core.card import Card, Hand
+from ..utils.constants import Action, HandRank, Position, STANDARD_POSTFLOP_BETS
+from .fast_evaluator import FastEvaluator, straight_high
+from .ranges import COMBOS, HandRange
+from .tables import get_table, register_table
+
+# ----------------------------------------------------------------------
+# 规范化翻牌（花色同构）
+# ----------------------------------------------------------------------
+
+SUIT_PERMUTATIONS: List[Tuple[int, ...]] = list(permutations(range(4)))
+
+def canonicalize_flop(cards: Sequence[int]) -> Tuple[Tuple[int, int, int], Tuple[int, ...]]:
+    """
+    翻牌的规范形式：在24种花色置换下取字典序最小的排序元组
+    :return: (规范翻牌, 使用的花色置换)，置换可用于把手牌映射到同一坐标系
+    """
+    best = None
+    best_perm = None
+    for perm in SUIT_PERMUTATIONS:
+        mapped = tuple(sorted(((c & ~3) | perm[c & 3] for c in cards), reverse=True))
+        if best is None or mapped < best:
+            best = mapped
+            best_perm = perm
+    return best, best_perm
+
+def canonical_flop(cards: Sequence[int]) -> Tuple[int, int, int]:
+    """翻牌的规范形式"""
+    return canonicalize_flop(cards)[0]
+
+def _build_canonical_flops() -> bytes:
+    flops = sorted({canonical_flop(flop) for flop in combinations(range(52), 3)})
+    return bytes(c for flop in flops for c in flop)
+
+register_table('canonical_flops', _build_canonical_flops)
+
+@lru_cache(maxsize=None)
+def canonical_flops() -> List[Tuple[int, int, int]]:
+    """全部1755个规范翻牌（排序后的顺序即数据库中的翻牌编号）"""
+    data = get_table('canonical_flops')
+    return [tuple(data[i:i + 3]) for i in range(0, len(data), 3)]
+
+@lru_cache(maxsize=None)
+def flop_index() -> Dict[Tuple[int, int, int], int]:
+    """规范翻牌 -> 翻牌编号"""
+    return {flop: i for i, flop in enumerate(canonical_flops())}
+
+# ----------------------------------------------------------------------
+# 翻牌后的手牌类别
+# ----------------------------------------------------------------------
+
+class FlopHandClass:
+    """
+    翻牌圈手牌类别（与花色无关的抽象）
+    """
+    AIR = 0
+    OVERCARDS = 1
+    DRAW = 2            # 同花听牌或两头顺听牌
+    COMBO_DRAW = 3      # 同花+顺子听牌
+    WEAK_PAIR = 4       # 底对/小口袋对
+    MIDDLE_PAIR = 5
+    TOP_PAIR = 6
+    OVERPAIR = 7
+    TWO_PAIR = 8
+    SET = 9             # 三条
+    STRAIGHT = 10
+    FLUSH = 11
+    FULL_HOUSE_PLUS = 12
+
+NUM_HAND_CLASSES = 13
+
+def classify_flop_hand(hole: Sequence[int], flop: Sequence[int]) -> int:
+    """根据两张手牌和三张翻牌计算手牌类别"""
+    category = FastEvaluator.category(FastEvaluator.evaluate(list(hole) + list(flop)))
+    if category >= HandRank.FULL_HOUSE:
+        return FlopHandClass.FULL_HOUSE_PLUS
+    if category == HandRank.FLUSH:
+        return FlopHandClass.FLUSH
+    if category == HandRank.STRAIGHT:
+        return FlopHandClass.STRAIGHT
+    if category == HandRank.THREE_OF_A_KIND:
+        return FlopHandClass.SET
+    if category == HandRank.TWO_PAIR:
+        # 公共牌对子+手牌对子不算真正的两对
+        board_ranks = [c >> 2 for c in flop]
+        if len(set(board_ranks)) == 3:
+            return FlopHandClass.TWO_PAIR
+
+    board_ranks = sorted((c >> 2 for c in flop), reverse=True)
+    hole_ranks = sorted((c >> 2 for c in hole), reverse=True)
+    if category in (HandRank.PAIR, HandRank.TWO_PAIR):
+        if hole_ranks[0] == hole_ranks[1] and hole_ranks[0] not in board_ranks:
+            if hole_ranks[0] > board_ranks[0]:
+                return FlopHandClass.OVERPAIR
+            return FlopHandClass.MIDDLE_PAIR if hole_ranks[0] > board_ranks[-1] else FlopHandClass.WEAK_PAIR
+        paired = [r for r in hole_ranks if r in board_ranks]
+        if paired:
+            if paired[0] == board_ranks[0]:
+                return FlopHandClass.TOP_PAIR
+            return FlopHandClass.MIDDLE_PAIR if paired[0] > board_ranks[-1] else FlopHandClass.WEAK_PAIR
+
+    # 听牌
+    cards = list(hole) + list(flop)
+    suit_counts = [0, 0, 0, 0]
+    for c in cards:
+        suit_counts[c & 3] += 1
+    flush_draw = max(suit_counts) == 4 and any(suit_counts[c & 3] == 4 for c in hole)
+    rank_mask = 0
+    for c in cards:
+        rank_mask |= 1 << (c >> 2)
+    outs = sum(
+        1 for r in range(13)
+        if not rank_mask & (1 << r) and straight_high(rank_mask | (1 << r))
+    )
+    straight_draw = outs >= 2
+    if flush_draw and straight_draw:
+        return FlopHandClass.COMBO_DRAW
+    if flush_draw or straight_draw:
+        return FlopHandClass.DRAW
+    if category == HandRank.HIGH_CARD and min(hole_ranks) > board_ranks[0]:
+        return FlopHandClass.OVERCARDS
+    return FlopHandClass.AIR
+
+# ----------------------------------------------------------------------
+# 翻前场景
+# ----------------------------------------------------------------------
+
+@dataclass
+class FlopScenario:
+    """
+    翻前场景：谁加注、谁跟注，以及双方进入翻牌的范围
+    """
+    name: str
+    aggressor: Position
+    caller: Position
+    aggressor_range: str
+    caller_range: str
+
+DEFAULT_SCENARIOS: List[FlopScenario] = [
+    FlopScenario(
+        "SRP_UTG_BB", Position.UTG, Position.BB,
+        "AA,KK,QQ,JJ,TT,99,88,77,AK,AQ,AJs,ATs,KQ,KJs,QJs,JTs,T9s,98s",
+        "JJ,TT,99,88,77,66,55,44,33,22,AQo,AJ,AT,A9s,A5s,A4s,KQ,KJ,KTs,QJ,QTs,JTs,T9s,98s,87s,76s,65s"
+    ),
+    FlopScenario(
+        "SRP_CO_BB", Position.CO, Position.BB,
+        "AA,KK,QQ,JJ,TT,99,88,77,66,55,AK,AQ,AJ,AT,A9s,A8s,A5s,A4s,KQ,KJ,KTs,QJ,QTs,JTs,T9s,98s,87s,76s",
+        "TT,99,88,77,66,55,44,33,22,AJo,AT,A9,A8s,A7s,A6s,A5s,A4s,A3s,A2s,KQ,KJ,KT,K9s,QJ,QT,Q9s,JT,J9s,T9,T8s,98,97s,87s,86s,76s,65s,54s"
+    ),
+    FlopScenario(
+        "SRP_BTN_BB", Position.BTN, Position.BB,
+        "AA,KK,QQ,JJ,TT,99,88,77,66,55,44,33,22,AK,AQ,AJ,AT,A9,A8,A7s,A6s,A5s,A4s,A3s,A2s,KQ,KJ,KT,K9s,K8s,QJ,QT,Q9s,JT,J9s,T9,T8s,98s,97s,87s,76s,65s,54s",
+        "99,88,77,66,55,44,33,22,AT,A9,A8,A7,A6s,A5s,A4s,A3s,A2s,KJ,KT,K9,K8s,K7s,QJ,QT,Q9,Q8s,JT,J9,J8s,T9,T8s,98,97s,87,86s,76,75s,65s,54s"
+    ),
+    FlopScenario(
+        "SRP_SB_BB", Position.SB, Position.BB,
+        "AA,KK,QQ,JJ,TT,99,88,77,66,55,44,33,22,AK,AQ,AJ,AT,A9,A8,A7,A6,A5,A4,A3s,A2s,KQ,KJ,KT,K9,K8s,K7s,QJ,QT,Q9,Q8s,JT,J9,J8s,T9,T8s,98,97s,87,86s,76s,65s,54s",
+        "99,88,77,66,55,44,33,22,AT,A9,A8,A7,A6,A5,A4,A3,A2,KJ,KT,K9,K8,K7s,K6s,QJ,QT,Q9,Q8s,JT,J9,J8s,T9,T8,98,97s,87,86s,76,65s,54s"
+    ),
+    FlopScenario(
+        "3BP_BTN_CO", Position.BTN, Position.CO,
+        "AA,KK,QQ,JJ,TT,AK,AQs,AJs,A5s,A4s,KQs,KJs,QJs,JTs",
+        "99,88,77,66,AQo,AJs,ATs,KQ,KJs,KTs,QJs,QTs,JTs,T9s,98s"
+    ),
+    FlopScenario(
+        "3BP_BB_BTN", Position.BB, Position.BTN,
+        "AA,KK,QQ,JJ,TT,AK,AQ,AJs,ATs,A5s,A4s,KQs,KJs,QJs,JTs,T9s,76s,65s",
+        "99,88,77,66,55,AQo,AJ,ATs,A9s,KQ,KJs,KTs,QJs,QTs,JTs,T9s,98s,87s"
+    ),
+]
+
+# 策略向量的行动顺序：过牌 + 各下注尺度
+ACTION_LABELS: List[str] = [Action.CHECK.value] + [
+    f"{Action.RAISE.value}:{name}" for name in STANDARD_POSTFLOP_BETS
+]
+NUM_ACTIONS = len(ACTION_LABELS)
+
+# ----------------------------------------------------------------------
+# 启发式近似策略
+# CFR求解器只覆盖转牌/河牌子博弈，翻牌策略没有求解结果可用；
+# 以下规则按手牌类别、牌面湿润度和范围优势给出频率，不是均衡解
+# ----------------------------------------------------------------------
+
+def board_wetness(flop: Sequence[int]) -> float:
+    """牌面湿润度(0-1)：同花/连张程度"""
+    suit_counts = [0, 0, 0, 0]
+    for c in flop:
+        suit_counts[c & 3] += 1
+    ranks = sorted({c >> 2 for c in flop})
+    flush_score = {1: 0.0, 2: 0.5, 3: 1.0}[max(suit_counts)]
+    span = ranks[-1] - ranks[0] if len(ranks) > 1 else 12
+    connected = 1.0 if len(ranks) == 3 and span <= 4 else 0.5 if span <= 4 else 0.0
+    return min(1.0, 0.5 * flush_score + 0.5 * connected)
+
+def range_advantage(ranges: Sequence[HandRange], flop: Sequence[int]) -> float:
+    """
+    加注者在该翻牌上的范围优势(-1到1)：双方范围中顶对以上组合占比之差
+    :param ranges: (加注者范围, 跟注者范围)
+    """
+    dead = set(flop)
+    shares = []
+    for hand_range in ranges:
+        total = strong = 0.0
+        for index in hand_range.combos():
+            a, b = COMBOS[index]
+            if a in dead or b in dead:
+                continue
+            weight = hand_range.weights[index]
+            total += weight
+            if classify_flop_hand((a, b), flop) >= FlopHandClass.TOP_PAIR:
+                strong += weight
+        shares.append(strong / total if total else 0.0)
+    return max(-1.0, min(1.0, (shares[0] - shares[1]) * 4))
+
+def approximate_strategy(scenario: FlopScenario, flop: Sequence[int], hand_class: int,
+                         advantage: float) -> List[float]:
+    """
+    加注者翻牌圈首次行动的启发式策略（行动顺序见ACTION_LABELS）
+    干燥牌面偏小注高频，湿润牌面偏大注两极化；频率来自手写规则而非求解
+    """
+    wetness = board_wetness(flop)
+    if hand_class >= FlopHandClass.TWO_PAIR:
+        bet_frequency = 0.85
+    elif hand_class >= FlopHandClass.TOP_PAIR:
+        bet_frequency = 0.65 + 0.2 * advantage
+    elif hand_class in (FlopHandClass.DRAW, FlopHandClass.COMBO_DRAW):
+        bet_frequency = 0.55 + 0.15 * (hand_class == FlopHandClass.COMBO_DRAW)
+    elif hand_class in (FlopHandClass.MIDDLE_PAIR, FlopHandClass.WEAK_PAIR):
+        bet_frequency = 0.25 + 0.15 * advantage
+    else:
+        bet_frequency = 0.3 + 0.3 * advantage
+    bet_frequency = max(0.0, min(1.0, bet_frequency))
+
+    # 各下注尺度的分配：湿润度决定尺度中心
+    sizes = list(STANDARD_POSTFLOP_BETS.values())
+    target = 0.33 + 0.8 * wetness
+    raw = [1.0 / (0.1 + abs(size - target)) for size in sizes]
+    total = sum(raw)
+    return [1.0 - bet_frequency] + [bet_frequency * w / total for w in raw]
+
+def quantize(frequencies: Sequence[float]) -> bytes:
+    """把频率向量量化为和为255的字节"""
+    total = sum(frequencies) or 1.0
+    scaled = [f / total * 255 for f in frequencies]
+    values = [int(v) for v in scaled]
+    # 余数按小数部分从大到小补齐
+    remainder = 255 - sum(values)
+    order = sorted(range(len(scaled)), key=lambda i: scaled[i] - values[i], reverse=True)
+    for i in order[:remainder]:
+        values[i] += 1
+    return bytes(values)
+
+# ----------------------------------------------------------------------
+# 文件格式
+# 头部: 魔数(4) 版本 场景数 翻牌数 类别数 行动数 (各uint16)
+# 策略来源: 32字节（如'heuristic'）
+# 场景名表: 每个32字节
+# 数据: uint8[场景][翻牌][类别][行动]，每个条目的频率和为255
+# ----------------------------------------------------------------------
+
+MAGIC = b'PFDB'
+FORMAT_VERSION = 2
+HEADER = struct.Struct('<4sHHHHH')
+NAME_SIZE = 32
+# approximate_strategy构建的数据库记录的策略来源
+HEURISTIC_SOURCE = 'heuristic'
+
+StrategyFunction = Callable[[FlopScenario, Sequence[int], int, float], List[float]]
+
+def _pack_name(name: str) -> bytes:
+    return name.encode('ascii')[:NAME_SIZE].ljust(NAME_SIZE, b'\0')
+
+def _unpack_name(buffer, start: int) -> str:
+    return bytes(buffer[start:start + NAME_SIZE]).rstrip(b'\0').decode('ascii')
+
+def _build_scenario(args) -> bytes:
+    """构建一个场景的全部数据（供进程池调用）"""
+    scenario, strategy_fn = args
+    ranges = (
+        HandRange.from_string(scenario.aggressor_range),
+        HandRange.from_string(scenario.caller_range)
+    )
+    chunks = []
+    for flop in canonical_flops():
+        advantage = range_advantage(ranges, flop)
+        for hand_class in range(NUM_HAND_CLASSES):
+            chunks.append(quantize(strategy_fn(scenario, flop, hand_class, advantage)))
+    return b''.join(chunks)
+
+class FlopDatabaseBuilder:
+    """
+    构建翻牌策略数据库
+    策略函数没有默认值：调用方必须明确选择策略来源（如approximate_strategy），
+    来源名写入文件头，查询时可以区分启发式和求解结果
+    """
+
+    def __init__(
+        self,
+        strategy_fn: StrategyFunction,
+        source: str,
+        scenarios: Optional[List[FlopScenario]] = None
+    ):
+        """
+        :param strategy_fn: (场景, 规范翻牌, 手牌类别, 范围优势) -> 频率向量
+        :param source: 策略来源名，如HEURISTIC_SOURCE
+        :param scenarios: 翻前场景，默认DEFAULT_SCENARIOS
+        """
+        self.strategy_fn = strategy_fn
+        self.source = source
+        self.scenarios = scenarios or DEFAULT_SCENARIOS
+
+    def build_bytes(self, workers: int = 1) -> bytes:
+        """
+        构建数据库的完整内容
+        :param workers: 并行进程数，按场景划分任务
+        """
+        tasks = [(scenario, self.strategy_fn) for scenario in self.scenarios]
+        if workers > 1:
+            from multiprocessing import Pool
+            with Pool(workers) as pool:
+                blocks = pool.map(_build_scenario, tasks)
+        else:
+            blocks = [_build_scenario(task) for task in tasks]
+
+        header = HEADER.pack(
+            MAGIC, FORMAT_VERSION, len(self.scenarios), len(canonical_flops()),
+            NUM_HAND_CLASSES, NUM_ACTIONS
+        )
+        names = b''.join(_pack_name(scenario.name) for scenario in self.scenarios)
+        return header + _pack_name(self.source) + names + b''.join(blocks)
+
+    def build(self, path: str, workers: int = 1) -> None:
+        """构建并写入数据库文件（先写临时文件再原子替换）"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(self.build_bytes(workers))
+        os.replace(tmp_path, path)
+
+def heuristic_builder(scenarios: Optional[List[FlopScenario]] = None) -> FlopDatabaseBuilder:
+    """用approximate_strategy构建的启发式数据库"""
+    return FlopDatabaseBuilder(approximate_strategy, HEURISTIC_SOURCE, scenarios)
+
+# 构建要跑满全部CPU，只能通过命令行显式预构建，不在查询时隐式触发
+register_table(
+    'flop_db',
+    lambda: heuristic_builder().build_bytes(os.cpu_count() or 1),
+    version=FORMAT_VERSION,
+    on_demand=False
+)
+
+class FlopDatabase:
+    """
+    只读的翻牌策略数据库
+    文件通过mmap映射，多个进程打开同一文件时共享页缓存；查询直接读取字节，无需反序列化
+    """
+
+    def __init__(self, path: Optional[str] = None, buffer: Optional[memoryview] = None):
+        """
+        :param path: 数据库文件路径
+        :param buffer: 已映射的数据（如TableManager管理的缓存），与path二选一
+        """
+        self.path = path
+        self._mm = None
+        if buffer is None:
+            with open(path, 'rb') as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            buffer = memoryview(self._mm)
+        self._buffer = buffer
+        magic, version, num_scenarios, num_flops, num_classes, num_actions = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported flop database: {path}")
+        if (num_flops, num_classes, num_actions) != (len(canonical_flops()), NUM_HAND_CLASSES, NUM_ACTIONS):
+            raise ValueError("Flop database layout does not match this version")
+        self.num_actions = num_actions
+        self.source = _unpack_name(buffer, HEADER.size)
+        names_start = HEADER.size + NAME_SIZE
+        self.scenario_index: Dict[str, int] = {}
+        for i in range(num_scenarios):
+            self.scenario_index[_unpack_name(buffer, names_start + i * NAME_SIZE)] = i
+        self._data_start = names_start + num_scenarios * NAME_SIZE
+        self._flop_stride = num_classes * num_actions
+        self._scenario_stride = num_flops * self._flop_stride
+
+    def offset(self, scenario: str, flop: Sequence[int], hand_class: int) -> int:
+        """(场景, 规范翻牌, 手牌类别) -> 数据偏移"""
+        return (
+            self._data_start
+            + self.scenario_index[scenario] * self._scenario_stride
+            + flop_index()[canonical_flop(flop)] * self._flop_stride
+            + hand_class * self.num_actions
+        )
+
+    def lookup_raw(self, scenario: str, flop: Sequence[int], hand_class: int) -> memoryview:
+        """返回量化频率的只读视图（零拷贝）"""
+        start = self.offset(scenario, flop, hand_class)
+        return self._buffer[start:start + self.num_actions]
+
+    def lookup(self, scenario: str, flop: List[Card], hand: Hand) -> Dict[str, float]:
+        """
+        查询某手牌在某场景和翻牌下的策略
+        :return: 行动标签 -> 频率
+        """
+        flop_ints = [card.to_int() for card in flop]
+        hole = [card.to_int() for card in hand.cards]
+        with self.lookup_raw(scenario, flop_ints, classify_flop_hand(hole, flop_ints)) as raw:
+            return {label: value / 255 for label, value in zip(ACTION_LABELS, raw)}
+
+    def scenarios(self) -> List[str]:
+        return list(self.scenario_index)
+
+    @property
+    def is_heuristic(self) -> bool:
+        """策略是否来自启发式规则（而不是求解器）"""
+        return self.source == HEURISTIC_SOURCE
+
+    def close(self) -> None:
+        """关闭自己映射的文件（TableManager提供的数据由管理器负责）"""
+        if self._mm is not None:
+            self._buffer.release()
+            self._mm.close()
+
+    @classmethod
+    def default(cls) -> 'FlopDatabase':
+        """
+        默认场景的启发式数据库，由TableManager缓存
+        不会隐式构建：需要先运行 python -m src.engine.tables flop_db
+        :raises RuntimeError: 数据库尚未构建
+        """
+        return cls(buffer=get_table('flop_db'))
+
+if __name__ == '__main__':
+    # python -m src.engine.flop_db --heuristic <输出文件> [进程数]
+    # 目前只有启发式策略可用，必须显式指定--heuristic
+    args = sys.argv[1:]
+    if not args or args[0] != '--heuristic':
+        sys.exit(
+            "usage: python -m src.engine.flop_db --heuristic <output> [workers]\n"
+            "No solver-backed flop strategy is available; --heuristic builds "
+            "the rule-based approximation"
+        )
+    output = args[1] if len(args) > 1 else 'flop_db.bin'
+    heuristic_builder().build(output, int(args[2]) if len(args) > 2 else os.cpu_count() or 1)
+    print(f"Wrote {output} ({HEURISTIC_SOURCE})")
@@ -0,0 +1,261 @@
+"""
+Bayesian range narrowing from observed actions
+根据观察到的动作逐步收窄对手范围（贝叶斯更新）
+"""
+
+import math
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from ..core.card import Card, Hand
+from ..core.game_state import GameState
+from ..utils.constants import Action, Position, Stage, POSITION_CONTINUE_FRACTIONS
+from .buckets import board_hand_strengths
+from .evaluator import HandEvaluator
+from .ranges import COMBOS, NUM_COMBOS, HandRange
+
+# 牌力量化的档数，似然按档查表，一次更新只是1326次乘法
+STRENGTH_LEVELS = 50
+# 下注尺度（占底池比例）的分档上界，最后一档为超池
+SIZING_BOUNDS = (0.4, 0.8, 1.2)
+SIZING_CENTERS = (0.33, 0.6, 1.0, 1.5)
+# 先验/似然的最小值，保证诈唬和慢打组合不会被完全排除
+PRIOR_FLOOR = 0.02
+
+# 两张牌到组合编号的二维表（同一张牌的位置无效）
+COMBOS_BY_CARDS: List[List[int]] = [[0] * 52 for _ in range(52)]
+for _i, (_a, _b) in enumerate(COMBOS):
+    COMBOS_BY_CARDS[_a][_b] = _i
+    COMBOS_BY_CARDS[_b][_a] = _i
+
+def _sigmoid(x: float) -> float:
+    return 1.0 / (1.0 + math.exp(-x))
+
+def _level_strength(level: int) -> float:
+    """第level档的中心牌力"""
+    return (level + 0.5) / STRENGTH_LEVELS
+
+def _quantize(strength: float) -> int:
+    return min(STRENGTH_LEVELS - 1, int(strength * STRENGTH_LEVELS))
+
+def _sizing_class(fraction: float) -> int:
+    for i, bound in enumerate(SIZING_BOUNDS):
+        if fraction < bound:
+            return i
+    return len(SIZING_BOUNDS)
+
+@lru_cache(maxsize=1)
+def preflop_percentiles() -> Tuple[float, ...]:
+    """
+    每个组合的翻前牌力百分位(0-1)，按HandEvaluator.calculate_preflop_rank排序，同分取平均
+    """
+    scores = [
+        HandEvaluator.calculate_preflop_rank(Hand([Card.from_int(a), Card.from_int(b)]))
+        for a, b in COMBOS
+    ]
+    order = sorted(range(NUM_COMBOS), key=scores.__getitem__)
+    result = [0.0] * NUM_COMBOS
+    start = 0
+    while start < NUM_COMBOS:
+        end = start
+        while end < NUM_COMBOS and scores[order[end]] == scores[order[start]]:
+            end += 1
+        percentile = (start + end) / 2 / NUM_COMBOS
+        for i in order[start:end]:
+            result[i] = percentile
+        start = end
+    return tuple(result)
+
+def position_prior(position: Position) -> HandRange:
+    """
+    位置先验：该位置继续玩的起手牌比例内的组合权重接近1，之外的平滑衰减到PRIOR_FLOOR
+    （不会继续玩的组合最终会弃牌，不影响我们面对的范围）
+    """
+    threshold = 1.0 - POSITION_CONTINUE_FRACTIONS[position]
+    return HandRange([
+        PRIOR_FLOOR + (1.0 - PRIOR_FLOOR) * _sigmoid((percentile - threshold) / 0.04)
+        for percentile in preflop_percentiles()
+    ])
+
+class ActionModel:
+    """
+    动作似然模型：P(动作 | 组合的牌力档, 下注尺度档)
+    每种(动作, 尺度档)一张长度为STRENGTH_LEVELS的表，首次使用时生成
+    强牌更常下注/加注，中等牌更常跟注，过牌的范围封顶
+    """
+
+    def __init__(self):
+        self._tables: Dict[Tuple[Action, int], List[float]] = {}
+
+    @staticmethod
+    def _likelihood(action: Action, fraction: float, strength: float) -> float:
+        if action == Action.CHECK:
+            return 1.0 - 0.7 * _sigmoid((strength - 0.75) / 0.08)
+        if action == Action.CALL:
+            threshold = 0.35 + 0.15 * min(fraction, 1.5)
+            return 0.15 + 0.85 * _sigmoid((strength - threshold) / 0.1)
+        # RAISE/ALL_IN: 尺度越大，价值部分越集中在强牌，保留少量诈唬
+        threshold = min(0.6 + 0.1 * min(fraction, 2.0), 0.85)
+        return 0.08 + 0.92 * _sigmoid((strength - threshold) / 0.08)
+
+    def table(self, action: Action, sizing: int) -> List[float]:
+        """某动作在某尺度档下各牌力档的似然"""
+        if action == Action.ALL_IN:
+            sizing = len(SIZING_CENTERS) - 1
+        key = (action, sizing)
+        table = self._tables.get(key)
+        if table is None:
+            fraction = SIZING_CENTERS[sizing]
+            table = [
+                max(PRIOR_FLOOR, self._likelihood(action, fraction, _level_strength(level)))
+                for level in range(STRENGTH_LEVELS)
+            ]
+            self._tables[key] = table
+        return table
+
+def pot_before_actions(game_state: GameState) -> int:
+    """当前底池减去各街已记录动作的投入，即回放这些动作之前的底池（包括盲注、前注）"""
+    recorded = sum(
+        record.amount
+        for street in (game_state.preflop_state, game_state.flop_state,
+                       game_state.turn_state, game_state.river_state)
+        for record in street.actions
+        if record.action in (Action.CALL, Action.RAISE, Action.ALL_IN)
+    )
+    return max(0, game_state.current_pot - recorded)
+
+class RangeTracker:
+    """
+    对手范围跟踪器
+    每个对手从位置先验开始，每观察到一个动作就把其权重向量乘以该动作的似然（只处理新动作），
+    新公共牌到来时去掉冲突组合并重新计算一次各组合的牌力档（所有对手共用）
+    """
+
+    def __init__(
+        self,
+        hero_hand: Hand,
+        opponents: Iterable[Position],
+        pot: int,
+        model: Optional[ActionModel] = None
+    ):
+        """
+        :param hero_hand: 我的手牌（阻断牌）
+        :param opponents: 需要跟踪的对手位置
+        :param pot: 第一个待观察动作之前的底池（用于计算下注尺度，为0时任何下注都按超池处理）
+        """
+        self.model = model or ActionModel()
+        self.dead = {card.to_int() for card in hero_hand.cards}
+        self.board: List[int] = []
+        self.pot = pot
+        self.stage = Stage.PREFLOP
+        self.folded: List[Position] = []
+        self.acted: List[Position] = []
+        self.ranges: Dict[Position, HandRange] = {}
+        for position in opponents:
+            hand_range = position_prior(position)
+            self._remove_dead(hand_range, self.dead)
+            self.ranges[position] = hand_range
+        self._levels = [_quantize(p) for p in preflop_percentiles()]
+        self._consumed: Dict[Stage, int] = {}
+
+    @classmethod
+    def from_game_state(
+        cls,
+        game_state: GameState,
+        pot: Optional[int] = None,
+        model: Optional[ActionModel] = None
+    ) -> 'RangeTracker':
+        """
+        为除自己以外的所有位置建立跟踪器，并同步已记录的动作和公共牌
+        :param pot: 第一个已记录动作之前的底池，默认由当前底池减去已记录动作的投入得出
+        """
+        if pot is None:
+            pot = pot_before_actions(game_state)
+        tracker = cls(
+            game_state.my_hand,
+            [pos for pos in Position if pos != game_state.my_position],
+            pot,
+            model,
+        )
+        tracker.sync(game_state)
+        return tracker
+
+    @staticmethod
+    def _remove_dead(hand_range: HandRange, cards: Iterable[int]) -> None:
+        """原地把与给定牌冲突的组合权重置0"""
+        weights = hand_range.weights
+        for card in cards:
+            for other in range(52):
+                if other != card:
+                    weights[COMBOS_BY_CARDS[card][other]] = 0.0
+
+    def observe(self, position: Position, action: Action, amount: int = 0) -> None:
+        """
+        观察一个动作并更新该对手的范围（其他对手的范围不变）
+        :param amount: 本次新投入的筹码，与GameState.record_action一致
+        """
+        hand_range = self.ranges.get(position)
+        if hand_range is not None and position not in self.acted:
+            self.acted.append(position)
+        if action == Action.FOLD:
+            if hand_range is not None and position not in self.folded:
+                self.folded.append(position)
+            return
+        if hand_range is not None and position not in self.folded:
+            fraction = amount / self.pot if self.pot > 0 else SIZING_CENTERS[-1]
+            if self.stage == Stage.PREFLOP:
+                # 翻前的下注尺度参考意义小，统一按中等尺度
+                fraction = SIZING_CENTERS[1]
+            table = self.model.table(action, _sizing_class(fraction))
+            levels = self._levels
+            weights = [weight * table[levels[i]] for i, weight in enumerate(hand_range.weights)]
+            # 归一化使最大权重为1，避免长动作序列后下溢
+            peak = max(weights)
+            if peak > 0:
+                scale = 1.0 / peak
+                weights = [weight * scale for weight in weights]
+            hand_range.weights = weights
+        if action in (Action.CALL, Action.RAISE, Action.ALL_IN):
+            self.pot += amount
+
+    def add_board(self, cards: Sequence[int]) -> None:
+        """新的公共牌：去掉冲突组合，重新计算牌力档"""
+        new_cards = [card for card in cards if card not in self.board]
+        if not new_cards:
+            return
+        self.board.extend(new_cards)
+        for hand_range in self.ranges.values():
+            self._remove_dead(hand_range, new_cards)
+        if len(self.board) >= 3:
+            strengths = board_hand_strengths(self.board)
+            self._levels = [_quantize(max(strength, 0.0)) for strength in strengths]
+            self.stage = {3: Stage.FLOP, 4: Stage.TURN}.get(len(self.board), Stage.RIVER)
+
+    def sync(self, game_state: GameState) -> None:
+        """
+        从GameState同步：只处理上次同步之后新增的公共牌和动作记录
+        """
+        streets = [
+            (Stage.PREFLOP, game_state.preflop_state),
+            (Stage.FLOP, game_state.flop_state),
+            (Stage.TURN, game_state.turn_state),
+            (Stage.RIVER, game_state.river_state),
+        ]
+        for stage, street in streets:
+            if stage != Stage.PREFLOP and street.community_cards:
+                self.add_board([card.to_int() for card in street.community_cards])
+            consumed = self._consumed.get(stage, 0)
+            for record in street.actions[consumed:]:
+                self.observe(record.player_position, record.action, record.amount)
+            self._consumed[stage] = len(street.actions)
+            if stage == game_state.current_stage:
+                break
+
+    def opponent_ranges(self) -> List[HandRange]:
+        """已经行动过且未弃牌的对手的范围（没有记录动作的位置不计入）"""
+        return [
+            self.ranges[position] for position in self.acted
+            if position not in self.folded
+        ]
+
+    def range_of(self, position: Position) -> HandRange:
+        return self.ranges[position]
@@ -0,0 +1,584 @@
+"""
+Monte Carlo tree search lookahead for postflop decisions
+翻牌后决策的蒙特卡洛树搜索(ISMCTS)前瞻
+"""
+
+import math
+import time
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from itertools import accumulate
+from typing import Dict, List, Optional, Sequence, Tuple
+from ..core.game_state import GameState
+from ..utils.constants import Action, Position, Stage, STANDARD_POSTFLOP_BETS
+from .buckets import board_hand_strengths
+from .evaluator import PositionEvaluator
+from .fast_evaluator import CATEGORY_SHIFT, FastEvaluator
+from .inference import COMBOS_BY_CARDS, PRIOR_FLOOR, ActionModel, _quantize, _sigmoid, _sizing_class
+from .ranges import COMBOS, HandRange
+from .rng import RandomStream
+from .side_pot import SidePotCalculator
+
+# 搜索中的街：0=翻牌，1=转牌，2=河牌
+STREETS = [Stage.FLOP, Stage.TURN, Stage.RIVER]
+BOARD_SIZES = (3, 4, 5)
+RIVER = len(STREETS) - 1
+
+# 翻牌后的行动顺序（SB最先，BTN最后）
+POSTFLOP_ORDER = PositionEvaluator.get_positions_to_act(Position.BTN) + [Position.BTN]
+
+# 工作进程用到的缓存表（评估器的小表在进程内构建）
+MCTS_TABLES: List[str] = []
+
+# 各牌型在0-1牌力上的区间，段内按最大关键牌线性插值
+MADE_HAND_BANDS = [
+    (0.0, 0.3),     # 高牌
+    (0.3, 0.65),    # 一对
+    (0.65, 0.8),    # 两对
+    (0.8, 0.87),    # 三条
+    (0.87, 0.92),   # 顺子
+    (0.92, 0.96),   # 同花
+    (0.96, 0.99),   # 葫芦
+    (0.99, 1.0),    # 四条
+    (1.0, 1.0),     # 同花顺
+    (1.0, 1.0),     # 皇家同花顺
+]
+
+# 对手面对下注时继续（跟注/加注）所需的牌力：CONTINUE_BASE + CONTINUE_SLOPE * 底池赔率
+CONTINUE_BASE = 0.05
+CONTINUE_SLOPE = 1.6
+CONTINUE_WIDTH = 0.06
+
+def made_hand_strength(strength: int) -> float:
+    """
+    整数牌力到0-1牌力的粗略映射（只需一次评估）
+    用于搜索中后续街的随机公共牌：每张新公共牌都计算完整的HS表代价太高
+    """
+    low, high = MADE_HAND_BANDS[strength >> CATEGORY_SHIFT]
+    top = (strength >> 16) & 0xF
+    return low + (high - low) * max(top - 2, 0) / 12
+
+@dataclass
+class MCTSConfig:
+    """
+    搜索配置：预算、并行度和行动抽象
+    迭代数和时间两个预算先到者为准；设置了time_limit时结果不再逐次可复现
+    """
+    iterations: int = 5000               # 总迭代数（根并行时平均分给各进程）
+    time_limit: Optional[float] = 0.5    # 决策截止时间（秒，从调用开始计算，包括进程池启动）
+    workers: int = 1                     # 根并行的进程数
+    exploration: float = 0.7             # UCB探索系数（收益按底池+筹码归一化）
+    bet_sizes: Dict[str, float] = field(default_factory=lambda: {
+        "MEDIUM": STANDARD_POSTFLOP_BETS["MEDIUM"],
+        "LARGE": STANDARD_POSTFLOP_BETS["LARGE"],
+    })
+    max_raises: int = 2                  # 每条街最多的下注/加注次数
+    max_nodes: int = 200000              # 置换表的节点上限，满了之后只模拟不再扩展
+
+class SearchState:
+    """
+    搜索中的下注状态，玩家按翻牌后行动顺序编号
+    金额约定与GameState.record_action一致：CALL/RAISE的amount是本次新投入的筹码
+    """
+
+    __slots__ = (
+        'street', 'stacks', 'bets', 'contributions', 'folded', 'all_in', 'acted',
+        'current_bet', 'raises', 'actor', 'num_live', 'dead', 'terminal',
+    )
+
+    def copy(self) -> 'SearchState':
+        clone = SearchState.__new__(SearchState)
+        for name in SearchState.__slots__:
+            value = getattr(self, name)
+            setattr(clone, name, value[:] if isinstance(value, list) else value)
+        return clone
+
+    @property
+    def pot(self) -> int:
+        return self.dead + sum(self.contributions)
+
+    def options(self, bet_sizes: Sequence[float], max_raises: int) -> List[Tuple[Action, int]]:
+        """
+        当前行动者的行动菜单，规则与ActionManager.get_valid_actions相同：
+        面对下注时弃牌/跟注，否则过牌；加注金额取各下注尺度中不小于最小加注的部分，另加全下
+        （没有下注时弃牌劣于过牌，不列入菜单）
+        """
+        seat = self.actor
+        owed = self.current_bet - self.bets[seat]
+        stack = self.stacks[seat]
+        options = []
+        if owed > 0:
+            options.append((Action.FOLD, 0))
+            options.append((Action.CALL, min(owed, stack)))
+        else:
+            options.append((Action.CHECK, 0))
+        if stack > owed and self.raises < max_raises:
+            pot = self.pot
+            min_raise = max(owed * 2, pot * 0.5)
+            for size in bet_sizes:
+                # 先跟注再按跟注后底池的比例加注
+                amount = owed + int(size * (pot + owed))
+                if min_raise <= amount < stack and (Action.RAISE, amount) not in options:
+                    options.append((Action.RAISE, amount))
+            options.append((Action.RAISE, stack))
+        return options
+
+    def apply(self, action: Action, amount: int = 0) -> None:
+        """当前行动者执行动作，并把行动权交给下一个需要表态的玩家"""
+        seat = self.actor
+        self.acted[seat] = True
+        if action == Action.FOLD:
+            self.folded[seat] = True
+            self.num_live -= 1
+            if self.num_live == 1:
+                self.terminal = True
+                self.actor = -1
+                return
+        elif action != Action.CHECK:
+            self.stacks[seat] -= amount
+            self.bets[seat] += amount
+            self.contributions[seat] += amount
+            if self.stacks[seat] == 0:
+                self.all_in[seat] = True
+            if self.bets[seat] > self.current_bet:
+                self.current_bet = self.bets[seat]
+                self.raises += 1
+                for other in range(len(self.acted)):
+                    if other != seat:
+                        self.acted[other] = False
+        actor = self._next_to_act(seat)
+        if actor >= 0:
+            self.actor = actor
+        else:
+            self._end_street()
+
+    def _next_to_act(self, seat: int) -> int:
+        """seat之后第一个需要表态（未行动或未跟平）的玩家，没有则返回-1"""
+        n = len(self.stacks)
+        for step in range(1, n + 1):
+            other = (seat + step) % n
+            if self.folded[other] or self.all_in[other]:
+                continue
+            if not self.acted[other] or self.bets[other] < self.current_bet:
+                return other
+        return -1
+
+    def _end_street(self) -> None:
+        """本街结束：进入下一街，或在河牌/最多一人可行动时直接摊牌"""
+        active = sum(
+            1 for seat in range(len(self.stacks)) if not self.folded[seat] and not self.all_in[seat]
+        )
+        if self.street == RIVER or active <= 1:
+            self.street = RIVER
+            self.terminal = True
+            self.actor = -1
+            return
+        self.street += 1
+        for seat in range(len(self.stacks)):
+            self.bets[seat] = 0
+            self.acted[seat] = False
+        self.current_bet = 0
+        self.raises = 0
+        self.actor = self._next_to_act(len(self.stacks) - 1)
+
+    def key(self, board: Sequence[int]) -> int:
+        """
+        置换表的键：已发出的公共牌和下注状态的哈希（整数元组的哈希跨进程稳定）
+        不同动作顺序到达的相同筹码/下注/弃牌状态得到同一个键
+        """
+        return hash((
+            self.street,
+            tuple(board[:BOARD_SIZES[self.street]]),
+            tuple(self.stacks),
+            tuple(self.bets),
+            tuple(self.folded),
+            tuple(self.acted),
+            self.actor,
+            self.raises,
+        ))
+
+    def payoff(self, holes: Sequence[Sequence[int]], board: Sequence[int]) -> List[int]:
+        """
+        终局时每个玩家赢得的筹码
+        之前各街的底池作为死钱，由所有未弃牌的玩家争夺；本次搜索中的投入按边池规则分配
+        """
+        n = len(self.stacks)
+        live_mask = 0
+        for other in range(n):
+            if not self.folded[other]:
+                live_mask |= 1 << other
+        if self.num_live == 1:
+            winnings = [0] * n
+            winnings[live_mask.bit_length() - 1] = self.pot
+            return winnings
+        evaluate = FastEvaluator.evaluate
+        full_board = list(board)
+        strengths = [
+            evaluate(list(holes[other]) + full_board) if live_mask >> other & 1 else -1
+            for other in range(n)
+        ]
+        pots = [(self.dead, live_mask)] + SidePotCalculator.build_pots_array(self.contributions, live_mask)
+        return SidePotCalculator.award_pots_array(pots, strengths, range(n))
+
+@dataclass
+class SearchRoot:
+    """
+    搜索的根：参与玩家、我们的手牌、已知公共牌、下注状态和对手范围
+    只包含整数和列表，可以直接传给工作进程
+    """
+    positions: List[Position]
+    hero: int
+    hole: List[int]
+    board: List[int]
+    state: SearchState
+    ranges: List[Optional[List[float]]]
+
+    @classmethod
+    def from_game_state(
+        cls,
+        game_state: GameState,
+        ranges: Optional[Dict[Position, HandRange]] = None
+    ) -> 'SearchRoot':
+        """
+        从GameState建立搜索根（轮到我们行动）
+        对手为本手牌行动过且未弃牌的位置，没有记录时假设一名对手（我们不在大盲时为大盲）；
+        对手筹码未知（不大于0）时按我们的筹码计算；
+        需要跟注但本街没有记录对应下注时，把下注补记给我们之前最后行动的对手
+        :param ranges: 对手范围（如RangeTracker.ranges），不指定的对手手牌均匀随机
+        """
+        if game_state.current_stage == Stage.PREFLOP:
+            raise ValueError("MCTS advice is only available after the flop")
+        hero_position = game_state.my_position
+        street_state = game_state.get_current_street_state()
+        seen = set()
+        for street in (game_state.preflop_state, game_state.flop_state,
+                       game_state.turn_state, game_state.river_state):
+            for record in street.actions:
+                seen.add(record.player_position)
+        opponents = [
+            pos for pos in POSTFLOP_ORDER
+            if pos != hero_position and pos in seen and pos not in game_state.folded_positions
+        ]
+        if not opponents:
+            opponents = [Position.BB if hero_position != Position.BB else Position.BTN]
+        positions = [pos for pos in POSTFLOP_ORDER if pos == hero_position or pos in opponents]
+
+        street_bets = {pos: 0 for pos in positions}
+        acted = set()
+        raises = 0
+        for record in street_state.actions:
+            if record.player_position not in street_bets:
+                continue
+            acted.add(record.player_position)
+            if record.action in (Action.CALL, Action.RAISE, Action.ALL_IN):
+                street_bets[record.player_position] += record.amount
+            if record.action in (Action.RAISE, Action.ALL_IN):
+                raises += 1
+
+        hero = positions.index(hero_position)
+        state = SearchState.__new__(SearchState)
+        state.street = STREETS.index(game_state.current_stage)
+        state.stacks = [
+            game_state.my_stack if pos == hero_position
+            else (game_state.stacks.get(pos, 0) if game_state.stacks.get(pos, 0) > 0 else game_state.my_stack)
+            for pos in positions
+        ]
+        state.bets = [street_bets[pos] for pos in positions]
+        state.contributions = state.bets[:]
+        state.folded = [False] * len(positions)
+        state.all_in = [False] * len(positions)
+        state.acted = [pos in acted and pos != hero_position for pos in positions]
+        state.current_bet = state.bets[hero] + game_state.to_call
+        state.raises = raises
+        # 没有记录到的下注（如交互流程只输入了跟注额）算在我们之前最后行动的对手身上
+        unrecorded = state.current_bet - max(
+            bet for i, bet in enumerate(state.bets) if i != hero
+        )
+        if unrecorded > 0:
+            bettor = (hero - 1) % len(positions)
+            state.bets[bettor] += unrecorded
+            state.contributions[bettor] += unrecorded
+            state.stacks[bettor] = max(state.stacks[bettor] - unrecorded, 0)
+            state.all_in[bettor] = state.stacks[bettor] == 0
+            state.acted[bettor] = True
+            state.raises = max(raises, 1)
+            street_bets[positions[bettor]] += unrecorded
+        state.actor = hero
+        state.num_live = len(positions)
+        # 与求解器一致：本街开始时的底池 = 当前底池 - 本街已投入
+        state.dead = max(game_state.current_pot - sum(street_bets.values()), 1)
+        state.terminal = False
+
+        board = [card.to_int() for card in game_state.board()]
+        if len(board) != BOARD_SIZES[state.street]:
+            raise ValueError(f"Expected {BOARD_SIZES[state.street]} board cards on the {game_state.current_stage.value}")
+        return cls(
+            positions,
+            hero,
+            [card.to_int() for card in game_state.my_hand.cards],
+            board,
+            state,
+            [
+                ranges[pos].weights if ranges and pos in ranges and pos != hero_position else None
+                for pos in positions
+            ],
+        )
+
+@dataclass
+class SearchResult:
+    """根节点每个行动的统计：访问次数和平均收益（筹码）"""
+    options: List[Tuple[Action, int]]
+    visits: List[int]
+    totals: List[float]
+    iterations: int = 0
+    nodes: int = 0
+    elapsed: float = 0.0
+
+    def values(self) -> List[float]:
+        return [total / visits if visits else 0.0 for total, visits in zip(self.totals, self.visits)]
+
+    def best(self) -> int:
+        """访问次数最多的行动（稳健子节点），相同时取平均收益较大者"""
+        values = self.values()
+        return max(range(len(self.options)), key=lambda i: (self.visits[i], values[i]))
+
+    def merge(self, other: 'SearchResult') -> None:
+        """合并另一个根并行搜索的统计（行动菜单相同）"""
+        for i in range(len(self.options)):
+            self.visits[i] += other.visits[i]
+            self.totals[i] += other.totals[i]
+        self.iterations += other.iterations
+        self.nodes += other.nodes
+
+class _Node:
+    """我们的决策节点：菜单中每个行动的访问次数和累计收益"""
+
+    __slots__ = ('visits', 'counts', 'totals')
+
+    def __init__(self, size: int):
+        self.visits = 0
+        self.counts = [0] * size
+        self.totals = [0.0] * size
+
+class MCTSSearch:
+    """
+    单进程的信息集蒙特卡洛树搜索
+    每次迭代先确定化（按范围抽对手手牌、随机发完公共牌），再从根状态沿树下行：
+    我们的决策节点按UCB1选择，存放在以状态哈希为键的置换表中，每次迭代扩展一个新节点；
+    对手的动作按ActionModel的似然随其确定化后的牌力抽样，树外的模拟双方都用同一策略；
+    终局按边池规则结算，收益是我们筹码的净变化
+    """
+
+    def __init__(
+        self,
+        root: SearchRoot,
+        config: Optional[MCTSConfig] = None,
+        rng: Optional[RandomStream] = None,
+        seed: Optional[int] = None
+    ):
+        """
+        :param rng: 随机数流（如并行任务的子流），优先于seed
+        :param seed: 未指定rng时的根种子，不指定则从系统熵源生成（可通过self.rng.root_seed取回以复现）
+        """
+        self.root = root
+        self.config = config or MCTSConfig()
+        self.rng = rng or RandomStream(seed)
+        self.model = ActionModel()
+        self.bet_sizes = sorted(self.config.bet_sizes.values())
+        self.table: Dict[int, _Node] = {}
+        self.iterations = 0
+        state = root.state
+        self.root_key = state.key(root.board)
+        self.root_stack = state.stacks[root.hero]
+        # 收益按底池+我们的筹码归一化，使UCB探索系数与筹码量级无关
+        self.scale = state.pot + self.root_stack
+        # 本街的公共牌已知，对所有组合计算一次精确的HS
+        self._root_strengths = board_hand_strengths(root.board)
+
+        dead = set(root.hole + root.board)
+        self.deck = [card for card in range(52) if card not in dead]
+        self.board_needed = 5 - len(root.board)
+        self.samplers = []
+        for seat, weights in enumerate(root.ranges):
+            if seat == root.hero or weights is None:
+                continue
+            combos = [
+                i for i, weight in enumerate(weights)
+                if weight > 0 and COMBOS[i][0] not in dead and COMBOS[i][1] not in dead
+            ]
+            if not combos:
+                raise ValueError("Range has no combos compatible with the known cards")
+            cumulative = list(accumulate(weights[i] for i in combos))
+            self.samplers.append((seat, combos, cumulative, cumulative[-1]))
+
+    def _determinize(self) -> Optional[Tuple[List[List[int]], List[int]]]:
+        """抽样一组对手手牌和完整的公共牌，范围抽样多次冲突时返回None"""
+        random = self.rng.random
+        n = len(self.root.positions)
+        holes: List[Optional[List[int]]] = [None] * n
+        holes[self.root.hero] = self.root.hole
+        used = set()
+        for seat, combos, cumulative, total in self.samplers:
+            for _attempt in range(20):
+                a, b = COMBOS[combos[bisect_right(cumulative, random() * total)]]
+                if a not in used and b not in used:
+                    break
+            else:
+                return None
+            used.add(a)
+            used.add(b)
+            holes[seat] = [a, b]
+        # 多发的牌覆盖被范围抽样占用的牌
+        dealt = [card for card in self.rng.deal(self.deck, self.board_needed + 2 * (n - 1)) if card not in used]
+        board = self.root.board + dealt[:self.board_needed]
+        i = self.board_needed
+        for seat in range(n):
+            if holes[seat] is None:
+                holes[seat] = dealt[i:i + 2]
+                i += 2
+        return holes, board
+
+    def _strength(self, hole: Sequence[int], state: SearchState, board: Sequence[int]) -> float:
+        """玩家在当前街的0-1牌力：根所在的街查HS表，之后的街用牌型近似"""
+        if state.street == self.root.state.street:
+            return self._root_strengths[COMBOS_BY_CARDS[hole[0]][hole[1]]]
+        return made_hand_strength(FastEvaluator.evaluate(list(hole) + list(board[:BOARD_SIZES[state.street]])))
+
+    def _policy(self, state: SearchState, options: List[Tuple[Action, int]], strength: float) -> Tuple[Action, int]:
+        """
+        对手模型和模拟策略：按ActionModel的似然在菜单中抽样
+        弃牌的权重取跟注似然的补；多个加注尺度平分加注的权重
+        """
+        level = _quantize(strength)
+        pot = state.pot
+        owed = state.current_bet - state.bets[state.actor]
+        facing = _sizing_class(owed / pot)
+        # 似然表的下限是为范围推断留的余地，作为对手策略时还要按底池赔率压低弱牌继续的权重，
+        # 否则大尺度下注会被过多的弱牌跟注；下注方的范围强于随机手牌，所需牌力高于赔率本身
+        proceed = 1.0
+        if owed > 0:
+            required = CONTINUE_BASE + CONTINUE_SLOPE * owed / (pot + owed)
+            proceed = _sigmoid((strength - required) / CONTINUE_WIDTH)
+        raises = sum(1 for action, _ in options if action == Action.RAISE)
+        weights = []
+        for action, amount in options:
+            if action == Action.FOLD:
+                weight = max(PRIOR_FLOOR, 1.0 - self.model.table(Action.CALL, facing)[level])
+            elif action == Action.RAISE:
+                weight = proceed * self.model.table(Action.RAISE, _sizing_class(amount / pot))[level] / raises
+            else:
+                weight = proceed * self.model.table(action, facing)[level]
+            weights.append(weight)
+        target = self.rng.random() * sum(weights)
+        for option, weight in zip(options, weights):
+            target -= weight
+            if target < 0:
+                return option
+        return options[-1]
+
+    def _select(self, node: _Node) -> int:
+        """UCB1：先尝试未访问的行动"""
+        counts = node.counts
+        for i, count in enumerate(counts):
+            if count == 0:
+                return i
+        totals = node.totals
+        log_visits = math.log(node.visits)
+        c = self.config.exploration
+        return max(
+            range(len(counts)),
+            key=lambda i: totals[i] / counts[i] + c * math.sqrt(log_visits / counts[i])
+        )
+
+    def iterate(self) -> None:
+        """一次迭代：确定化、选择/扩展、模拟、回传"""
+        determinized = self._determinize()
+        if determinized is None:
+            return
+        holes, board = determinized
+        config = self.config
+        hero = self.root.hero
+        table = self.table
+        state = self.root.state.copy()
+        path = []
+        expanding = True
+        while not state.terminal:
+            options = state.options(self.bet_sizes, config.max_raises)
+            if state.actor == hero and expanding:
+                key = state.key(board)
+                node = table.get(key)
+                if node is None:
+                    expanding = False
+                    if len(table) < config.max_nodes:
+                        node = table[key] = _Node(len(options))
+                if node is not None:
+                    index = self._select(node)
+                    path.append((node, index))
+                    state.apply(*options[index])
+                    continue
+            state.apply(*self._policy(state, options, self._strength(holes[state.actor], state, board)))
+        reward = (state.payoff(holes, board)[hero] + state.stacks[hero] - self.root_stack) / self.scale
+        for node, index in path:
+            node.visits += 1
+            node.counts[index] += 1
+            node.totals[index] += reward
+        self.iterations += 1
+
+    def run(self, iterations: int, deadline: Optional[float] = None) -> SearchResult:
+        """
+        迭代到次数用完或到达截止时间(time.time())
+        :return: 根节点的统计（收益换算回筹码）
+        """
+        start = time.time()
+        for _ in range(iterations):
+            if deadline is not None and time.time() >= deadline:
+                break
+            self.iterate()
+        options = self.root.state.options(self.bet_sizes, self.config.max_raises)
+        node = self.table.get(self.root_key) or _Node(len(options))
+        return SearchResult(
+            options,
+            node.counts[:],
+            [total * self.scale for total in node.totals],
+            self.iterations,
+            len(self.table),
+            time.time() - start,
+        )
+
+def _search_task(args) -> SearchResult:
+    """工作进程：用第index个子流独立搜索（根并行）"""
+    root, config, seed, index, iterations, deadline = args
+    return MCTSSearch(root, config, RandomStream(seed, (index,))).run(iterations, deadline)
+
+def search(
+    root: SearchRoot,
+    config: Optional[MCTSConfig] = None,
+    seed: Optional[int] = None,
+    pool=None
+) -> SearchResult:
+    """
+    在预算内搜索根节点的最佳行动
+    workers > 1时各进程用不同的随机子流独立建树，最后合并根节点统计
+    :param pool: 已有的进程池（如shared_pool创建的），不指定时临时创建，启动时间计入截止时间
+    """
+    config = config or MCTSConfig()
+    start = time.time()
+    deadline = start + config.time_limit if config.time_limit else None
+    workers = max(1, config.workers)
+    rng = RandomStream(seed)
+    if workers == 1:
+        result = MCTSSearch(root, config, rng).run(config.iterations, deadline)
+    else:
+        per_worker = -(-config.iterations // workers)
+        tasks = [(root, config, rng.root_seed, index, per_worker, deadline) for index in range(workers)]
+        if pool is None:
+            from .shared_tables import shared_pool
+            with shared_pool(workers, MCTS_TABLES) as pool:
+                results = pool.map(_search_task, tasks, chunksize=1)
+        else:
+            results = pool.map(_search_task, tasks, chunksize=1)
+        result = results[0]
+        for other in results[1:]:
+            result.merge(other)
+    result.elapsed = time.time() - start
+    return result
@@ -0,0 +1,108 @@
+"""
+Hand ranges over the 1326 two-card combos
+两张手牌组合(1326种)上的范围表示
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from ..core.card import Card, Hand, RANKS
+
+# 所有两张牌组合，按(大编码, 小编码)排列，下标即组合编号
+COMBOS: List[Tuple[int, int]] = [(a, b) for a in range(52) for b in range(a)]
+COMBO_INDEX: Dict[Tuple[int, int], int] = {}
+for _i, (_a, _b) in enumerate(COMBOS):
+    COMBO_INDEX[(_a, _b)] = _i
+    COMBO_INDEX[(_b, _a)] = _i
+NUM_COMBOS = len(COMBOS)
+
+RANK_SYMBOLS = ''.join(rank.value for rank in RANKS)
+
+def combo_index(card1: int, card2: int) -> int:
+    """获取两张整数编码牌对应的组合编号"""
+    return COMBO_INDEX[(card1, card2)]
+
+def hand_to_combo(hand: Hand) -> int:
+    """获取Hand对象对应的组合编号"""
+    return combo_index(hand.cards[0].to_int(), hand.cards[1].to_int())
+
+def combo_to_string(index: int) -> str:
+    """组合编号转为字符串，如'AhKh'"""
+    a, b = COMBOS[index]
+    return f"{Card.from_int(a)}{Card.from_int(b)}"
+
+def hand_class(index: int) -> str:
+    """
+    组合编号对应的起手牌类别（169类之一），如'AA'、'AKs'、'T9o'
+    """
+    a, b = COMBOS[index]
+    high, low = RANK_SYMBOLS[a >> 2], RANK_SYMBOLS[b >> 2]
+    if high == low:
+        return high + low
+    return high + low + ('s' if (a & 3) == (b & 3) else 'o')
+
+def _class_combos(text: str) -> List[int]:
+    """解析单个类别（'AA'、'AKs'、'AKo'、'AK'）或具体组合（'AhKh'）"""
+    if len(text) == 4:
+        return [combo_index(Card.from_string(text[:2]).to_int(), Card.from_string(text[2:]).to_int())]
+    if len(text) not in (2, 3) or text[0] not in RANK_SYMBOLS or text[1] not in RANK_SYMBOLS:
+        raise ValueError(f"Invalid range token: {text}")
+    suffix = text[2:] if len(text) == 3 else ''
+    if suffix not in ('', 's', 'o'):
+        raise ValueError(f"Invalid range token: {text}")
+    result = []
+    for i, (a, b) in enumerate(COMBOS):
+        symbols = {RANK_SYMBOLS[a >> 2], RANK_SYMBOLS[b >> 2]}
+        if symbols != {text[0], text[1]} or (text[0] == text[1]) != (a >> 2 == b >> 2):
+            continue
+        suited = (a & 3) == (b & 3)
+        if suffix == 's' and not suited or suffix == 'o' and suited:
+            continue
+        result.append(i)
+    return result
+
+class HandRange:
+    """
+    手牌范围：每个组合一个权重(0-1)
+    """
+
+    def __init__(self, weights: Optional[Sequence[float]] = None):
+        if weights is not None and len(weights) != NUM_COMBOS:
+            raise ValueError(f"Range needs {NUM_COMBOS} weights")
+        self.weights: List[float] = list(weights) if weights is not None else [1.0] * NUM_COMBOS
+
+    @classmethod
+    def from_string(cls, range_str: str) -> 'HandRange':
+        """
+        从字符串创建范围
+        :param range_str: 逗号分隔的类别，可带权重，如'AA,KK,AKs,AQo:0.5,AhKh'
+        """
+        weights = [0.0] * NUM_COMBOS
+        for token in range_str.split(','):
+            token = token.strip()
+            if not token:
+                continue
+            weight = 1.0
+            if ':' in token:
+                token, weight_str = token.split(':')
+                weight = float(weight_str)
+            for index in _class_combos(token):
+                weights[index] = weight
+        return cls(weights)
+
+    def remove_cards(self, cards: Iterable[int]) -> 'HandRange':
+        """返回去掉与给定牌冲突的组合后的新范围（阻断牌）"""
+        dead = set(cards)
+        return HandRange([
+            0.0 if COMBOS[i][0] in dead or COMBOS[i][1] in dead else weight
+            for i, weight in enumerate(self.weights)
+        ])
+
+    def combos(self) -> List[int]:
+        """权重大于0的组合编号"""
+        return [i for i, weight in enumerate(self.weights) if weight > 0]
+
+    def total_weight(self) -> float:
+        """总权重"""
+        return sum(self.weights)
+
+    def __len__(self) -> int:
+        return len(self.combos())
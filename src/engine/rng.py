@@ -0,0 +1,73 @@
+"""
+Deterministic, seedable random streams for simulations
+可复现、可拆分的模拟随机数流
+"""
+
+import hashlib
+import os
+import random
+import struct
+from typing import List, Optional, Sequence, Tuple
+
+def derive_seed(seed: int, path: Sequence[int] = ()) -> int:
+    """
+    由根种子和子流路径派生64位种子
+    不同路径的派生种子互不相关，同一路径总是得到同一个种子
+    """
+    data = struct.pack('<Q', seed & 0xFFFFFFFFFFFFFFFF) + b''.join(
+        struct.pack('<Q', index) for index in path
+    )
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+def fresh_seed() -> int:
+    """从系统熵源取一个新的根种子"""
+    return int.from_bytes(os.urandom(8), 'little')
+
+class RandomStream(random.Random):
+    """
+    可复现的随机数流
+    每个引擎实例持有自己的流；并行任务用substream(i)或spawn(n)得到互不相关的子流，
+    子流只由(根种子, 路径)决定，可以直接跳到第i个子流而不需要先生成前面的流
+    """
+
+    def __init__(self, seed: Optional[int] = None, path: Tuple[int, ...] = ()):
+        self.root_seed = fresh_seed() if seed is None else seed
+        self.path = tuple(path)
+        super().__init__(derive_seed(self.root_seed, self.path))
+
+    def __reduce__(self):
+        """
+        序列化时保留根种子、路径和生成器状态（random.Random的默认实现只保存状态，
+        反序列化后的流会丢失root_seed/path，子流也就不再可复现）
+        """
+        return (self.__class__, (self.root_seed, self.path), self.getstate())
+
+    def substream(self, index: int) -> 'RandomStream':
+        """第index个子流"""
+        return RandomStream(self.root_seed, self.path + (index,))
+
+    def spawn(self, count: int) -> List['RandomStream']:
+        """前count个子流，通常每个工作进程一个"""
+        return [self.substream(i) for i in range(count)]
+
+    def deal(self, deck: List[int], count: int) -> List[int]:
+        """
+        从牌组中随机发出count张牌（原地部分洗牌，返回前count张）
+        所有下标来自一次getrandbits调用，用乘法移位映射到区间
+        """
+        n = len(deck)
+        bits = self.getrandbits(32 * count)
+        for i in range(count):
+            j = i + (((bits & 0xFFFFFFFF) * (n - i)) >> 32)
+            bits >>= 32
+            deck[i], deck[j] = deck[j], deck[i]
+        return deck[:count]
+
+    def numpy_generator(self):
+        """
+        对应的NumPy PCG64生成器（需要安装numpy），用于向量化模拟
+        子流关系与本流一致：同一(根种子, 路径)得到同一生成器
+        """
+        import numpy as np
+        sequence = np.random.SeedSequence(self.root_seed, spawn_key=self.path)
+        return np.random.Generator(np.random.PCG64(sequence))
@@ -0,0 +1,246 @@
+"""
+Memory-compact multi-table session manager
+多桌并发的紧凑会话管理
+"""
+
+from array import array
+from typing import Dict, Hashable, List, Optional, Sequence
+from ..core.card import Card, Hand
+from ..core.game_state import GameState
+from ..utils.constants import Action, Position, Stage
+from .advisor import Decision, PokerAdvisor
+
+POSITIONS = list(Position)
+NUM_SEATS = len(POSITIONS)
+SEAT_INDEX = {pos: i for i, pos in enumerate(POSITIONS)}
+STAGES = list(Stage)
+STAGE_INDEX = {stage: i for i, stage in enumerate(STAGES)}
+BOARD_SIZE = 5
+NO_CARD = -1
+
+# 各字段的(类型码, 每手牌的元素个数)，所有字段按槽位并排存放（结构数组）
+FIELDS = {
+    'hole': ('b', 2),              # 手牌（整数编码）
+    'position': ('b', 1),          # 我的位置下标
+    'stage': ('b', 1),             # 阶段下标
+    'board_count': ('b', 1),       # 已发公共牌数
+    'board': ('b', BOARD_SIZE),    # 公共牌
+    'folded': ('B', 1),            # 已弃牌座位的位掩码
+    'my_stack': ('i', 1),          # 我的剩余筹码
+    'to_call': ('i', 1),           # 我需要跟注的金额
+    'pot': ('i', 1),               # 总底池
+    'stacks': ('i', NUM_SEATS),    # 每个座位的剩余筹码
+    'street_bets': ('i', NUM_SEATS),  # 每个座位本街的投入
+    'contributions': ('i', NUM_SEATS),  # 每个座位本手牌的累计投入
+}
+
+class SessionManager:
+    """
+    多桌会话管理器
+    所有在进行中的手牌存放在按字段划分的array中，每手牌占一个槽位；
+    结束的手牌槽位进入空闲链表供下一手复用，更新动作时只改写数组元素，不创建新的容器对象。
+    需要建议时才临时构建GameState交给PokerAdvisor
+    """
+
+    def __init__(self, advisor: Optional[PokerAdvisor] = None, capacity: int = 64):
+        """
+        :param advisor: 共享的策略顾问，默认新建一个
+        :param capacity: 初始槽位数，不够时按倍数扩容
+        """
+        self.advisor = advisor or PokerAdvisor()
+        self.capacity = 0
+        self._arrays: Dict[str, array] = {
+            name: array(typecode) for name, (typecode, _) in FIELDS.items()
+        }
+        self._slots: Dict[Hashable, int] = {}
+        self._free: List[int] = []
+        self._grow(max(1, capacity))
+
+    def _grow(self, capacity: int) -> None:
+        """扩容到capacity个槽位，新槽位进入空闲链表"""
+        added = capacity - self.capacity
+        for name, (typecode, width) in FIELDS.items():
+            values = self._arrays[name]
+            values.frombytes(bytes(added * width * values.itemsize))
+        # 倒序放入，使低编号槽位先被使用
+        self._free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+    @staticmethod
+    def bytes_per_hand() -> int:
+        """每个槽位在数组中占用的字节数"""
+        return sum(array(typecode).itemsize * width for typecode, width in FIELDS.values())
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, hand_id: Hashable) -> bool:
+        return hand_id in self._slots
+
+    def hands(self) -> List[Hashable]:
+        return list(self._slots)
+
+    def _slot(self, hand_id: Hashable) -> int:
+        slot = self._slots.get(hand_id)
+        if slot is None:
+            raise KeyError(f"Unknown hand: {hand_id}")
+        return slot
+
+    # ---- 手牌生命周期 ----
+
+    def open_hand(
+        self,
+        hand_id: Hashable,
+        hand: Hand,
+        position: Position,
+        stack: int,
+        stacks: Optional[Dict[Position, int]] = None
+    ) -> int:
+        """
+        开始一手牌
+        :param hand_id: 手牌标识（通常是桌号），同一时刻唯一
+        :param stacks: 各位置的起始筹码，默认只设置自己的筹码
+        :return: 槽位编号
+        """
+        if hand_id in self._slots:
+            raise ValueError(f"Hand already open: {hand_id}")
+        if not self._free:
+            self._grow(self.capacity * 2)
+        slot = self._free.pop()
+        self._slots[hand_id] = slot
+
+        arrays = self._arrays
+        arrays['hole'][2 * slot] = hand.cards[0].to_int()
+        arrays['hole'][2 * slot + 1] = hand.cards[1].to_int()
+        arrays['position'][slot] = SEAT_INDEX[position]
+        arrays['stage'][slot] = 0
+        arrays['board_count'][slot] = 0
+        board = arrays['board']
+        for i in range(BOARD_SIZE * slot, BOARD_SIZE * slot + BOARD_SIZE):
+            board[i] = NO_CARD
+        arrays['folded'][slot] = 0
+        arrays['my_stack'][slot] = stack
+        arrays['to_call'][slot] = 0
+        arrays['pot'][slot] = 0
+        seat_stacks = arrays['stacks']
+        street_bets = arrays['street_bets']
+        contributions = arrays['contributions']
+        base = NUM_SEATS * slot
+        for seat, pos in enumerate(POSITIONS):
+            if stacks is not None:
+                seat_stacks[base + seat] = stacks.get(pos, 0)
+            else:
+                seat_stacks[base + seat] = stack if pos == position else 0
+            street_bets[base + seat] = 0
+            contributions[base + seat] = 0
+        return slot
+
+    def close_hand(self, hand_id: Hashable) -> None:
+        """结束一手牌，槽位回收复用"""
+        self._free.append(self._slots.pop(hand_id))
+
+    # ---- 更新 ----
+
+    def record_action(self, hand_id: Hashable, position: Position, action: Action, amount: int = 0) -> None:
+        """
+        记录一个动作，语义与GameState.record_action一致（amount为本次新投入的筹码）
+        我需要跟注的金额由本街各座位的投入自动维护
+        """
+        slot = self._slot(hand_id)
+        arrays = self._arrays
+        seat = SEAT_INDEX[position]
+        if action == Action.FOLD:
+            arrays['folded'][slot] |= 1 << seat
+        elif action in (Action.CALL, Action.RAISE, Action.ALL_IN):
+            base = NUM_SEATS * slot
+            street_bets = arrays['street_bets']
+            street_bets[base + seat] += amount
+            arrays['contributions'][base + seat] += amount
+            arrays['stacks'][base + seat] -= amount
+            arrays['pot'][slot] += amount
+            hero = arrays['position'][slot]
+            if seat == hero:
+                arrays['my_stack'][slot] -= amount
+            highest = 0
+            for i in range(base, base + NUM_SEATS):
+                if street_bets[i] > highest:
+                    highest = street_bets[i]
+            owed = highest - street_bets[base + hero]
+            arrays['to_call'][slot] = min(owed, arrays['my_stack'][slot])
+
+    def add_community_cards(self, hand_id: Hashable, cards: Sequence[Card]) -> None:
+        """添加新发出的公共牌"""
+        slot = self._slot(hand_id)
+        board = self._arrays['board']
+        count = self._arrays['board_count'][slot]
+        if count + len(cards) > BOARD_SIZE:
+            raise ValueError("Too many community cards")
+        for card in cards:
+            board[BOARD_SIZE * slot + count] = card.to_int()
+            count += 1
+        self._arrays['board_count'][slot] = count
+
+    def advance_stage(self, hand_id: Hashable) -> Stage:
+        """进入下一阶段，清空本街投入"""
+        slot = self._slot(hand_id)
+        stage = min(self._arrays['stage'][slot] + 1, len(STAGES) - 1)
+        self._arrays['stage'][slot] = stage
+        street_bets = self._arrays['street_bets']
+        for i in range(NUM_SEATS * slot, NUM_SEATS * slot + NUM_SEATS):
+            street_bets[i] = 0
+        self._arrays['to_call'][slot] = 0
+        return STAGES[stage]
+
+    def update(self, hand_id: Hashable, to_call: Optional[int] = None, current_pot: Optional[int] = None) -> None:
+        """直接修正跟注额或底池（例如来自牌桌读数）"""
+        slot = self._slot(hand_id)
+        if to_call is not None:
+            self._arrays['to_call'][slot] = to_call
+        if current_pot is not None:
+            self._arrays['pot'][slot] = current_pot
+
+    # ---- 查询与建议 ----
+
+    def game_state(self, hand_id: Hashable) -> GameState:
+        """
+        构建该手牌的GameState（每次调用新建，只在请求建议时使用）
+        返回的状态是有损的：槽位不保存逐个动作，ActionRecord列表和撤销日志为空，
+        状态键中的动作历史部分也不反映实际行动顺序；
+        筹码、累计投入、弃牌、本街投入和本街开始时的底池会按槽位中的数据重建
+        """
+        slot = self._slot(hand_id)
+        arrays = self._arrays
+        hole = arrays['hole']
+        base = NUM_SEATS * slot
+        stacks = {
+            pos: arrays['stacks'][base + seat] for seat, pos in enumerate(POSITIONS)
+        }
+        contributions = {
+            pos: arrays['contributions'][base + seat]
+            for seat, pos in enumerate(POSITIONS) if arrays['contributions'][base + seat]
+        }
+        street_total = sum(arrays['street_bets'][base:base + NUM_SEATS])
+        folded = arrays['folded'][slot]
+        game_state = GameState(
+            my_hand=Hand([Card.from_int(hole[2 * slot]), Card.from_int(hole[2 * slot + 1])]),
+            my_position=POSITIONS[arrays['position'][slot]],
+            my_stack=arrays['my_stack'][slot],
+            current_stage=STAGES[arrays['stage'][slot]],
+            to_call=arrays['to_call'][slot],
+            current_pot=arrays['pot'][slot],
+            stacks=stacks,
+            contributions=contributions,
+            folded_positions=[pos for seat, pos in enumerate(POSITIONS) if folded >> seat & 1],
+        )
+        start = BOARD_SIZE * slot
+        board = arrays['board'][start:start + arrays['board_count'][slot]]
+        street_state = game_state.get_current_street_state()
+        # 与交互流程一致：当前阶段的公共牌列表包含截至该阶段的全部公共牌
+        street_state.community_cards.extend(Card.from_int(card) for card in board)
+        street_state.pot_size = street_total
+        street_state.start_pot = max(0, game_state.current_pot - street_total)
+        return game_state
+
+    def get_advice(self, hand_id: Hashable) -> Decision:
+        """把该手牌的当前状态交给PokerAdvisor"""
+        return self.advisor.get_advice(self.game_state(hand_id))
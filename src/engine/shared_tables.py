@@ -0,0 +1,113 @@
+"""
+Sharing lookup tables across worker processes
+在多个工作进程之间共享查找表（单份内存）
+"""
+
+import importlib
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from . import tables
+
+# 默认共享的表：翻前分桶和奥马哈的查找表（评估器的小表在每个进程内构建，不经过这里）
+# 翻牌分桶等必须预构建的表很大，由用到它们的调用方显式列出
+DEFAULT_SHARED_TABLES = [
+    'preflop_buckets',
+    'five_card_ranks',
+    'five_card_flush',
+]
+
+# 进程内已连接的共享内存段，保持引用直到进程结束
+_attached: List = []
+
+def _register_all() -> None:
+    """导入拥有查找表的模块，完成注册"""
+    for module in tables.TABLE_MODULES:
+        importlib.import_module(module)
+
+class SharedTables:
+    """
+    在父进程中发布查找表，得到一个可以传给子进程的句柄
+    映射自缓存文件的表：子进程映射同一文件，操作系统的页缓存只有一份；
+    缓存目录不可写、只能放在进程内的表：复制一次到multiprocessing.shared_memory，子进程零拷贝连接
+    """
+
+    def __init__(self, names: Optional[Sequence[str]] = None, manager: Optional[tables.TableManager] = None):
+        """
+        :param names: 要共享的表名，默认DEFAULT_SHARED_TABLES
+        """
+        _register_all()
+        self.manager = manager or tables.default_manager()
+        self.names = list(names if names is not None else DEFAULT_SHARED_TABLES)
+        self._segments = []
+        self.handle: Optional[Dict] = None
+
+    def publish(self) -> Dict:
+        """
+        映射（必要时构建）所有表并返回句柄 {'cache_dir': ..., 'segments': {表名: (共享内存名, 长度)}}
+        必须预构建（on_demand=False）但还没有缓存的表不在这里构建，直接跳过，
+        子进程真正用到时由get()报告缺失
+        """
+        segments: Dict[str, Tuple[str, int]] = {}
+        for name in self.names:
+            if not self.manager.is_on_demand(name) and not self.manager.is_cached(name):
+                continue
+            view = self.manager.get(name)
+            if self.manager.is_file_backed(name):
+                continue
+            from multiprocessing import shared_memory
+            segment = shared_memory.SharedMemory(create=True, size=max(len(view), 1))
+            segment.buf[:len(view)] = view
+            self._segments.append(segment)
+            segments[name] = (segment.name, len(view))
+        self.handle = {'cache_dir': self.manager.cache_dir, 'segments': segments}
+        return self.handle
+
+    def close(self) -> None:
+        """释放父进程创建的共享内存段（所有子进程退出后调用）"""
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+        self._segments = []
+
+    def __enter__(self) -> 'SharedTables':
+        self.publish()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def _open_segment(name: str):
+    """连接已有的共享内存段；子进程不负责删除它，因此不交给资源跟踪器"""
+    from multiprocessing import shared_memory
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python 3.13之前没有track参数；进程池的子进程与父进程共用同一个资源跟踪器，
+        # 重复登记不会多出记录，父进程unlink时一并注销，所以这里不能再手动注销
+        return shared_memory.SharedMemory(name=name)
+
+def attach(handle: Dict) -> None:
+    """
+    在子进程中连接父进程发布的表（作为进程池的initializer调用）
+    之后本进程内get_table()直接返回共享的数据
+    """
+    _register_all()
+    manager = tables.default_manager()
+    if manager.cache_dir != handle['cache_dir']:
+        manager.cache_dir = handle['cache_dir']
+    for name, (segment_name, length) in handle['segments'].items():
+        segment = _open_segment(segment_name)
+        _attached.append(segment)
+        manager.adopt(name, segment.buf[:length])
+
+@contextmanager
+def shared_pool(workers: int, names: Optional[Sequence[str]] = None) -> Iterator:
+    """
+    创建一个共享查找表的进程池
+    with shared_pool(8) as pool:
+        pool.map(...)
+    """
+    from multiprocessing import Pool
+    with SharedTables(names) as shared:
+        with Pool(workers, initializer=attach, initargs=(shared.handle,)) as pool:
+            yield pool
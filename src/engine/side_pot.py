@@ -0,0 +1,157 @@
+"""
+Side pot construction and showdown resolution
+边池构建与摊牌分配
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Sequence, Tuple
+from ..core.game_state import GameState
+from ..utils.constants import Position
+
+@dataclass
+class SidePot:
+    """一个底池（主池或边池）"""
+    amount: int                                             # 底池金额
+    eligible: List[Position] = field(default_factory=list)  # 有资格赢得该池的位置
+
+def odd_chip_order(button: Position = Position.BTN) -> List[Position]:
+    """
+    零头筹码的分配顺序：从按钮左手边开始顺时针
+    """
+    seats = list(Position)
+    index = seats.index(button)
+    return seats[index+1:] + seats[:index+1]
+
+class SidePotCalculator:
+    """
+    边池计算器
+    字典接口用于GameState，数组接口(build_pots_array/award_pots_array)用于蒙特卡洛等热点循环
+    """
+
+    @staticmethod
+    def build_pots_array(contributions: Sequence[int], live_mask: int) -> List[Tuple[int, int]]:
+        """
+        根据每个座位的投入构建底池
+        :param contributions: 每个座位本手牌投入的总筹码
+        :param live_mask: 未弃牌座位的位掩码（第i位表示座位i）
+        :return: [(底池金额, 有资格座位的位掩码)]，从主池到最后一个边池
+        """
+        levels = sorted({
+            contributions[seat] for seat in range(len(contributions))
+            if live_mask >> seat & 1 and contributions[seat] > 0
+        })
+        pots = []
+        previous = 0
+        for level in levels:
+            amount = 0
+            eligible = 0
+            for seat, contributed in enumerate(contributions):
+                if contributed > previous:
+                    amount += min(contributed, level) - previous
+                if live_mask >> seat & 1 and contributed >= level:
+                    eligible |= 1 << seat
+            # 资格相同的相邻底池合并
+            if pots and pots[-1][1] == eligible:
+                pots[-1] = (pots[-1][0] + amount, eligible)
+            else:
+                pots.append((amount, eligible))
+            previous = level
+
+        # 已弃牌玩家超出最高存活投入的部分并入最后一个底池
+        dead = sum(contributed - previous for contributed in contributions if contributed > previous)
+        if dead:
+            if pots:
+                pots[-1] = (pots[-1][0] + dead, pots[-1][1])
+            else:
+                pots.append((dead, 0))
+        return pots
+
+    @staticmethod
+    def award_pots_array(
+        pots: Sequence[Tuple[int, int]],
+        strengths: Sequence[int],
+        chip_order: Sequence[int]
+    ) -> List[int]:
+        """
+        按牌力分配底池，支持平分和零头筹码
+        :param pots: build_pots_array的结果
+        :param strengths: 每个座位的牌力（可比较大小，越大越强）
+        :param chip_order: 零头筹码的座位分配顺序
+        :return: 每个座位赢得的筹码
+        """
+        winnings = [0] * len(strengths)
+        for amount, eligible in pots:
+            best = None
+            winners = []
+            for seat in chip_order:
+                if not eligible >> seat & 1:
+                    continue
+                strength = strengths[seat]
+                if best is None or strength > best:
+                    best = strength
+                    winners = [seat]
+                elif strength == best:
+                    winners.append(seat)
+            if not winners:
+                continue
+            share, odd_chips = divmod(amount, len(winners))
+            for i, seat in enumerate(winners):
+                winnings[seat] += share + (1 if i < odd_chips else 0)
+        return winnings
+
+    @staticmethod
+    def build_pots(
+        contributions: Dict[Position, int],
+        folded: Iterable[Position] = ()
+    ) -> List[SidePot]:
+        """
+        根据每个位置的投入构建主池和边池
+        :param contributions: 每个位置本手牌投入的总筹码
+        :param folded: 已经弃牌的位置
+        :return: 底池列表，第一个是主池
+        """
+        seats = list(Position)
+        folded = set(folded)
+        live_mask = 0
+        for i, position in enumerate(seats):
+            if position not in folded:
+                live_mask |= 1 << i
+        amounts = [contributions.get(position, 0) for position in seats]
+        return [
+            SidePot(amount, [seats[i] for i in range(len(seats)) if eligible >> i & 1])
+            for amount, eligible in SidePotCalculator.build_pots_array(amounts, live_mask)
+        ]
+
+    @staticmethod
+    def award_pots(
+        pots: List[SidePot],
+        strengths: Dict[Position, int],
+        button: Position = Position.BTN
+    ) -> Dict[Position, int]:
+        """
+        按牌力分配底池
+        :param strengths: 每个摊牌位置的牌力（如FastEvaluator.evaluate的结果）
+        :param button: 按钮位置，用于决定零头筹码归属
+        :return: 每个位置赢得的筹码
+        """
+        seats = list(Position)
+        index = {position: i for i, position in enumerate(seats)}
+        array_pots = []
+        for pot in pots:
+            eligible = 0
+            for position in pot.eligible:
+                if position in strengths:
+                    eligible |= 1 << index[position]
+            array_pots.append((pot.amount, eligible))
+        strength_list = [strengths.get(position, -1) for position in seats]
+        chip_order = [index[position] for position in odd_chip_order(button)]
+        winnings = SidePotCalculator.award_pots_array(array_pots, strength_list, chip_order)
+        return {seats[i]: won for i, won in enumerate(winnings) if won}
+
+    @staticmethod
+    def build_pots_from_state(game_state: GameState) -> List[SidePot]:
+        """根据GameState记录的投入构建底池"""
+        return SidePotCalculator.build_pots(
+            game_state.contributions,
+            game_state.folded_positions
+        )
@@ -0,0 +1,217 @@
+"""
+Lazily built, memory-mapped lookup tables
+延迟构建、内存映射的查找表管理
+"""
+
+import mmap
+import os
+import struct
+import sys
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+# 表格式或内容变化时递增，旧缓存自动失效
+CACHE_VERSION = 1
+
+# 文件格式: 头部 + 数据
+# 头部: 魔数(4) 缓存版本(uint16) 表版本(uint16) SHA-256(32) 数据长度(uint64)
+MAGIC = b'PATB'
+HEADER = struct.Struct('<4sHH32sQ')
+
+def default_cache_dir() -> str:
+    """缓存目录：环境变量POKER_ADVISOR_CACHE，默认~/.cache/poker_advisor/v<版本>"""
+    base = os.environ.get('POKER_ADVISOR_CACHE') or os.path.join(
+        os.path.expanduser('~'), '.cache', 'poker_advisor'
+    )
+    return os.path.join(base, f"v{CACHE_VERSION}")
+
+def _digest(payload) -> bytes:
+    import hashlib
+    return hashlib.sha256(payload).digest()
+
+class TableManager:
+    """
+    查找表管理器
+    各模块注册表的构建函数；第一次使用时才从缓存目录映射，缓存不存在或版本不符时构建一次并写入
+    构建耗时很长的表注册为on_demand=False：只由python -m src.engine.tables显式构建，缓存缺失时get()直接报错
+    映射是只读的，同一台机器上的多个进程共享页缓存
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, verify: Optional[bool] = None):
+        """
+        :param cache_dir: 缓存目录，默认default_cache_dir()
+        :param verify: 打开已有缓存时是否校验SHA-256（需要读完整个文件），
+                       默认由环境变量POKER_ADVISOR_VERIFY_TABLES决定
+        """
+        self.cache_dir = cache_dir or default_cache_dir()
+        if verify is None:
+            verify = os.environ.get('POKER_ADVISOR_VERIFY_TABLES', '') not in ('', '0')
+        self.verify_on_open = verify
+        self._builders: Dict[str, Tuple[Callable[[], bytes], int]] = {}
+        self._prebuild_only: Set[str] = set()
+        self._mapped: Dict[str, Tuple[Optional[mmap.mmap], memoryview]] = {}
+
+    def register(self, name: str, builder: Callable[[], bytes], version: int = 1, on_demand: bool = True) -> None:
+        """
+        注册一张表
+        :param builder: 返回表数据的函数，只在缓存缺失时调用
+        :param version: 表版本，构建逻辑变化时递增
+        :param on_demand: 缓存缺失时是否在第一次使用时构建；False表示必须预先构建
+        """
+        self._builders[name] = (builder, version)
+        if on_demand:
+            self._prebuild_only.discard(name)
+        else:
+            self._prebuild_only.add(name)
+
+    def registered(self) -> List[str]:
+        return list(self._builders)
+
+    def path(self, name: str) -> str:
+        """表的缓存文件路径"""
+        _, version = self._builders[name]
+        return os.path.join(self.cache_dir, f"{name}.v{version}.tbl")
+
+    def is_on_demand(self, name: str) -> bool:
+        """缓存缺失时get()是否会构建该表"""
+        return name not in self._prebuild_only
+
+    def get(self, name: str) -> memoryview:
+        """
+        获取表数据的只读视图（零拷贝），第一次调用时映射或构建
+        :raises RuntimeError: 必须预先构建的表没有缓存
+        """
+        mapped = self._mapped.get(name)
+        if mapped is not None:
+            return mapped[1]
+        if name not in self._builders:
+            raise KeyError(f"Unknown table: {name}")
+        view = self._open(name)
+        if view is None:
+            if name in self._prebuild_only:
+                raise RuntimeError(
+                    f"Table {name} has not been built; run 'python -m src.engine.tables {name}' first"
+                )
+            try:
+                self.build(name)
+            except OSError:
+                # 缓存目录不可写时退化为进程内的表
+                builder, _ = self._builders[name]
+                view = memoryview(bytes(builder()))
+                self._mapped[name] = (None, view)
+                return view
+            view = self._open(name)
+            if view is None:
+                raise RuntimeError(f"Failed to build table: {name}")
+        return view
+
+    def _open(self, name: str) -> Optional[memoryview]:
+        """映射已有缓存文件，头部不符（版本/长度/校验和）时返回None"""
+        path = self.path(name)
+        try:
+            with open(path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        _, version = self._builders[name]
+        valid = len(mm) >= HEADER.size
+        if valid:
+            magic, cache_version, table_version, digest, length = HEADER.unpack_from(mm, 0)
+            valid = (
+                magic == MAGIC and cache_version == CACHE_VERSION and table_version == version
+                and len(mm) == HEADER.size + length
+            )
+        view = memoryview(mm)[HEADER.size:] if valid else None
+        if valid and self.verify_on_open and _digest(view) != digest:
+            view.release()
+            valid = False
+        if not valid:
+            mm.close()
+            return None
+        self._mapped[name] = (mm, view)
+        return view
+
+    def build(self, name: str) -> str:
+        """
+        构建一张表并原子地写入缓存（先写临时文件再替换，并发构建互不干扰）
+        :return: 缓存文件路径
+        """
+        builder, version = self._builders[name]
+        payload = bytes(builder())
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path(name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, CACHE_VERSION, version, _digest(payload), len(payload)))
+            f.write(payload)
+        os.replace(tmp_path, path)
+        return path
+
+    def verify(self, name: str) -> bool:
+        """完整校验缓存文件的SHA-256"""
+        path = self.path(name)
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+            payload = f.read()
+        if len(header) < HEADER.size:
+            return False
+        magic, _, _, digest, length = HEADER.unpack(header)
+        return magic == MAGIC and len(payload) == length and _digest(payload) == digest
+
+    def is_cached(self, name: str) -> bool:
+        return os.path.exists(self.path(name))
+
+    def is_file_backed(self, name: str) -> bool:
+        """该表当前是否映射自缓存文件（否则是进程内的副本或外部缓冲区）"""
+        mapped = self._mapped.get(name)
+        return mapped is not None and mapped[0] is not None
+
+    def adopt(self, name: str, buffer) -> memoryview:
+        """
+        使用外部缓冲区（如共享内存）作为表数据，不复制
+        之后get(name)直接返回该缓冲区的视图
+        """
+        view = memoryview(buffer).toreadonly()
+        self._mapped[name] = (None, view)
+        return view
+
+    def numpy_view(self, name: str, dtype: str = 'uint8'):
+        """
+        表数据的NumPy只读视图（零拷贝，需要安装numpy）
+        """
+        import numpy as np
+        return np.frombuffer(self.get(name), dtype=dtype)
+
+_default_manager: Optional[TableManager] = None
+
+def default_manager() -> TableManager:
+    """进程内共享的默认管理器"""
+    global _default_manager
+    if _default_manager is None:
+        _default_manager = TableManager()
+    return _default_manager
+
+def register_table(name: str, builder: Callable[[], bytes], version: int = 1, on_demand: bool = True) -> None:
+    """在默认管理器上注册表（各模块在导入时调用，不会触发构建）"""
+    default_manager().register(name, builder, version, on_demand)
+
+def get_table(name: str) -> memoryview:
+    """从默认管理器获取表"""
+    return default_manager().get(name)
+
+# 拥有查找表的模块，预构建时逐个导入以完成注册
+TABLE_MODULES = [
+    'src.engine.flop_db',
+    'src.engine.buckets',
+    'src.engine.variants',
+]
+
+if __name__ == '__main__':
+    # python -m src.engine.tables [表名...]  预构建缓存（不指定则构建全部未缓存的表，包括on_demand=False的表）
+    import importlib
+    for module in TABLE_MODULES:
+        importlib.import_module(module)
+    # 以包内模块的身份取管理器（__main__是另一份模块对象）
+    manager = importlib.import_module('src.engine.tables').default_manager()
+    names = sys.argv[1:] or [name for name in manager.registered() if not manager.is_cached(name)]
+    for name in names:
+        print(f"Building {name} -> {manager.build(name)}")
@@ -0,0 +1,280 @@
+"""
+Variant-aware hand evaluation: Pot-Limit Omaha and Short-Deck
+多玩法牌力评估：底池限注奥马哈(PLO4/PLO5)和短牌(6+)
+"""
+
+import struct
+from dataclasses import dataclass
+from itertools import combinations, combinations_with_replacement
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from ..utils.constants import HandRank, Variant
+from . import fast_evaluator
+from .fast_evaluator import CATEGORY_SHIFT, FastEvaluator, _top_values
+from .tables import get_table, register_table
+
+# ----------------------------------------------------------------------
+# 5张牌查找表（奥马哈）
+# 非同花: 点数多重集的加法键 sum(5**点数) -> 牌力；同花: 13位点数掩码 -> 牌力
+# 键是加法的，所以2张手牌和3张公共牌的键可以分别预先算好再相加
+# ----------------------------------------------------------------------
+
+RANK_KEYS = [5 ** r for r in range(13)]
+RANK_ENTRY = struct.Struct('<QI')
+
+def _build_five_card_ranks() -> bytes:
+    entries = bytearray()
+    for ranks in combinations_with_replacement(range(13), 5):
+        if any(ranks.count(r) > 4 for r in ranks):
+            continue
+        # 每张牌的花色取其在序列中的位置模4：同点数的牌花色不同，5张也不会同花
+        cards = [r * 4 + i % 4 for i, r in enumerate(ranks)]
+        entries += RANK_ENTRY.pack(sum(RANK_KEYS[r] for r in ranks), FastEvaluator.evaluate(cards))
+    return bytes(entries)
+
+def _build_five_card_flush() -> bytes:
+    table = [0] * 8192
+    for ranks in combinations(range(13), 5):
+        mask = sum(1 << r for r in ranks)
+        table[mask] = FastEvaluator.evaluate([r * 4 for r in ranks])
+    return struct.pack(f'<{len(table)}I', *table)
+
+register_table('five_card_ranks', _build_five_card_ranks)
+register_table('five_card_flush', _build_five_card_flush)
+
+FIVE_CARD_RANKS: Optional[Dict[int, int]] = None
+FIVE_CARD_FLUSH: Optional[memoryview] = None
+
+def load_five_card_tables() -> None:
+    """映射5张牌查找表（非同花部分读入字典，6175项）"""
+    global FIVE_CARD_RANKS, FIVE_CARD_FLUSH
+    if FIVE_CARD_RANKS is None:
+        data = get_table('five_card_ranks')
+        FIVE_CARD_RANKS = dict(RANK_ENTRY.iter_unpack(data))
+        FIVE_CARD_FLUSH = get_table('five_card_flush').cast('I')
+
+def _subset_keys(cards: Sequence[int], size: int) -> List[Tuple[int, int, int]]:
+    """
+    每个size张子集的(点数键, 点数掩码, 同花花色或-1)
+    """
+    result = []
+    for subset in combinations(cards, size):
+        suit = subset[0] & 3
+        key = 0
+        mask = 0
+        for c in subset:
+            key += RANK_KEYS[c >> 2]
+            mask |= 1 << (c >> 2)
+            if c & 3 != suit:
+                suit = -1
+        result.append((key, mask, suit))
+    return result
+
+def board_keys(board: Sequence[int]) -> List[Tuple[int, int, int]]:
+    """公共牌的全部3张子集（5张公共牌时10个），同一公共牌上所有玩家共用"""
+    return _subset_keys(board, 3)
+
+def hole_keys(hole: Sequence[int]) -> List[Tuple[int, int, int]]:
+    """手牌的全部2张子集（PLO4为6个，PLO5为10个）"""
+    return _subset_keys(hole, 2)
+
+def evaluate_omaha_keys(hole: List[Tuple[int, int, int]], board: List[Tuple[int, int, int]]) -> int:
+    """
+    用预先算好的子集键评估奥马哈牌力：恰好2张手牌 + 3张公共牌的最大值
+    """
+    ranks = FIVE_CARD_RANKS
+    flush = FIVE_CARD_FLUSH
+    best = 0
+    for board_key, board_mask, board_suit in board:
+        for hole_key, hole_mask, hole_suit in hole:
+            if board_suit >= 0 and board_suit == hole_suit:
+                # 5张同花时点数必然各不相同，同花/同花顺总是强于同样点数的非同花牌型
+                strength = flush[board_mask | hole_mask]
+            else:
+                strength = ranks[board_key + hole_key]
+            if strength > best:
+                best = strength
+    return best
+
+def evaluate_omaha(hole: Sequence[int], board: Sequence[int]) -> int:
+    """
+    评估奥马哈牌力（必须恰好使用2张手牌和3张公共牌）
+    :return: 与FastEvaluator相同编码的整数牌力
+    """
+    if FIVE_CARD_RANKS is None:
+        load_five_card_tables()
+    return evaluate_omaha_keys(hole_keys(hole), board_keys(board))
+
+# ----------------------------------------------------------------------
+# 短牌(6+)：去掉2-5，A-6-7-8-9是最小的顺子；同花大于葫芦，三条大于顺子
+# ----------------------------------------------------------------------
+
+SHORT_DECK_RANKS = range(4, 13)  # 6-A（点数下标）
+SHORT_DECK_WHEEL = (1 << 12) | (0b1111 << 4)  # A6789
+
+# 短牌的牌型顺序（从小到大）；编码时用在此列表中的位置代替HandRank
+SHORT_DECK_ORDER = [
+    HandRank.HIGH_CARD,
+    HandRank.PAIR,
+    HandRank.TWO_PAIR,
+    HandRank.STRAIGHT,
+    HandRank.THREE_OF_A_KIND,
+    HandRank.FULL_HOUSE,
+    HandRank.FLUSH,
+    HandRank.FOUR_OF_A_KIND,
+    HandRank.STRAIGHT_FLUSH,
+    HandRank.ROYAL_FLUSH,
+]
+SHORT_DECK_LEVEL = {category: level for level, category in enumerate(SHORT_DECK_ORDER)}
+
+def _build_short_deck_straight() -> bytes:
+    """13位点数掩码 -> 短牌顺子最大牌值（A6789记为9）"""
+    table = bytearray(8192)
+    windows = [(0b11111 << low, low + 6) for low in range(8, -1, -1)]
+    for mask in range(8192):
+        for window, high in windows:
+            if mask & window == window:
+                table[mask] = high
+                break
+        else:
+            if mask & SHORT_DECK_WHEEL == SHORT_DECK_WHEEL:
+                table[mask] = 9
+    return bytes(table)
+
+# 与FastEvaluator的顺子表一样在进程内构建
+SHORT_DECK_STRAIGHT: Optional[bytes] = None
+
+class ShortDeckEvaluator:
+    """
+    短牌评估器：输入5-7张整数编码牌，返回短牌规则下可比较大小的整数牌力
+    """
+
+    @staticmethod
+    def _encode(category: int, values: Sequence[int]) -> int:
+        return FastEvaluator.encode(SHORT_DECK_LEVEL[category], values)
+
+    @staticmethod
+    def category(strength: int) -> int:
+        """整数牌力对应的牌型（HandRank）"""
+        return SHORT_DECK_ORDER[strength >> CATEGORY_SHIFT]
+
+    @staticmethod
+    def evaluate(cards: Sequence[int]) -> int:
+        global SHORT_DECK_STRAIGHT
+        if SHORT_DECK_STRAIGHT is None:
+            SHORT_DECK_STRAIGHT = _build_short_deck_straight()
+            fast_evaluator.load_tables()
+        straights = SHORT_DECK_STRAIGHT
+        popcount = fast_evaluator.POPCOUNT
+        encode = ShortDeckEvaluator._encode
+        suit_masks = [0, 0, 0, 0]
+        counts = [0] * 13
+        for c in cards:
+            r = c >> 2
+            suit_masks[c & 3] |= 1 << r
+            counts[r] += 1
+
+        flush_mask = 0
+        for mask in suit_masks:
+            if popcount[mask] >= 5:
+                flush_mask = mask
+                break
+        if flush_mask:
+            straight_flush = straights[flush_mask]
+            if straight_flush == 14:
+                return encode(HandRank.ROYAL_FLUSH, [14])
+            if straight_flush:
+                return encode(HandRank.STRAIGHT_FLUSH, [straight_flush])
+
+        quad = -1
+        trips = []
+        pairs = []
+        singles_mask = 0
+        for r in range(12, -1, -1):
+            n = counts[r]
+            if n == 4 and quad < 0:
+                quad = r
+            elif n >= 3:
+                trips.append(r)
+            elif n == 2:
+                pairs.append(r)
+            elif n:
+                singles_mask |= 1 << r
+
+        if quad >= 0:
+            others = singles_mask
+            for r in trips + pairs:
+                others |= 1 << r
+            return encode(HandRank.FOUR_OF_A_KIND, [quad + 2] + _top_values(others, 1))
+
+        if flush_mask:
+            return encode(HandRank.FLUSH, _top_values(flush_mask, 5))
+
+        if trips and (pairs or len(trips) > 1):
+            pair = max(pairs[0] if pairs else -1, trips[1] if len(trips) > 1 else -1)
+            return encode(HandRank.FULL_HOUSE, [trips[0] + 2, pair + 2])
+
+        if trips:
+            return encode(HandRank.THREE_OF_A_KIND, [trips[0] + 2] + _top_values(singles_mask, 2))
+
+        rank_mask = suit_masks[0] | suit_masks[1] | suit_masks[2] | suit_masks[3]
+        straight = straights[rank_mask]
+        if straight:
+            return encode(HandRank.STRAIGHT, [straight])
+
+        if len(pairs) >= 2:
+            rest = singles_mask
+            for r in pairs[2:]:
+                rest |= 1 << r
+            return encode(HandRank.TWO_PAIR, [pairs[0] + 2, pairs[1] + 2] + _top_values(rest, 1))
+
+        if pairs:
+            return encode(HandRank.PAIR, [pairs[0] + 2] + _top_values(singles_mask, 3))
+
+        return encode(HandRank.HIGH_CARD, _top_values(singles_mask, 5))
+
+# ----------------------------------------------------------------------
+# 玩法规则
+# ----------------------------------------------------------------------
+
+@dataclass
+class VariantRules:
+    """
+    一种玩法的牌组和摊牌评估方式
+    prepare_board对完整公共牌做一次预处理（奥马哈为3张子集键），同一局模拟中所有玩家共用；
+    score(手牌, 公共牌, 预处理结果)返回可比较大小的整数牌力
+    """
+    variant: Variant
+    hole_cards: int
+    deck: Tuple[int, ...]
+    prepare_board: Callable[[Sequence[int]], object]
+    score: Callable[[Sequence[int], Sequence[int], object], int]
+
+def _no_prepare(board: Sequence[int]) -> None:
+    return None
+
+def _score_holdem(hole: Sequence[int], board: Sequence[int], prepared) -> int:
+    return FastEvaluator.evaluate(list(hole) + list(board))
+
+def _prepare_omaha(board: Sequence[int]) -> List[Tuple[int, int, int]]:
+    if FIVE_CARD_RANKS is None:
+        load_five_card_tables()
+    return board_keys(board)
+
+def _score_omaha(hole: Sequence[int], board: Sequence[int], prepared) -> int:
+    return evaluate_omaha_keys(hole_keys(hole), prepared)
+
+def _score_short_deck(hole: Sequence[int], board: Sequence[int], prepared) -> int:
+    return ShortDeckEvaluator.evaluate(list(hole) + list(board))
+
+FULL_DECK = tuple(range(52))
+SHORT_DECK = tuple(r * 4 + s for r in SHORT_DECK_RANKS for s in range(4))
+
+VARIANT_RULES: Dict[Variant, VariantRules] = {
+    Variant.HOLDEM: VariantRules(Variant.HOLDEM, 2, FULL_DECK, _no_prepare, _score_holdem),
+    Variant.PLO4: VariantRules(Variant.PLO4, 4, FULL_DECK, _prepare_omaha, _score_omaha),
+    Variant.PLO5: VariantRules(Variant.PLO5, 5, FULL_DECK, _prepare_omaha, _score_omaha),
+    Variant.SHORT_DECK: VariantRules(Variant.SHORT_DECK, 2, SHORT_DECK, _no_prepare, _score_short_deck),
+}
+
+def rules(variant: Variant) -> VariantRules:
+    return VARIANT_RULES[variant]
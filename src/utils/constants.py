@@ -42,6 +42,33 @@ class Action(Enum):
     RAISE = "RAISE"
     ALL_IN = "ALL_IN"
 
+class Variant(Enum):
+    """
+    玩法枚举
+    HOLDEM: 无限注德州扑克
+    PLO4/PLO5: 4张/5张手牌的底池限注奥马哈（必须恰好使用2张手牌）
+    SHORT_DECK: 短牌(6+)，36张牌
+    """
+    HOLDEM = "HOLDEM"
+    PLO4 = "PLO4"
+    PLO5 = "PLO5"
+    SHORT_DECK = "SHORT_DECK"
+
+class HandRank:
+    """
+    手牌等级定义
+    """
+    HIGH_CARD = 0
+    PAIR = 1
+    TWO_PAIR = 2
+    THREE_OF_A_KIND = 3
+    STRAIGHT = 4
+    FLUSH = 5
+    FULL_HOUSE = 6
+    FOUR_OF_A_KIND = 7
+    STRAIGHT_FLUSH = 8
+    ROYAL_FLUSH = 9
+
 # 6人局位置权重（数值越大，玩牌范围越宽）
 POSITION_WEIGHTS_6MAX: Dict[Position, float] = {
     Position.UTG: 1.0,  # 最紧
@@ -52,6 +79,16 @@ POSITION_WEIGHTS_6MAX: Dict[Position, float] = {
     Position.BB: 1.0
 }
 
+# 各位置继续玩的起手牌比例（范围推断的位置先验）
+POSITION_CONTINUE_FRACTIONS: Dict[Position, float] = {
+    Position.UTG: 0.15,
+    Position.MP: 0.19,
+    Position.CO: 0.27,
+    Position.BTN: 0.45,
+    Position.SB: 0.35,
+    Position.BB: 0.60   # 大盲已投入，防守最宽
+}
+
 # 标准翻前加注尺度（以大盲为单位）
 STANDARD_PREFLOP_RAISES = {
     "MIN": 2,        # 最小加注
@@ -0,0 +1,8 @@
+"""
+测试共用设置：查找表磁盘缓存写到临时目录，不污染 ~/.cache/poker_advisor
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault('POKER_ADVISOR_CACHE', tempfile.mkdtemp(prefix='poker_advisor_test_'))
@@ -0,0 +1,198 @@
+"""回测的EV估计、手牌回放和检查点"""
+
+import json
+import pytest
+from src.core.card import Card, Hand
+from src.engine import backtest
+from src.engine.advisor import Decision, PokerAdvisor
+from src.engine.backtest import Backtester, RecordedHand, estimate_ev, replay_hand
+from src.engine.evaluator import EquityCalculator
+from src.utils.constants import Action, Position, Stage
+
+def test_fold_is_zero():
+    assert estimate_ev(Action.FOLD, 0, 0.9, 300, 100, 1000) == 0.0
+
+def test_call_at_pot_odds_is_break_even():
+    # 底池300（含对手的下注100），跟注100后争夺400，需要25%胜率
+    assert estimate_ev(Action.CALL, 100, 0.25, 300, 100, 1000) == pytest.approx(0.0)
+    assert estimate_ev(Action.CALL, 100, 0.0, 300, 100, 1000) == pytest.approx(-100.0)
+    assert estimate_ev(Action.CALL, 100, 1.0, 300, 100, 1000) == pytest.approx(300.0)
+
+def test_call_is_capped_by_stack():
+    assert estimate_ev(Action.CALL, 60, 0.0, 300, 100, 60) == pytest.approx(-60.0)
+
+def test_raise_assumes_one_caller():
+    # 加注到300（新投入300），对手再跟200，底池300+300+200
+    assert estimate_ev(Action.RAISE, 300, 1.0, 300, 100, 1000) == pytest.approx(500.0)
+    assert estimate_ev(Action.ALL_IN, 0, 0.0, 300, 100, 400) == pytest.approx(-400.0)
+
+def test_check_wins_current_pot():
+    assert estimate_ev(Action.CHECK, 0, 0.5, 200, 0, 1000) == pytest.approx(100.0)
+
+def test_recorded_hand_round_trips_through_json():
+    recorded = RecordedHand(
+        hand_id='h1',
+        hero=Position.BTN,
+        hand=Hand.from_string('AhKh'),
+        stacks={Position.BTN: 1000, Position.BB: 800},
+        board=[Card.from_string(card) for card in ('2c', '7d', 'Qs')],
+        actions=[(Stage.PREFLOP, Position.BTN, Action.RAISE, 30), (Stage.PREFLOP, Position.BB, Action.CALL, 20)],
+    )
+    restored = RecordedHand.from_dict(json.loads(json.dumps(recorded.to_dict())))
+    assert restored.to_dict() == recorded.to_dict()
+    assert restored.actions == recorded.actions
+    assert restored.board == recorded.board
+
+def test_replay_rejects_backward_stages():
+    recorded = RecordedHand(
+        hand_id='backward',
+        hero=Position.BTN,
+        hand=Hand.from_string('AhKh'),
+        stacks={Position.BTN: 1000, Position.BB: 1000},
+        board=[Card.from_string(card) for card in ('2c', '7d', 'Qs')],
+        actions=[
+            (Stage.FLOP, Position.BB, Action.CHECK, 0),
+            (Stage.PREFLOP, Position.BTN, Action.CALL, 10),
+        ],
+    )
+    with pytest.raises(ValueError):
+        replay_hand(recorded, PokerAdvisor(0), EquityCalculator())
+
+class _RecordingAdvisor:
+    """记下顾问看到的跟注额和底池"""
+
+    def __init__(self):
+        self.seen = []
+
+    def get_advice(self, game_state):
+        self.seen.append((game_state.to_call, game_state.current_pot, game_state.my_stack))
+        return Decision(Action.CHECK if game_state.to_call == 0 else Action.CALL, game_state.to_call)
+
+def bb_option_hand() -> RecordedHand:
+    """BTN平跟、SB补齐、大盲（我）有权过牌"""
+    return RecordedHand(
+        hand_id='bb-option',
+        hero=Position.BB,
+        hand=Hand.from_string('7c2d'),
+        stacks={Position.BTN: 1000, Position.SB: 1000, Position.BB: 1000},
+        board=[],
+        actions=[
+            (Stage.PREFLOP, Position.BTN, Action.CALL, 10),
+            (Stage.PREFLOP, Position.SB, Action.CALL, 5),
+            (Stage.PREFLOP, Position.BB, Action.CHECK, 0),
+        ],
+    )
+
+def test_replay_posts_blinds_before_the_bb_option():
+    advisor = _RecordingAdvisor()
+    points = replay_hand(bb_option_hand(), advisor, EquityCalculator(seed=0), num_simulations=50)
+    assert advisor.seen == [(0, 30, 990)]
+    assert points[0].ev_actual == pytest.approx(points[0].equity * 30)
+
+def test_real_advisor_does_not_fold_the_free_option():
+    # 7c2d在大盲：顾问不入池，免费过牌时按过牌计，与实际的过牌一致
+    points = replay_hand(bb_option_hand(), PokerAdvisor(0), EquityCalculator(seed=0), num_simulations=50)
+    assert points[0].advised.action == Action.CHECK
+    assert not points[0].deviates
+    assert points[0].ev_difference == 0
+
+def test_recorded_blinds_and_ante_override_defaults():
+    recorded = bb_option_hand()
+    recorded.blinds = (50, 100)
+    recorded.ante = 10
+    recorded.actions = [
+        (Stage.PREFLOP, Position.BTN, Action.CALL, 100),
+        (Stage.PREFLOP, Position.SB, Action.CALL, 50),
+        (Stage.PREFLOP, Position.BB, Action.CHECK, 0),
+    ]
+    advisor = _RecordingAdvisor()
+    replay_hand(RecordedHand.from_dict(recorded.to_dict()), advisor, EquityCalculator(seed=0), 50)
+    assert advisor.seen == [(0, 330, 890)]
+
+# ----------------------------------------------------------------------
+# Backtester：多进程、检查点
+# ----------------------------------------------------------------------
+
+def sample_lines(count: int = 6):
+    hands = ['AhKh', '7c2d', 'QsQd', 'Jh9h', 'As5s', 'KdTc']
+    lines = []
+    for i in range(count):
+        recorded = RecordedHand(
+            hand_id=str(i),
+            hero=Position.BTN,
+            hand=Hand.from_string(hands[i % len(hands)]),
+            stacks={Position.BTN: 1000, Position.SB: 1000, Position.BB: 1000},
+            board=[Card.from_string(card) for card in ('2c', '7d', 'Qs', '5h', '9c')],
+            actions=[
+                (Stage.PREFLOP, Position.BTN, Action.RAISE, 30),
+                (Stage.PREFLOP, Position.SB, Action.FOLD, 0),
+                (Stage.PREFLOP, Position.BB, Action.CALL, 20),
+                (Stage.FLOP, Position.BB, Action.CHECK, 0),
+                (Stage.FLOP, Position.BTN, Action.RAISE, 40),
+                (Stage.FLOP, Position.BB, Action.CALL, 40),
+                (Stage.TURN, Position.BB, Action.RAISE, 100),
+                (Stage.TURN, Position.BTN, Action.FOLD, 0),
+            ],
+        )
+        lines.append(json.dumps(recorded.to_dict()))
+    lines.insert(3, '{not json')
+    return lines
+
+def assert_same_stats(stats, expected):
+    assert (stats.hands, stats.errors) == (expected.hands, expected.errors)
+    assert stats.groups.keys() == expected.groups.keys()
+    for key, values in expected.groups.items():
+        assert stats.groups[key][:2] == values[:2]
+        assert stats.groups[key][2:] == pytest.approx(values[2:])
+
+@pytest.fixture(scope='module')
+def baseline():
+    return Backtester(seed=7, chunk_size=2, num_simulations=50).run(sample_lines())
+
+def test_run_counts_hands_and_errors(baseline):
+    assert (baseline.hands, baseline.errors) == (6, 1)
+    rows = {(row['position'], row['stage']): row for row in baseline.summary()}
+    assert rows[('BTN', 'PREFLOP')]['decisions'] == 6
+    assert rows[('BTN', 'FLOP')]['decisions'] == 6
+    assert rows[('BTN', 'TURN')]['decisions'] == 6
+
+def test_same_seed_same_stats_with_workers(baseline):
+    stats = Backtester(seed=7, chunk_size=2, num_simulations=50, workers=2).run(sample_lines())
+    assert_same_stats(stats, baseline)
+
+class _Interrupted(Exception):
+    pass
+
+def test_resume_skips_completed_chunks(baseline, tmp_path, monkeypatch):
+    checkpoint = str(tmp_path / 'checkpoint.json')
+    run_chunk = backtest._run_chunk
+    ran = []
+
+    def interrupted(args):
+        if args[0] == 2:
+            raise _Interrupted()
+        ran.append(args[0])
+        return run_chunk(args)
+
+    monkeypatch.setattr(backtest, '_run_chunk', interrupted)
+    with pytest.raises(_Interrupted):
+        Backtester(seed=7, chunk_size=2, num_simulations=50, checkpoint_path=checkpoint).run(sample_lines())
+    assert ran == [0, 1]
+
+    def counted(args):
+        ran.append(args[0])
+        return run_chunk(args)
+
+    monkeypatch.setattr(backtest, '_run_chunk', counted)
+    stats = Backtester(seed=7, chunk_size=2, num_simulations=50, checkpoint_path=checkpoint).run(sample_lines())
+    assert ran == [0, 1, 2, 3]
+    assert_same_stats(stats, baseline)
+
+def test_checkpoint_with_other_settings_is_rejected(tmp_path):
+    checkpoint = str(tmp_path / 'checkpoint.json')
+    Backtester(seed=7, chunk_size=2, num_simulations=50, checkpoint_path=checkpoint).run(sample_lines(2))
+    with pytest.raises(ValueError, match='settings'):
+        Backtester(seed=8, chunk_size=2, num_simulations=50, checkpoint_path=checkpoint).run(sample_lines(2))
+    with pytest.raises(ValueError, match='settings'):
+        Backtester(seed=7, chunk_size=2, num_simulations=50, checkpoint_path=checkpoint,
+                   blinds=(50, 100)).run(sample_lines(2))
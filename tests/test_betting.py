@@ -0,0 +1,78 @@
+"""逐座位的下注状态机"""
+
+import pytest
+from src.engine.betting import SEAT_INDEX, BettingRound
+from src.engine.rng import RandomStream
+from src.utils.constants import Action, Position, Stage
+
+def three_way_flop(stacks, first_bet):
+    """UTG/MP/CO三人进入翻牌，UTG先下注first_bet"""
+    betting = BettingRound(stacks, 10, seated=[Position.UTG, Position.MP, Position.CO, Position.BB])
+    # 翻前：UTG/MP/CO跟注，大盲弃牌
+    while not betting.round_over:
+        if betting.position == Position.BB:
+            betting.apply(Action.FOLD)
+        else:
+            betting.apply(Action.CALL, betting.to_call)
+    betting.next_street()
+    assert betting.position == Position.UTG
+    betting.apply(Action.RAISE, first_bet)
+    return betting
+
+def test_single_short_all_in_does_not_reopen():
+    stacks = [1000, 160, 1000, 1000, 1000, 1000]
+    betting = three_way_flop(stacks, 100)
+    betting.apply(Action.ALL_IN, betting.stacks[SEAT_INDEX[Position.MP]])   # 全下到150，只加注50
+    betting.apply(Action.CALL, betting.to_call)                            # CO跟注
+    assert betting.position == Position.UTG
+    assert not betting.can_raise()
+    assert not betting.is_legal(Action.RAISE, betting.min_raise)
+
+def test_cumulative_short_all_ins_reopen():
+    stacks = [1000, 160, 210, 1000, 1000, 1000]
+    betting = three_way_flop(stacks, 100)
+    betting.apply(Action.ALL_IN, betting.stacks[SEAT_INDEX[Position.MP]])   # 全下到150（+50）
+    betting.apply(Action.ALL_IN, betting.stacks[SEAT_INDEX[Position.CO]])   # 全下到200（+50）
+    # UTG下注100之后累计被加注100，达到一次完整加注
+    assert betting.position == Position.UTG
+    assert betting.can_raise()
+    assert betting.is_legal(Action.RAISE, betting.min_raise)
+
+def test_player_facing_only_short_raise_since_acting_stays_closed():
+    stacks = [1000, 1000, 160, 1000, 1000, 1000]
+    betting = three_way_flop(stacks, 100)
+    betting.apply(Action.CALL, 100)                                         # MP跟注100
+    betting.apply(Action.ALL_IN, betting.stacks[SEAT_INDEX[Position.CO]])   # CO全下到150
+    assert betting.position == Position.UTG
+    assert not betting.can_raise()
+    betting.apply(Action.CALL, betting.to_call)
+    assert betting.position == Position.MP
+    assert not betting.can_raise()
+
+def play_random_hand(rng: RandomStream) -> BettingRound:
+    stacks = [rng.randint(5, 400) for _ in range(6)]
+    betting = BettingRound(stacks, 10, ante=rng.choice([0, 1]))
+    total = sum(stacks)
+    while True:
+        while not betting.round_over:
+            options = betting.legal_actions()
+            option = rng.choice(options)
+            amount = rng.randint(option.min_amount, option.max_amount) if option.max_amount else 0
+            assert betting.is_legal(option.action, amount)
+            betting.apply(option.action, amount)
+            assert sum(betting.stacks) + betting.pot == total
+            assert all(stack >= 0 for stack in betting.stacks)
+        if betting.hand_over or betting.stage == Stage.RIVER:
+            return betting
+        betting.next_street()
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_play_conserves_chips(seed):
+    rng = RandomStream(seed)
+    for _ in range(25):
+        betting = play_random_hand(rng)
+        total = sum(betting.stacks) + betting.pot
+        pots = betting.pots()
+        assert sum(amount for amount, _ in pots) == betting.pot
+        assert all(eligible & ~betting.live_mask() == 0 for _, eligible in pots)
+        assert sum(betting.stacks) + sum(amount for amount, _ in pots) == total
@@ -0,0 +1,39 @@
+"""分桶表：翻牌表必须预构建，转牌/河牌现场计算的开销"""
+
+import pytest
+from src.core.card import Card, Hand
+from src.engine import buckets
+from src.engine.buckets import BucketTable, BucketTableBuilder, equity_distribution, nearest_centroid
+from src.utils.constants import Stage
+
+TURN = [Card.from_string(card) for card in ('Qh', '7d', '2c', 'Kc')]
+
+def test_missing_flop_table_fails_fast():
+    with pytest.raises(RuntimeError, match='python -m src.engine.tables flop_buckets'):
+        BucketTable.default(Stage.FLOP)
+
+@pytest.fixture(scope='module')
+def turn_table():
+    return BucketTableBuilder().build_street(Stage.TURN, [[card.to_int() for card in TURN]], num_buckets=4)
+
+def test_turn_bucket_matches_distribution(turn_table):
+    hand = Hand.from_string('AhKd')
+    expected = nearest_centroid(equity_distribution(hand, TURN).histogram, turn_table.centroids)
+    assert turn_table.bucket(hand, TURN) == expected
+
+def test_turn_board_is_computed_once(turn_table, monkeypatch):
+    calls = []
+    original = buckets.board_distributions
+
+    def counting(board, bins=buckets.DEFAULT_BINS):
+        calls.append(tuple(board))
+        return original(board, bins)
+
+    monkeypatch.setattr(buckets, 'board_distributions', counting)
+    turn_table._live.clear()
+    for hand in ('AhKd', '3s4d', '9c9d', 'JhTh'):
+        turn_table.bucket(Hand.from_string(hand), TURN)
+    assert len(calls) == 1
+    # 公共牌顺序不同也命中同一缓存
+    turn_table.bucket(Hand.from_string('AhKd'), TURN[::-1])
+    assert len(calls) == 1
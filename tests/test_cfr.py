@@ -0,0 +1,44 @@
+"""CFR子博弈求解器：收敛性和已知均衡"""
+
+import pytest
+from src.core.card import Card
+from src.engine.cfr import SolverConfig, SubgameSolver
+from src.engine.ranges import HandRange
+
+def cards(text: str):
+    return [Card.from_string(text[i:i+2]) for i in range(0, len(text), 2)]
+
+def polarized_solver(algorithm: str = 'dcfr') -> SubgameSolver:
+    """
+    河牌KsKd7c4h2s，底池100、剩余筹码100（唯一下注是底池大小的全下）
+    OOP只有抓诈牌QQ；IP是坚果77（3组）或空气65s（4组），双方组合互不阻断
+    均衡：IP价值下注全部77，诈唬1.5组（65s的37.5%）；OOP面对下注跟注50%
+    """
+    config = SolverConfig(bet_sizes={'POT': 1.0}, raise_sizes={}, max_raises=0, algorithm=algorithm)
+    return SubgameSolver(cards('KsKd7c4h2s'), HandRange.from_string('QQ'),
+                         HandRange.from_string('77,65s'), 100, 100, config, seed=1)
+
+@pytest.mark.parametrize('algorithm', ['dcfr', 'cfr+'])
+def test_exploitability_decreases(algorithm):
+    solver = polarized_solver(algorithm)
+    solver.solve(10)
+    early = solver.exploitability()
+    solver.solve(490)
+    late = solver.exploitability()
+    assert late < early / 10
+    assert late < 0.5
+
+def test_recovers_nut_or_air_equilibrium():
+    solution = polarized_solver().solve(500)
+    assert solution.actions(['CHECK']) == [('CHECK', 0), ('ALL_IN', 100)]
+    assert solution.strategy([], *cards('QhQd'))['CHECK'] > 0.99
+    assert solution.strategy(['CHECK'], *cards('7h7d'))['ALL_IN'] > 0.99
+    bluff = sum(solution.strategy(['CHECK'], *cards(combo))['ALL_IN']
+                for combo in ('6h5h', '6d5d', '6c5c', '6s5s')) / 4
+    assert bluff == pytest.approx(0.375, abs=0.03)
+    call = solution.strategy(['CHECK', 'ALL_IN'], *cards('QhQd'))['CALL']
+    assert call == pytest.approx(0.5, abs=0.03)
+
+def test_rejects_flop_board():
+    with pytest.raises(ValueError):
+        SubgameSolver(cards('KsKd7c'), HandRange.from_string('QQ'), HandRange.from_string('77'), 100, 100)
@@ -0,0 +1,78 @@
+"""决策缓存的键和失效"""
+
+from src.core.card import Card, Hand
+from src.core.game_state import GameState
+from src.engine.advisor import Decision, PokerAdvisor
+from src.engine.buckets import BucketTable
+from src.engine.decision_cache import CACHE_HIT_REASON, DecisionCache, canonical_key
+from src.engine.mcts import MCTSConfig
+from src.utils.constants import Action, Position, Stage
+
+def flop_state(hand: str, board: str) -> GameState:
+    game_state = GameState(my_hand=Hand.from_string(hand), my_position=Position.BTN, my_stack=1000)
+    game_state.advance_stage()
+    game_state.add_community_cards([Card.from_string(board[i:i+2]) for i in range(0, len(board), 2)])
+    game_state.to_call = 50
+    game_state.current_pot = 150
+    return game_state
+
+def test_suit_isomorphic_states_share_a_key():
+    assert canonical_key(flop_state('AhKh', 'Qh7h2c')) == canonical_key(flop_state('AsKs', 'Qs7s2d'))
+    assert canonical_key(flop_state('AhKh', 'Qh7h2c')) != canonical_key(flop_state('AhKd', 'Qh7h2c'))
+
+def test_least_recently_used_entry_is_evicted():
+    cache = DecisionCache(max_size=1)
+    first, second = flop_state('AhKh', 'Qh7h2c'), flop_state('9c9d', 'Qh7h2c')
+    cache.put(first, Decision(Action.CALL, 50, 0.7, []))
+    cache.put(second, Decision(Action.FOLD, 0, 0.6, []))
+    assert cache.get(first) is None
+    assert cache.get(second).action == Action.FOLD
+    assert (len(cache), cache.evictions, cache.hits, cache.misses) == (1, 1, 1, 1)
+
+def test_advisor_config_is_part_of_the_key():
+    advisor = PokerAdvisor(1)
+    advisor.equity_simulations = 200
+    advisor.decision_cache = DecisionCache()
+    game_state = flop_state('AhKh', 'Qh7h2c')
+    advisor.get_advice(game_state)
+    advisor.get_advice(game_state)
+    assert advisor.decision_cache.hits == 1
+
+    advisor.equity_simulations = 300
+    advisor.get_advice(game_state)
+    advisor.equity_method = 'combined'
+    advisor.get_advice(game_state)
+    advisor.mcts_config = MCTSConfig(iterations=50, time_limit=None)
+    advisor.get_advice(game_state)
+    advisor.mcts_config = MCTSConfig(iterations=100, time_limit=None)
+    advisor.get_advice(game_state)
+    assert advisor.decision_cache.hits == 1
+    assert advisor.decision_cache.misses == 5
+
+    advisor.mcts_config = MCTSConfig(iterations=50, time_limit=None)
+    advisor.get_advice(game_state)
+    assert advisor.decision_cache.hits == 2
+
+def test_hit_does_not_replay_stale_numbers():
+    cache = DecisionCache()
+    first = flop_state('AhKh', 'Qh7h2c')
+    cache.put(first, Decision(Action.RAISE, 100, 0.8, ["胜率: 0.62", "下注: 100"]))
+    # 同一赔率档、筹码底池比档，但跟注额、底池和筹码都翻倍
+    second = flop_state('AsKs', 'Qs7s2d')
+    second.to_call, second.current_pot, second.my_stack = 100, 300, 2000
+    decision = cache.get(second)
+    assert (decision.action, decision.amount, decision.confidence) == (Action.RAISE, 200, 0.8)
+    assert decision.reasoning == [CACHE_HIT_REASON]
+
+def test_bucket_tables_are_keyed_by_content():
+    table = BucketTable(Stage.TURN, [[0.0, 1.0], [1.0, 0.0]], bytearray(), 2)
+    same = BucketTable(Stage.TURN, [[0.0, 1.0], [1.0, 0.0]], bytearray(), 2)
+    other = BucketTable(Stage.TURN, [[0.5, 0.5], [1.0, 0.0]], bytearray(), 2)
+    advisor = PokerAdvisor(0)
+    advisor.bucket_tables[Stage.TURN] = table
+    context = advisor.cache_context()
+    assert id(table) not in context[-1][0]
+    advisor.bucket_tables[Stage.TURN] = same
+    assert advisor.cache_context() == context
+    advisor.bucket_tables[Stage.TURN] = other
+    assert advisor.cache_context() != context
@@ -0,0 +1,7 @@
+"""快速评估器的差分测试（只穷举最小牌为2c的组合，完整穷举见 python -m src.engine.difftest）"""
+
+from src.engine.difftest import DifferentialTester
+
+def test_five_card_orderings_agree_with_reference():
+    failures = DifferentialTester().check_five_card([0])
+    assert failures and all(not items for items in failures.values()), failures
@@ -0,0 +1,56 @@
+"""协调者/工作者的握手"""
+
+import socket
+import pytest
+from src.core.card import Hand
+from src.engine.distributed import (
+    Coordinator, auth_digest, merge_counts, recv_message, run_chunk, send_message, start_local_workers,
+)
+
+def test_default_listens_on_loopback_only():
+    coordinator = Coordinator()
+    try:
+        assert coordinator.address[0] == '127.0.0.1'
+    finally:
+        coordinator.close()
+
+def test_remote_listen_requires_token():
+    with pytest.raises(ValueError):
+        Coordinator(host='0.0.0.0')
+
+def test_job_runs_with_matching_token():
+    coordinator = Coordinator(token='secret')
+    try:
+        start_local_workers(coordinator.address, 2, token='secret')
+        equity = coordinator.equity(Hand.from_string('AhAd'), [], num_simulations=400,
+                                    chunk_size=100, seed=1, timeout=30)
+        assert 0.7 < float(equity) < 0.95
+    finally:
+        coordinator.close()
+
+def test_distributed_job_matches_local_chunks():
+    params = {'hand': 'AhAd', 'board': '', 'num_opponents': 1}
+    coordinator = Coordinator(host='127.0.0.1')
+    try:
+        start_local_workers(coordinator.address, 2)
+        counts = coordinator.run_job('equity', params, 400, chunk_size=100, seed=1, timeout=30)
+    finally:
+        coordinator.close()
+    local = merge_counts([
+        run_chunk({'kind': 'equity', 'params': params, 'seed': 1, 'chunk': index, 'count': 100})
+        for index in range(4)
+    ])
+    assert counts == local
+    assert 0.7 < counts['wins'] / counts['total'] < 0.95
+
+def test_wrong_token_is_disconnected():
+    coordinator = Coordinator(token='secret')
+    try:
+        with socket.create_connection(coordinator.address, timeout=5) as sock:
+            challenge = recv_message(sock)
+            send_message(sock, {'type': 'hello', 'auth': auth_digest('wrong', challenge['nonce'])})
+            with pytest.raises(ConnectionError):
+                recv_message(sock)
+        assert coordinator.workers == 0
+    finally:
+        coordinator.close()
@@ -0,0 +1,69 @@
+"""降低方差的胜率估计：无偏性和自报的方差缩减"""
+
+from functools import lru_cache
+from itertools import combinations
+import statistics
+import pytest
+from src.core.card import Card
+from src.engine.equity_estimators import METHODS, estimate_equity
+from src.engine.fast_evaluator import FastEvaluator
+from src.engine.rng import RandomStream
+
+HERO = 'AhKh'
+BOARD = 'Qh7h2c5d'
+SEEDS = 200
+SIMULATIONS = 400
+
+def ints(text: str):
+    return [Card.from_string(text[i:i+2]).to_int() for i in range(0, len(text), 2)]
+
+def exact_equity(hero, board) -> float:
+    """转牌单挑：枚举河牌和对手的全部组合"""
+    dead = set(hero) | set(board)
+    deck = [card for card in range(52) if card not in dead]
+    evaluate = FastEvaluator.evaluate
+    total = 0.0
+    count = 0
+    for river in deck:
+        full_board = board + [river]
+        ours = evaluate(hero + full_board)
+        for a, b in combinations([card for card in deck if card != river], 2):
+            theirs = evaluate([a, b] + full_board)
+            total += 1.0 if ours > theirs else (0.5 if ours == theirs else 0.0)
+            count += 1
+    return total / count
+
+@lru_cache(maxsize=None)
+def estimates(method: str):
+    """同一组种子下各方法的估计"""
+    return [
+        estimate_equity(ints(HERO), ints(BOARD), 1, SIMULATIONS, RandomStream(seed), method)
+        for seed in range(SEEDS)
+    ]
+
+@pytest.mark.parametrize('method', sorted(METHODS))
+def test_estimators_are_unbiased(method):
+    exact = exact_equity(ints(HERO), ints(BOARD))
+    values = [estimate.equity for estimate in estimates(method)]
+    mean = statistics.mean(values)
+    standard_error = (statistics.variance(values) / len(values)) ** 0.5
+    assert abs(mean - exact) < 4 * standard_error
+
+@pytest.mark.parametrize('method', sorted(METHODS))
+def test_reported_variance_matches_spread_across_seeds(method):
+    results = estimates(method)
+    measured = statistics.variance([estimate.equity for estimate in results])
+    reported = statistics.mean(estimate.std_error ** 2 for estimate in results)
+    assert 0.75 < reported / measured < 1.33
+
+@pytest.mark.parametrize('method', sorted(set(METHODS) - {'plain'}))
+def test_reported_reduction_is_not_inflated(method):
+    plain = statistics.variance([estimate.equity for estimate in estimates('plain')])
+    measured = plain / statistics.variance([estimate.equity for estimate in estimates(method)])
+    reported = statistics.mean(estimate.variance_reduction for estimate in estimates(method))
+    assert 0.7 < reported / measured < 1.3
+
+def test_seed_reproduces_estimate():
+    first = estimate_equity(ints(HERO), ints(BOARD), 2, 200, seed=11)
+    second = estimate_equity(ints(HERO), ints(BOARD), 2, 200, seed=11)
+    assert first == second
@@ -0,0 +1,30 @@
+"""整数快速评估器"""
+
+import os
+from src.core.card import Card
+from src.engine.fast_evaluator import CATEGORY_SHIFT, FastEvaluator
+from src.engine.tables import default_manager
+from src.utils.constants import HandRank
+
+def cards(text: str):
+    return [Card.from_string(text[i:i+2]).to_int() for i in range(0, len(text), 2)]
+
+def test_wheel_and_broadway_straights():
+    wheel = FastEvaluator.evaluate(cards('Ah2c3d4s5h'))
+    broadway = FastEvaluator.evaluate(cards('AhKcQdJsTh'))
+    assert wheel >> CATEGORY_SHIFT == broadway >> CATEGORY_SHIFT == HandRank.STRAIGHT
+    assert broadway > wheel
+
+def test_seven_card_flush_beats_straight():
+    flush = FastEvaluator.evaluate(cards('2h5h9hJhKh3c4d'))
+    straight = FastEvaluator.evaluate(cards('9c8d7s6hTc2d2s'))
+    assert flush > straight
+
+def test_small_tables_stay_in_process():
+    FastEvaluator.evaluate(cards('AhKhQhJhTh9c8c'))
+    manager = default_manager()
+    assert 'straight_high' not in manager.registered()
+    assert 'popcount' not in manager.registered()
+    cache_dir = manager.cache_dir
+    names = os.listdir(cache_dir) if os.path.isdir(cache_dir) else []
+    assert not [name for name in names if name.startswith(('straight_high', 'popcount'))]
@@ -0,0 +1,55 @@
+"""翻牌策略数据库：显式构建、来源标记"""
+
+import pytest
+from src.core.card import Card, Hand
+from src.core.game_state import GameState
+from src.engine.advisor import PokerAdvisor
+from src.engine.flop_db import (
+    HEURISTIC_SOURCE, FlopDatabase, FlopDatabaseBuilder, FlopScenario, approximate_strategy,
+    heuristic_builder,
+)
+from src.engine.tables import default_manager
+from src.utils.constants import Position
+
+SCENARIO = FlopScenario('SRP_BTN_BB', Position.BTN, Position.BB, 'AA,KK,AK,AQs', 'QQ,JJ,TT,T9s')
+
+def cards(text: str):
+    return [Card.from_string(text[i:i+2]) for i in range(0, len(text), 2)]
+
+@pytest.fixture(scope='module')
+def database() -> FlopDatabase:
+    return FlopDatabase(buffer=memoryview(heuristic_builder([SCENARIO]).build_bytes()))
+
+def test_default_does_not_build():
+    # 测试的缓存目录是新建的临时目录，数据库不存在时应立即报错而不是开始构建
+    assert default_manager().is_on_demand('flop_db') is False
+    with pytest.raises(RuntimeError, match='python -m src.engine.tables flop_db'):
+        FlopDatabase.default()
+
+def test_builder_requires_strategy():
+    with pytest.raises(TypeError):
+        FlopDatabaseBuilder()
+
+def test_source_recorded(database):
+    assert database.source == HEURISTIC_SOURCE
+    assert database.is_heuristic
+    other = FlopDatabase(buffer=memoryview(
+        FlopDatabaseBuilder(approximate_strategy, 'custom', [SCENARIO]).build_bytes()
+    ))
+    assert other.source == 'custom' and not other.is_heuristic
+
+def test_lookup_frequencies(database):
+    strategy = database.lookup('SRP_BTN_BB', cards('Qh7d2c'), Hand.from_string('AhAd'))
+    assert sum(strategy.values()) == pytest.approx(1.0)
+
+def test_suit_isomorphic_flops_share_strategy(database):
+    first = database.lookup('SRP_BTN_BB', cards('Qh7d2c'), Hand.from_string('AhAd'))
+    second = database.lookup('SRP_BTN_BB', cards('Qs7c2d'), Hand.from_string('AsAc'))
+    assert first == second
+
+def test_advice_marks_heuristic(database):
+    game_state = GameState(my_hand=Hand.from_string('AhAd'), my_position=Position.BTN, my_stack=1000)
+    game_state.advance_stage()
+    game_state.add_community_cards(cards('Qh7d2c'))
+    decision = PokerAdvisor().get_flop_database_advice(game_state, database, 'SRP_BTN_BB')
+    assert any('启发式' in line for line in decision.reasoning)
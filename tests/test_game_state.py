@@ -0,0 +1,127 @@
+"""GameState的底池跟踪和撤销"""
+
+import pytest
+from src.core.card import Card, Hand
+from src.core.game_state import GameState
+from src.engine import cfr
+from src.engine.advisor import PokerAdvisor
+from src.engine.ranges import HandRange
+from src.utils.constants import Action, Position, Stage
+
+def cards(text: str):
+    return [Card.from_string(text[i:i+2]) for i in range(0, len(text), 2)]
+
+def turn_state() -> GameState:
+    """翻前BTN加注到30、BB跟注，翻牌BB过牌BTN下注40被跟注，转牌BB下注60"""
+    game_state = GameState(my_hand=Hand.from_string('AhKh'), my_position=Position.BTN, my_stack=1000,
+                           stacks={Position.BTN: 1000, Position.BB: 800})
+    game_state.record_action(Position.BTN, Action.RAISE, 30)
+    game_state.record_action(Position.BB, Action.CALL, 30)
+    game_state.advance_stage()
+    game_state.add_community_cards(cards('Qh7d2c'))
+    game_state.record_action(Position.BB, Action.CHECK)
+    game_state.record_action(Position.BTN, Action.RAISE, 40)
+    game_state.record_action(Position.BB, Action.CALL, 40)
+    game_state.advance_stage()
+    game_state.add_community_cards(cards('Qh7d2cKc'))
+    game_state.record_action(Position.BB, Action.RAISE, 60)
+    game_state.to_call = 60
+    return game_state
+
+def test_pot_accumulates_across_streets():
+    game_state = turn_state()
+    assert game_state.current_pot == 200
+    assert game_state.flop_state.start_pot == 60
+    assert game_state.street_start_pot() == 140
+    assert game_state.stacks == {Position.BTN: 930, Position.BB: 670}
+
+def test_record_action_adds_to_existing_pot():
+    # 底池已有盲注15时，记录的投入累加到底池上而不是覆盖它
+    game_state = GameState(my_hand=Hand.from_string('AhKh'), my_position=Position.BTN, my_stack=1000,
+                           current_pot=15)
+    game_state.record_action(Position.BTN, Action.RAISE, 30)
+    assert game_state.current_pot == 45
+    game_state.record_action(Position.SB, Action.FOLD)
+    game_state.record_action(Position.BB, Action.CALL, 20)
+    assert game_state.current_pot == 65
+    assert game_state.preflop_state.start_pot == 15
+    game_state.undo()
+    assert game_state.current_pot == 45
+
+def test_undo_restores_start_pot():
+    game_state = turn_state()
+    mark = game_state.checkpoint()
+    with game_state.branch():
+        game_state.record_action(Position.BTN, Action.CALL, 60)
+        game_state.advance_stage()
+        assert game_state.current_stage == Stage.RIVER
+        assert game_state.street_start_pot() == 260
+    assert game_state.checkpoint() == mark
+    assert game_state.river_state.start_pot is None
+    assert game_state.current_pot == 200
+    while game_state.undo():
+        pass
+    assert game_state.current_pot == 0
+    assert game_state.flop_state.start_pot is None
+
+def test_without_history_start_pot_is_current_pot():
+    game_state = GameState(my_hand=Hand.from_string('AhKh'), my_position=Position.BTN, my_stack=500,
+                           current_stage=Stage.TURN, current_pot=300)
+    assert game_state.street_start_pot() == 300
+
+def flop_state() -> GameState:
+    """翻前BTN加注到30、BB跟注，翻牌Qh7d2c"""
+    game_state = GameState(my_hand=Hand.from_string('AhKh'), my_position=Position.BTN, my_stack=1000,
+                           stacks={Position.BTN: 1000, Position.BB: 800})
+    game_state.record_action(Position.BTN, Action.RAISE, 30)
+    game_state.record_action(Position.BB, Action.CALL, 30)
+    game_state.advance_stage()
+    game_state.add_community_cards(cards('Qh7d2c'))
+    return game_state
+
+def test_same_history_gives_same_key():
+    assert flop_state().state_key() == flop_state().state_key()
+    hash(flop_state().state_key())
+
+def test_branch_restores_key_and_stacks():
+    game_state = flop_state()
+    key = game_state.state_key()
+    stacks = dict(game_state.stacks)
+    with game_state.branch():
+        game_state.record_action(Position.BB, Action.RAISE, 40)
+        game_state.record_action(Position.BTN, Action.FOLD)
+        game_state.update(to_call=40)
+        assert game_state.state_key() != key
+    assert game_state.state_key() == key
+    assert game_state.stacks == stacks
+    assert game_state.folded_positions == []
+    assert game_state.current_stage == Stage.FLOP
+
+def test_undo_to_start_clears_board_and_actions():
+    game_state = flop_state()
+    while game_state.undo():
+        pass
+    assert game_state.current_stage == Stage.PREFLOP
+    assert game_state.board() == []
+    assert game_state.preflop_state.actions == []
+    assert game_state.stacks == {Position.BTN: 1000, Position.BB: 800}
+
+def test_update_rejects_unknown_field():
+    with pytest.raises(AttributeError):
+        flop_state().update(my_hand=None)
+
+class _Captured(Exception):
+    pass
+
+def test_solver_uses_street_start_pot_and_remaining_stacks(monkeypatch):
+    captured = {}
+
+    def fake_solver(board, oop_range, ip_range, pot, stack, config=None, seed=None):
+        captured.update(pot=pot, stack=stack)
+        raise _Captured()
+
+    monkeypatch.setattr(cfr, 'SubgameSolver', fake_solver)
+    with pytest.raises(_Captured):
+        PokerAdvisor(0).get_solver_advice(turn_state(), HandRange())
+    # 转牌开始时底池140；BB转牌开始时剩730（670 + 本街下注60），BTN剩930
+    assert captured == {'pot': 140, 'stack': 730}
@@ -0,0 +1,96 @@
+"""对手范围的贝叶斯更新和按范围计算胜率"""
+
+from itertools import combinations
+import pytest
+from src.core.card import Card, Hand
+from src.core.game_state import GameState
+from src.engine.advisor import PokerAdvisor
+from src.engine.buckets import board_hand_strengths
+from src.engine.evaluator import EquityCalculator
+from src.engine.fast_evaluator import FastEvaluator
+from src.engine.inference import ActionModel, RangeTracker, STRENGTH_LEVELS, pot_before_actions
+from src.engine.ranges import COMBOS, HandRange, combo_index
+from src.utils.constants import Action, Position, Stage
+
+def cards(text: str):
+    return [Card.from_string(text[i:i+2]) for i in range(0, len(text), 2)]
+
+def ints(text: str):
+    return [card.to_int() for card in cards(text)]
+
+def flop_state() -> GameState:
+    """盲注15；BTN加注到30、BB跟注；翻牌BB下注45（底池65的69%；漏掉盲注则是底池50的90%）"""
+    game_state = GameState(my_hand=Hand.from_string('AhKh'), my_position=Position.BTN, my_stack=1000,
+                           current_pot=15)
+    game_state.record_action(Position.BTN, Action.RAISE, 30)
+    game_state.record_action(Position.SB, Action.FOLD)
+    game_state.record_action(Position.BB, Action.CALL, 20)
+    game_state.advance_stage()
+    game_state.add_community_cards(cards('Qd7c2s'))
+    game_state.record_action(Position.BB, Action.RAISE, 45)
+    return game_state
+
+def mean_strength(hand_range: HandRange, strengths) -> float:
+    total = sum(weight for i, weight in enumerate(hand_range.weights) if strengths[i] >= 0)
+    return sum(weight * strengths[i] for i, weight in enumerate(hand_range.weights) if strengths[i] >= 0) / total
+
+def test_action_model_tables():
+    model = ActionModel()
+    raise_table = model.table(Action.RAISE, 3)
+    check_table = model.table(Action.CHECK, 0)
+    assert len(raise_table) == STRENGTH_LEVELS
+    assert raise_table == sorted(raise_table)
+    assert check_table == sorted(check_table, reverse=True)
+    # 尺度越大，弱牌下注的似然越低
+    assert model.table(Action.RAISE, 3)[20] < model.table(Action.RAISE, 0)[20]
+
+def test_default_pot_is_pot_before_recorded_actions():
+    game_state = flop_state()
+    assert pot_before_actions(game_state) == 15
+    tracker = PokerAdvisor(0).track_ranges(game_state)
+    assert tracker.pot == game_state.current_pot == 110
+    # 与显式给出开始底池的结果一致；显式0时下注尺度落在更大的一档
+    explicit = RangeTracker.from_game_state(game_state, 15)
+    assert tracker.ranges[Position.BB].weights == explicit.ranges[Position.BB].weights
+    overbet = RangeTracker.from_game_state(game_state, 0)
+    assert tracker.ranges[Position.BB].weights != overbet.ranges[Position.BB].weights
+
+def test_large_bet_moves_weight_to_strong_combos():
+    board = ints('Qd7c2s')
+    tracker = RangeTracker(Hand.from_string('AhKh'), [Position.BB], 100)
+    tracker.add_board(board)
+    strengths = board_hand_strengths(board)
+    before = list(tracker.ranges[Position.BB].weights)
+    tracker.observe(Position.BB, Action.RAISE, 100)
+    after = tracker.ranges[Position.BB]
+    assert mean_strength(after, strengths) > mean_strength(HandRange(before), strengths) + 0.05
+    top_set = combo_index(*ints('QhQs'))
+    air = combo_index(*ints('5h3d'))
+    assert after.weights[top_set] / before[top_set] > 5 * after.weights[air] / before[air]
+
+def test_blocked_combos_get_zero_weight():
+    tracker = RangeTracker(Hand.from_string('AhKh'), [Position.BB, Position.CO], 0)
+    tracker.add_board(ints('Qd7c2s'))
+    blocked = set(ints('AhKhQd7c2s'))
+    for hand_range in tracker.ranges.values():
+        for i, (a, b) in enumerate(COMBOS):
+            if a in blocked or b in blocked:
+                assert hand_range.weights[i] == 0.0
+        assert hand_range.total_weight() > 0
+
+def exact_equity(hero, villain, board) -> float:
+    dead = set(hero + villain + board)
+    deck = [card for card in range(52) if card not in dead]
+    score = total = 0
+    for rest in combinations(deck, 5 - len(board)):
+        full = board + list(rest)
+        mine, theirs = FastEvaluator.evaluate(hero + full), FastEvaluator.evaluate(villain + full)
+        score += 2 if mine > theirs else 1 if mine == theirs else 0
+        total += 2
+    return score / total
+
+def test_range_equity_against_single_combo_matches_enumeration():
+    single = HandRange.from_string('QsQd')
+    calculator = EquityCalculator(seed=3)
+    equity = calculator.calculate_range_equity(Hand.from_string('AhKh'), cards('2c7d9h'), [single], 8000)
+    assert equity == pytest.approx(exact_equity(ints('AhKh'), ints('QsQd'), ints('2c7d9h')), abs=0.02)
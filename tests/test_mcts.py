@@ -0,0 +1,65 @@
+"""蒙特卡洛树搜索的根节点"""
+
+from src.core.card import Card, Hand
+from src.core.game_state import GameState
+from src.engine.mcts import MCTSConfig, MCTSSearch, SearchRoot, search
+from src.utils.constants import Action, Position
+
+def river_facing_bet(hand: str, board: str, to_call: int, pot: int) -> GameState:
+    """河牌面对下注、但本街没有记录动作的状态（交互流程只输入跟注额和底池）"""
+    game_state = GameState(my_hand=Hand.from_string(hand), my_position=Position.BB, my_stack=1000)
+    for _ in range(3):
+        game_state.advance_stage()
+    game_state.add_community_cards([Card.from_string(board[i:i+2]) for i in range(0, len(board), 2)])
+    game_state.to_call = to_call
+    game_state.current_pot = pot
+    return game_state
+
+def river_after_bet(hand: str, board: str, bet: int) -> GameState:
+    """河牌BB下注bet，轮到BTN的我们"""
+    game_state = GameState(my_hand=Hand.from_string(hand), my_position=Position.BTN, my_stack=1000,
+                           stacks={Position.BTN: 1000, Position.BB: 1000})
+    for _ in range(3):
+        game_state.advance_stage()
+    game_state.add_community_cards([Card.from_string(board[i:i+2]) for i in range(0, len(board), 2)])
+    game_state.record_action(Position.BB, Action.RAISE, bet)
+    game_state.to_call = bet
+    return game_state
+
+def test_unrecorded_bet_is_attributed_to_opponent():
+    root = SearchRoot.from_game_state(river_facing_bet('3s4d', 'Qh7d2cKc9h', 100, 300))
+    opponent = 1 - root.hero
+    assert root.state.bets[opponent] == 100
+    assert root.state.acted[opponent]
+    assert root.state.current_bet - root.state.bets[root.hero] == 100
+    # 补记的下注已经在当前底池里
+    assert root.state.pot == 300
+
+def test_drawing_dead_hand_prefers_fold_to_call():
+    root = SearchRoot.from_game_state(river_facing_bet('3s4d', 'Qh7d2cKc9h', 100, 300))
+    result = search(root, MCTSConfig(iterations=2000, time_limit=None), seed=7)
+    values = dict(zip(result.options, result.values()))
+    assert values[(Action.FOLD, 0)] >= values[(Action.CALL, 100)]
+    assert result.options[result.best()][0] == Action.FOLD
+
+def test_seeded_search_is_reproducible():
+    config = MCTSConfig(iterations=200, time_limit=None)
+    results = [
+        MCTSSearch(SearchRoot.from_game_state(river_facing_bet('AsKd', 'Qh7d2cKc9h', 100, 300)), config, seed=3)
+        .run(config.iterations, None)
+        for _ in range(2)
+    ]
+    assert results[0].values() == results[1].values()
+
+def test_nuts_never_fold_to_a_bet():
+    root = SearchRoot.from_game_state(river_after_bet('AsKs', 'Qs7s2sKc9h', 100))
+    result = search(root, MCTSConfig(iterations=2000, time_limit=None), seed=7)
+    values = dict(zip(result.options, result.values()))
+    assert values[(Action.CALL, 100)] > values[(Action.FOLD, 0)]
+    assert result.options[result.best()][0] != Action.FOLD
+
+def test_same_seed_same_search():
+    config = MCTSConfig(iterations=300, time_limit=None)
+    first = search(SearchRoot.from_game_state(river_after_bet('AsKs', 'Qs7s2sKc9h', 100)), config, seed=3)
+    second = search(SearchRoot.from_game_state(river_after_bet('AsKs', 'Qs7s2sKc9h', 100)), config, seed=3)
+    assert first.values() == second.values()
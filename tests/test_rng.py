@@ -0,0 +1,29 @@
+"""可复现的随机数流"""
+
+import copy
+import pickle
+from src.engine.rng import RandomStream
+
+def test_pickle_keeps_seed_path_and_state():
+    stream = RandomStream(42).substream(3)
+    stream.random()
+    restored = pickle.loads(pickle.dumps(stream))
+    assert restored.root_seed == 42
+    assert restored.path == (3,)
+    assert [restored.random() for _ in range(5)] == [stream.random() for _ in range(5)]
+    assert restored.substream(1).random() == RandomStream(42, (3, 1)).random()
+
+def test_deepcopy_keeps_seed_and_path():
+    stream = RandomStream(7, (1, 2))
+    clone = copy.deepcopy(stream)
+    assert (clone.root_seed, clone.path) == (7, (1, 2))
+    assert clone.getrandbits(64) == stream.getrandbits(64)
+
+def test_substreams_are_reproducible():
+    assert RandomStream(5).substream(2).getrandbits(64) == RandomStream(5).spawn(3)[2].getrandbits(64)
+    assert RandomStream(5).substream(1).getrandbits(64) != RandomStream(5).substream(2).getrandbits(64)
+
+def test_deal_draws_distinct_cards_reproducibly():
+    dealt = RandomStream(9).deal(list(range(52)), 9)
+    assert len(set(dealt)) == 9 and all(0 <= card < 52 for card in dealt)
+    assert RandomStream(9).deal(list(range(52)), 9) == dealt
@@ -0,0 +1,73 @@
+"""结构数组会话管理器"""
+
+import pytest
+from src.core.card import Card, Hand
+from src.engine.session import SessionManager
+from src.utils.constants import Action, Position, Stage
+
+def cards(text: str):
+    return [Card.from_string(text[i:i+2]) for i in range(0, len(text), 2)]
+
+STACKS = {Position.BTN: 1000, Position.SB: 500, Position.BB: 800}
+
+@pytest.fixture
+def manager() -> SessionManager:
+    return SessionManager(capacity=2)
+
+def test_closed_slot_is_reused_clean(manager):
+    first = manager.open_hand('t1', Hand.from_string('AhKh'), Position.BTN, 1000, STACKS)
+    manager.open_hand('t2', Hand.from_string('QsQd'), Position.BB, 800, STACKS)
+    manager.record_action('t1', Position.BB, Action.RAISE, 40)
+    manager.record_action('t1', Position.SB, Action.FOLD)
+    manager.close_hand('t1')
+    assert 't1' not in manager
+    assert manager.open_hand('t3', Hand.from_string('2c2d'), Position.SB, 500, STACKS) == first
+    state = manager.game_state('t3')
+    assert state.my_hand.cards == Hand.from_string('2c2d').cards
+    assert (state.current_pot, state.to_call, state.folded_positions, state.contributions) == (0, 0, [], {})
+    assert len(manager) == 2
+
+def test_grows_when_full(manager):
+    for table in range(5):
+        manager.open_hand(table, Hand.from_string('AhKh'), Position.BTN, 1000)
+    assert manager.capacity == 8 and len(manager) == 5
+    with pytest.raises(ValueError):
+        manager.open_hand(0, Hand.from_string('AhKh'), Position.BTN, 1000)
+
+def test_actions_update_to_call_and_pot(manager):
+    manager.open_hand('t', Hand.from_string('AhKh'), Position.BTN, 1000, STACKS)
+    manager.record_action('t', Position.BB, Action.RAISE, 50)
+    state = manager.game_state('t')
+    assert (state.to_call, state.current_pot) == (50, 50)
+    manager.record_action('t', Position.BTN, Action.RAISE, 150)
+    manager.record_action('t', Position.BB, Action.CALL, 100)
+    state = manager.game_state('t')
+    assert (state.to_call, state.current_pot, state.my_stack) == (0, 300, 850)
+    assert state.stacks[Position.BB] == 650
+    manager.record_action('t', Position.BB, Action.ALL_IN, 650)
+    # 跟注额不超过自己剩余的筹码
+    assert manager.game_state('t').to_call == 650
+    manager.update('t', to_call=20, current_pot=999)
+    assert (manager.game_state('t').to_call, manager.game_state('t').current_pot) == (20, 999)
+
+def test_game_state_rebuilds_street_and_contributions(manager):
+    manager.open_hand('t', Hand.from_string('AhKh'), Position.BTN, 1000, STACKS)
+    manager.record_action('t', Position.BTN, Action.RAISE, 30)
+    manager.record_action('t', Position.SB, Action.FOLD)
+    manager.record_action('t', Position.BB, Action.CALL, 30)
+    assert manager.advance_stage('t') == Stage.FLOP
+    manager.add_community_cards('t', cards('Qh7d2c'))
+    manager.record_action('t', Position.BB, Action.RAISE, 40)
+    state = manager.game_state('t')
+    assert state.current_stage == Stage.FLOP
+    assert state.board() == cards('Qh7d2c')
+    assert state.contributions == {Position.BTN: 30, Position.BB: 70}
+    assert state.folded_positions == [Position.SB]
+    assert (state.current_pot, state.to_call, state.street_start_pot()) == (100, 40, 60)
+    assert state.flop_state.pot_size == 40
+    # 有损：不保存逐个动作
+    assert state.flop_state.actions == [] and state.preflop_state.actions == []
+
+def test_unknown_hand(manager):
+    with pytest.raises(KeyError):
+        manager.game_state('missing')
@@ -0,0 +1,44 @@
+"""进程间共享查找表"""
+
+from multiprocessing import shared_memory
+from src.engine.shared_tables import SharedTables
+from src.engine.tables import TableManager
+
+def test_publish_skips_missing_prebuild_only_tables(tmp_path):
+    built = []
+    manager = TableManager(str(tmp_path))
+    manager.register('small', lambda: bytes(range(16)))
+    manager.register('heavy', lambda: built.append('heavy') or b'x', on_demand=False)
+    with SharedTables(['small', 'heavy'], manager) as shared:
+        assert shared.handle['cache_dir'] == str(tmp_path)
+    assert built == []
+    assert manager.is_cached('small')
+    assert not manager.is_cached('heavy')
+
+def test_empty_table_list_publishes_nothing(tmp_path):
+    manager = TableManager(str(tmp_path))
+    manager.register('small', lambda: b'x')
+    with SharedTables([], manager) as shared:
+        assert shared.handle['segments'] == {}
+    assert not manager.is_cached('small')
+
+def test_file_backed_table_is_not_copied(tmp_path):
+    manager = TableManager(str(tmp_path))
+    manager.register('small', lambda: bytes(range(16)))
+    with SharedTables(['small'], manager) as shared:
+        assert shared.handle == {'cache_dir': str(tmp_path), 'segments': {}}
+    assert manager.is_cached('small')
+
+def test_in_memory_table_is_copied_to_shared_memory(tmp_path):
+    # 缓存目录的父路径是文件，目录建不起来，表只能放在进程内
+    blocker = tmp_path / 'blocker'
+    blocker.write_bytes(b'')
+    manager = TableManager(str(blocker / 'cache'))
+    manager.register('small', lambda: bytes(range(16)))
+    with SharedTables(['small'], manager) as shared:
+        name, length = shared.handle['segments']['small']
+        segment = shared_memory.SharedMemory(name=name)
+        try:
+            assert bytes(segment.buf[:length]) == bytes(range(16))
+        finally:
+            segment.close()
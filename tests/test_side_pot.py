@@ -0,0 +1,53 @@
+"""边池构建与分配"""
+
+from src.core.card import Card, Hand
+from src.engine.evaluator import EquityCalculator
+from src.engine.rng import RandomStream
+from src.engine.side_pot import SidePotCalculator, odd_chip_order
+from src.utils.constants import Position
+
+def test_three_way_all_in_builds_main_and_side_pot():
+    contributions = {Position.UTG: 100, Position.CO: 300, Position.BTN: 300}
+    pots = SidePotCalculator.build_pots(contributions)
+    assert [pot.amount for pot in pots] == [300, 400]
+    assert set(pots[0].eligible) == {Position.UTG, Position.CO, Position.BTN}
+    assert set(pots[1].eligible) == {Position.CO, Position.BTN}
+
+def test_short_stack_wins_main_pot_only():
+    contributions = {Position.UTG: 100, Position.CO: 300, Position.BTN: 300}
+    pots = SidePotCalculator.build_pots(contributions)
+    strengths = {Position.UTG: 3, Position.CO: 2, Position.BTN: 1}
+    assert SidePotCalculator.award_pots(pots, strengths) == {Position.UTG: 300, Position.CO: 400}
+
+def test_folded_chips_stay_in_pot():
+    contributions = {Position.SB: 50, Position.BB: 200, Position.BTN: 200}
+    pots = SidePotCalculator.build_pots(contributions, folded=[Position.SB])
+    assert sum(pot.amount for pot in pots) == 450
+    assert all(Position.SB not in pot.eligible for pot in pots)
+
+def test_folded_overbet_goes_to_last_pot():
+    # 弃牌者投入超过所有存活玩家的部分仍归存活玩家
+    pots = SidePotCalculator.build_pots_array([500, 100, 100, 0, 0, 0], 0b110)
+    assert sum(amount for amount, _ in pots) == 700
+    assert pots[-1][1] == 0b110
+
+def test_split_pot_odd_chip_goes_left_of_button():
+    pots = [(301, 0b000011)]
+    order = [list(Position).index(position) for position in odd_chip_order(Position.BTN)]
+    winnings = SidePotCalculator.award_pots_array(pots, [5, 5, 0, 0, 0, 0], order)
+    assert sum(winnings) == 301
+    first = next(seat for seat in order if seat in (0, 1))
+    assert winnings[first] == 151
+
+def test_awards_conserve_chips():
+    contributions = [100, 250, 250, 400, 0, 60]
+    pots = SidePotCalculator.build_pots_array(contributions, 0b101111)
+    winnings = SidePotCalculator.award_pots_array(pots, [4, 1, 3, 3, 0, 9], list(range(6)))
+    assert sum(winnings) == sum(contributions)
+
+def test_allin_odd_chips_are_not_always_ours():
+    # 公共牌是皇家同花顺，每次都平分203：零头应在我们和对手之间轮换
+    calculator = EquityCalculator(rng=RandomStream(1))
+    board = [Card.from_string(text) for text in ('As', 'Ks', 'Qs', 'Js', 'Ts')]
+    chips = calculator.count_allin_chips(Hand.from_string('2c3d'), board, 101, [101], 1, 10)
+    assert chips == 203 * 10 // 2
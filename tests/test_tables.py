@@ -0,0 +1,39 @@
+"""版本化的查找表缓存"""
+
+from src.engine.tables import TableManager
+
+def counting_builder(payload: bytes):
+    calls = []
+
+    def build() -> bytes:
+        calls.append(1)
+        return payload
+    return build, calls
+
+def test_table_is_built_once_and_mapped_afterwards(tmp_path):
+    build, calls = counting_builder(b'abc')
+    manager = TableManager(str(tmp_path))
+    manager.register('demo', build)
+    assert bytes(manager.get('demo')) == b'abc'
+    other = TableManager(str(tmp_path), verify=True)
+    other.register('demo', build)
+    assert bytes(other.get('demo')) == b'abc'
+    assert len(calls) == 1
+
+def test_version_change_rebuilds(tmp_path):
+    manager = TableManager(str(tmp_path))
+    manager.register('demo', lambda: b'old', version=1)
+    manager.get('demo')
+    newer = TableManager(str(tmp_path))
+    newer.register('demo', lambda: b'new', version=2)
+    assert bytes(newer.get('demo')) == b'new'
+
+def test_truncated_cache_is_rebuilt(tmp_path):
+    manager = TableManager(str(tmp_path))
+    manager.register('demo', lambda: b'payload')
+    path = manager.build('demo')
+    with open(path, 'r+b') as f:
+        f.truncate(10)
+    assert not manager.verify('demo')
+    assert bytes(manager.get('demo')) == b'payload'
+    assert manager.verify('demo')
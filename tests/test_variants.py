@@ -0,0 +1,78 @@
+"""短牌和奥马哈的牌力规则与胜率"""
+
+from itertools import combinations
+import pytest
+from src.core.card import Card, Hand
+from src.engine.evaluator import EquityCalculator
+from src.engine.fast_evaluator import FastEvaluator
+from src.engine.variants import SHORT_DECK, ShortDeckEvaluator, evaluate_omaha
+from src.utils.constants import HandRank, Variant
+
+def ints(text: str):
+    return [Card.from_string(text[i:i+2]).to_int() for i in range(0, len(text), 2)]
+
+def cards(text: str):
+    return [Card.from_string(text[i:i+2]) for i in range(0, len(text), 2)]
+
+def short_deck(text: str) -> int:
+    return ShortDeckEvaluator.evaluate(ints(text))
+
+def test_short_deck_flush_beats_full_house():
+    flush, full_house = short_deck('AsKs9s7s6s'), short_deck('KhKdKc9h9d')
+    assert ShortDeckEvaluator.category(flush) == HandRank.FLUSH
+    assert ShortDeckEvaluator.category(full_house) == HandRank.FULL_HOUSE
+    assert flush > full_house
+
+def test_short_deck_trips_beat_straight():
+    trips, straight = short_deck('QhQdQc8s6h'), short_deck('6c7d8h9sTc')
+    assert ShortDeckEvaluator.category(trips) == HandRank.THREE_OF_A_KIND
+    assert ShortDeckEvaluator.category(straight) == HandRank.STRAIGHT
+    assert trips > straight
+
+def test_short_deck_ace_six_wheel():
+    wheel = short_deck('Ah6d7c8s9h')
+    assert ShortDeckEvaluator.category(wheel) == HandRank.STRAIGHT
+    assert wheel < short_deck('6c7d8h9sTc')
+    assert wheel > short_deck('AhKdQc8s9h')
+    assert ShortDeckEvaluator.category(short_deck('As6s7s8s9s')) == HandRank.STRAIGHT_FLUSH
+
+def test_omaha_needs_exactly_two_hole_cards():
+    hole, board = ints('AhKh7h2h'), ints('Qh9c3c4d8s')
+    # 手牌四张红心加公共牌一张红心共5张，但只能用2张手牌，不是同花
+    assert FastEvaluator.category(evaluate_omaha(hole, board)) != HandRank.FLUSH
+    assert FastEvaluator.category(evaluate_omaha(hole, ints('Qh9h3h4d8s'))) == HandRank.FLUSH
+    # 公共牌四张同花、手牌只有一张同花也不成同花
+    assert FastEvaluator.category(evaluate_omaha(ints('Ah2c3d4s'), ints('KhQh9h5hTc'))) != HandRank.FLUSH
+
+def test_omaha_nuts_win_every_runout():
+    calculator = EquityCalculator(seed=1, variant=Variant.PLO4)
+    equity = calculator.calculate_equity(Hand(cards('JsTs4h5h')), cards('AsKsQs2d3c'), 2, 300)
+    assert equity == 1.0
+
+def exact_short_deck_equity(hero, board) -> float:
+    """短牌单挑对随机手牌：穷举剩余公共牌和对手手牌"""
+    dead = set(hero + board)
+    deck = [card for card in SHORT_DECK if card not in dead]
+    score = total = 0
+    for rest in combinations(deck, 5 - len(board)):
+        full = board + list(rest)
+        mine = ShortDeckEvaluator.evaluate(hero + full)
+        remaining = [card for card in deck if card not in rest]
+        for villain in combinations(remaining, 2):
+            theirs = ShortDeckEvaluator.evaluate(list(villain) + full)
+            score += 2 if mine > theirs else 1 if mine == theirs else 0
+            total += 2
+    return score / total
+
+def test_short_deck_equity_matches_enumeration():
+    calculator = EquityCalculator(seed=2, variant=Variant.SHORT_DECK)
+    equity = calculator.calculate_equity(Hand.from_string('AhKh'), cards('Jc9d7h6s'), 1, 6000)
+    assert equity == pytest.approx(exact_short_deck_equity(ints('AhKh'), ints('Jc9d7h6s')), abs=0.02)
+
+def test_variant_cards_are_checked():
+    with pytest.raises(ValueError):
+        EquityCalculator(seed=0, variant=Variant.SHORT_DECK).calculate_equity(
+            Hand.from_string('2h3h'), [], 1, 10
+        )
+    with pytest.raises(ValueError):
+        EquityCalculator(seed=0, variant=Variant.PLO4).calculate_equity(Hand.from_string('AhKh'), [], 1, 10)